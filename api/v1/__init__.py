@@ -1,12 +1,155 @@
 #!/usr/bin/python3
 """ Blueprint for API """
-from flask import Blueprint
+import math
+import time
+from flask import Blueprint, g, request, abort
+from werkzeug.exceptions import Conflict
+from data import storage, DuplicateRecordError
 
 api_routes = Blueprint('api_routes', __name__, url_prefix='/api/v1')
 
+# Requests with these methods get a unit of work: all their writes are committed together, once, at the end
+write_methods = ["POST", "PUT", "DELETE"]
+
+# Cookie that tells the storage to read from the primary database until the time in it (epoch seconds),
+# so that a client sees its own writes even when the read replicas are behind
+primary_until_cookie = "hbnb_primary_until"
+
+# Max number of ids in one multi-get request (?ids=a,b,c or POST /<resource>/batch_get)
+max_batch_ids = 1000
+
+
+class UnitOfWorkAbandoned(Exception):
+    """ Thrown into the unit of work to roll it back """
+
+
+def requested_ids():
+    """ Returns the ids of a multi-get request, without duplicates.
+    GET uses ?ids=a,b,c and POST uses a JSON body like {"ids": ["a", "b", "c"]} """
+    if request.method == "GET":
+        ids = [i.strip() for i in request.args.get("ids", "").split(",") if i.strip() != ""]
+    else:
+        data = request.get_json(silent=True)
+        if not isinstance(data, dict) or not isinstance(data.get("ids"), list):
+            abort(400, "Expected a JSON body like {\"ids\": [...]}")
+        ids = [i for i in data["ids"] if isinstance(i, str)]
+
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > max_batch_ids:
+        abort(400, "Too many ids. The max is {}".format(max_batch_ids))
+
+    return ids
+
+
+def sort_arguments():
+    """ Returns the find_sorted() arguments of a sorted list request, e.g. ?sort=price_per_night&order=desc&limit=10
+    offset and limit page through the results. min / max only keep the records with values in that range """
+    args = request.args
+    order = args.get("order", "asc")
+    if order not in ["asc", "desc"]:
+        abort(400, "order must be asc or desc")
+
+    try:
+        offset = int(args.get("offset", "0"))
+        limit = int(args["limit"]) if "limit" in args else None
+        low = float(args["min"]) if "min" in args else None
+        high = float(args["max"]) if "max" in args else None
+    except ValueError:
+        abort(400, "offset / limit must be whole numbers and min / max must be numbers")
+
+    if offset < 0 or (limit is not None and limit < 0):
+        abort(400, "offset / limit can't be negative")
+
+    return {"sort": args["sort"], "descending": order == "desc", "offset": offset, "limit": limit, "low": low, "high": high}
+
+
+def range_arguments():
+    """ Returns the find_in_ranges() ranges of a filter request, e.g. ?price_per_night=50..120&max_guests=4..
+    Each value is low..high (both included, either side can be left out) or a single number """
+    ranges = {}
+    for field, value in request.args.items():
+        low, separator, high = value.partition("..")
+        if separator == "":
+            high = low
+
+        try:
+            ranges[field] = (float(low) if low.strip() != "" else None, float(high) if high.strip() != "" else None)
+        except ValueError:
+            abort(400, "Invalid range for {}: {}".format(field, value))
+
+    return ranges
+
+
+def leaderboard_arguments():
+    """ Returns the ranking and length of a leaderboard request, e.g. ?by=reviews&limit=5
+    by is rating (the default - best average rating first) or reviews (most reviews first) """
+    try:
+        limit = int(request.args.get("limit", "10"))
+    except ValueError:
+        abort(400, "limit must be a whole number")
+
+    if limit < 0:
+        abort(400, "limit can't be negative")
+
+    return {"ranking": request.args.get("by", "rating"), "limit": limit}
+
+
+@api_routes.before_request
+def read_your_writes():
+    """ Send the reads to the primary if this client wrote something a moment ago """
+    try:
+        until = float(request.cookies.get(primary_until_cookie, 0))
+    except ValueError:
+        return
+
+    if until > time.time():
+        storage.read_from_primary_until(until)
+
+@api_routes.before_request
+def begin_unit_of_work():
+    """ Start the unit of work for requests that change data """
+    # batch_get is a POST only so that the ids can go in the body. It doesn't change anything
+    if request.method in write_methods and not request.path.endswith("/batch_get"):
+        g.unit_of_work = storage.transaction()
+        g.unit_of_work.__enter__()
+
+@api_routes.after_request
+def end_unit_of_work(response):
+    """ Commit the writes of the request, unless the handler failed """
+    unit_of_work = g.pop("unit_of_work", None)
+    if unit_of_work is None:
+        return response
+
+    if response.status_code >= 400:
+        unit_of_work.__exit__(UnitOfWorkAbandoned, UnitOfWorkAbandoned(), None)
+        return response
+
+    # Unique index violations only show up now that the records are actually written
+    try:
+        unit_of_work.__exit__(None, None, None)
+    except DuplicateRecordError as exc:
+        return Conflict(str(exc)).get_response()
+
+    # Tell the client's next requests to read from the primary until the replicas have caught up
+    until = storage.primary_until()
+    if until > time.time():
+        response.set_cookie(primary_until_cookie, str(until), max_age=math.ceil(until - time.time()), httponly=True)
+
+    return response
+
+@api_routes.teardown_request
+def abandon_unit_of_work(exc):
+    """ Roll back if the request blew up before it could be committed """
+    unit_of_work = g.pop("unit_of_work", None)
+    if unit_of_work is not None:
+        unit_of_work.__exit__(UnitOfWorkAbandoned, UnitOfWorkAbandoned(), None)
+
+
 from api.v1.amenities import *
+from api.v1.bookings import *
 from api.v1.cities import *
 from api.v1.countries import *
+from api.v1.exports import *
 from api.v1.places import *
 from api.v1.reviews import *
 from api.v1.users import *
@@ -1,5 +1,6 @@
 """ objects that handles all default RestFul API actions for Amenity """
-from api.v1 import api_routes
+from flask import request
+from api.v1 import api_routes, requested_ids, sort_arguments
 from models.place_amenity import Amenity
 
 
@@ -11,8 +12,19 @@ def amenity_post():
 @api_routes.route('/amenities', methods=["GET"])
 def amenity_get():
     """ Gets all Amenities """
+    if "ids" in request.args:
+        # multi-get: ?ids=a,b,c
+        return Amenity.many(requested_ids())
+    if "sort" in request.args:
+        # e.g. ?sort=created_at&order=desc&limit=10
+        return Amenity.all_sorted(**sort_arguments())
     return Amenity.all()
 
+@api_routes.route('/amenities/batch_get', methods=["POST"])
+def amenities_batch_get():
+    """ returns the amenities with the ids in the JSON body, e.g. {"ids": ["a", "b", "c"]} """
+    return Amenity.many(requested_ids())
+
 @api_routes.route('/amenities/<amenity_id>', methods=["GET"])
 def amenity_specific_get(amenity_id):
     """ Gets a specific Amenity """
@@ -27,3 +39,13 @@ def amenity_put(amenity_id):
 def amenities_places_get(amenity_id):
     """ Provides all names of places that contains named amenity """
     return Amenity.amenities_places_get(amenity_id)
+
+@api_routes.route('/amenities/count', methods=["GET"])
+def amenities_count():
+    """ returns the number of amenities """
+    return Amenity.count()
+
+@api_routes.route('/amenities/<amenity_id>/amenities_places/count', methods=["GET"])
+def amenity_places_count(amenity_id):
+    """ returns the number of places with the amenity """
+    return Amenity.places_count(amenity_id)
@@ -0,0 +1,35 @@
+#!/usr/bin/python3
+""" objects that handles all default RestFul API actions for Booking """
+from flask import request
+from api.v1 import api_routes
+from models.booking import Booking
+
+# url http://127.0.0.1:5000/api/v1/bookings
+
+@api_routes.route('/bookings', methods=["POST"])
+def bookings_post():
+    """ posts data for new booking then returns the booking data """
+    # -- Usage example --
+    # curl -X POST [URL] /
+    #    -H "Content-Type: application/json" /
+    #    -d '{"place_id":"...","user_id":"...","check_in":"2026-11-01","check_out":"2026-11-05"}'
+
+    return Booking.create()
+
+@api_routes.route('/bookings/<booking_id>', methods=["GET"])
+def bookings_specific_get(booking_id):
+    """ returns specified booking """
+    return Booking.specific(booking_id)
+
+@api_routes.route('/places/<place_id>/bookings', methods=["GET"])
+def place_bookings_get(place_id):
+    """ returns the bookings of specified place """
+    return Booking.place_bookings(place_id)
+
+@api_routes.route('/places/available', methods=["GET"])
+def places_available_get():
+    """ returns the Places that are free between two dates """
+    # -- Usage example --
+    # curl "[URL]/api/v1/places/available?check_in=2026-11-01&check_out=2026-11-05&city_id=..."
+    return Booking.available_places(request.args.get("check_in"), request.args.get("check_out"),
+                                    request.args.get("city_id"))
@@ -1,12 +1,24 @@
 """ objects that handles all default RestFul API actions for City """
-from api.v1 import api_routes
+from flask import request
+from api.v1 import api_routes, requested_ids, sort_arguments, leaderboard_arguments
 from models.city import City
 
 @api_routes.route('/cities', methods=["GET"])
 def cities_get():
     """ get data for all cities """
+    if "ids" in request.args:
+        # multi-get: ?ids=a,b,c
+        return City.many(requested_ids())
+    if "sort" in request.args:
+        # e.g. ?sort=created_at&order=desc&limit=10
+        return City.all_sorted(**sort_arguments())
     return City.all()
 
+@api_routes.route('/cities/batch_get', methods=["POST"])
+def cities_batch_get():
+    """ returns the cities with the ids in the JSON body, e.g. {"ids": ["a", "b", "c"]} """
+    return City.many(requested_ids())
+
 @api_routes.route('/cities', methods=["POST"])
 def cities_post():
     """ posts data for new city then returns the city data"""
@@ -44,3 +56,25 @@ def cities_specific_country_get(city_id):
     #     "updated_at":c.updated_at.strftime(City.datetime_format)
     # })
     return City.countries_data(city_id)
+
+@api_routes.route('/cities/<city_id>/leaderboard', methods=["GET"])
+def city_leaderboard(city_id):
+    """ returns the best-rated places of the city """
+    # -- Usage example --
+    # curl "[URL]/api/v1/cities/<city_id>/leaderboard?by=reviews&limit=5"
+    return City.leaderboard(city_id, **leaderboard_arguments())
+
+@api_routes.route('/cities/<city_id>/places', methods=["GET"])
+def city_places_get(city_id):
+    """ returns the places in the city """
+    return City.places_data(city_id)
+
+@api_routes.route('/cities/count', methods=["GET"])
+def cities_count():
+    """ returns the number of cities """
+    return City.count()
+
+@api_routes.route('/cities/<city_id>/places/count', methods=["GET"])
+def city_places_count(city_id):
+    """ returns the number of places in the city """
+    return City.places_count(city_id)
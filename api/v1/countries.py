@@ -1,5 +1,6 @@
 """ objects that handles all default RestFul API actions for Country """
-from api.v1 import api_routes
+from flask import request
+from api.v1 import api_routes, requested_ids, sort_arguments, leaderboard_arguments
 from models.country import Country
 
 @api_routes.route('/countries', methods=["POST"])
@@ -15,8 +16,19 @@ def countries_post():
 @api_routes.route('/countries', methods=["GET"])
 def countries_get():
     """ returns countires data """
+    if "ids" in request.args:
+        # multi-get: ?ids=a,b,c
+        return Country.many(requested_ids())
+    if "sort" in request.args:
+        # e.g. ?sort=created_at&order=desc&limit=10
+        return Country.all_sorted(**sort_arguments())
     return Country.all()
 
+@api_routes.route('/countries/batch_get', methods=["POST"])
+def countries_batch_get():
+    """ returns the countries with the ids in the JSON body, e.g. {"ids": ["a", "b", "c"]} """
+    return Country.many(requested_ids())
+
 @api_routes.route('/countries/<country_code>', methods=["GET"])
 def countries_specific_get(country_code):
     """ returns specific country data """
@@ -40,4 +52,21 @@ def countries_specific_cities_get(country_code):
     # If you're using DB Storage, you can probably use the model's relationship to save yourself some work
     # Look in the example endpoints in app.py for a hint
 
-    return Country.cities_data(country_code)
\ No newline at end of file
+    return Country.cities_data(country_code)
+
+@api_routes.route('/countries/<country_code>/leaderboard', methods=["GET"])
+def country_leaderboard(country_code):
+    """ returns the best-rated places of the country """
+    # -- Usage example --
+    # curl "[URL]/api/v1/countries/AU/leaderboard?by=rating&limit=10"
+    return Country.leaderboard(country_code, **leaderboard_arguments())
+
+@api_routes.route('/countries/count', methods=["GET"])
+def countries_count():
+    """ returns the number of countries """
+    return Country.count()
+
+@api_routes.route('/countries/<country_code>/cities/count', methods=["GET"])
+def country_cities_count(country_code):
+    """ returns the number of cities of the country """
+    return Country.cities_count(country_code)
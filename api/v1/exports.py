@@ -0,0 +1,29 @@
+#!/usr/bin/python3
+""" objects that handles the bulk export of whole tables """
+from flask import Response, request, abort, stream_with_context
+from api.v1 import api_routes
+from data import storage
+from data.export import export, formats
+
+@api_routes.route('/export/<resource>', methods=["GET"])
+def export_get(resource):
+    """ streams every record of the resource (e.g. reviews, or place_amenity) as NDJSON or CSV """
+    # -- Usage example --
+    # curl "[URL]/api/v1/export/reviews" > reviews.ndjson
+    # curl "[URL]/api/v1/export/places?format=csv&compress=gzip" > places.csv.gz
+    output_format = request.args.get("format", "ndjson")
+    compress = request.args.get("compress") == "gzip"
+
+    try:
+        chunks = export(storage, resource, output_format, compress)
+    except IndexError as exc:
+        abort(400, str(exc))
+
+    content_type, extension = formats[output_format]
+    filename = resource + extension
+    if compress:
+        content_type, filename = "application/gzip", filename + ".gz"
+
+    # The response is sent while the records are still being read
+    return Response(stream_with_context(chunks), content_type=content_type,
+                    headers={"Content-Disposition": 'attachment; filename="{}"'.format(filename)})
@@ -1,5 +1,6 @@
 """ objects that handles all default RestFul API actions for Place """
-from api.v1 import api_routes
+from flask import request, abort
+from api.v1 import api_routes, requested_ids, sort_arguments, range_arguments
 from models.place_amenity import Place
 
 
@@ -11,8 +12,32 @@ def places_post():
 @api_routes.route('/places', methods=["GET"])
 def places_get():
     """returns all Places"""
+    if "ids" in request.args:
+        # multi-get: ?ids=a,b,c
+        return Place.many(requested_ids())
+    if "sort" in request.args:
+        # e.g. ?sort=created_at&order=desc&limit=10
+        return Place.all_sorted(**sort_arguments())
     return Place.all()
 
+@api_routes.route('/places/batch_get', methods=["POST"])
+def places_batch_get():
+    """ returns the places with the ids in the JSON body, e.g. {"ids": ["a", "b", "c"]} """
+    return Place.many(requested_ids())
+
+@api_routes.route('/places/filter', methods=["GET"])
+def places_filter_get():
+    """ returns the Places whose numeric fields are in the given ranges """
+    # -- Usage example --
+    # curl "[URL]/api/v1/places/filter?price_per_night=50..120&max_guests=4..&latitude=-38..-37"
+    return Place.in_ranges(range_arguments())
+
+@api_routes.route('/places/with_amenities', methods=["GET"])
+def places_with_amenities_get():
+    """ returns the Places that have all the amenities in ?amenities=a,b,c (ids or names) """
+    amenities = [a.strip() for a in request.args.get("amenities", "").split(",") if a.strip() != ""]
+    return Place.with_amenities(amenities)
+
 @api_routes.route('/places/<place_id>', methods=["GET"])
 def places_specific_get(place_id):
     """returns a specific Places"""
@@ -23,6 +48,26 @@ def places_put(place_id):
     """updates a specific Place and returns it"""
     return Place.update(place_id)
 
+@api_routes.route('/places/<place_id>/detail', methods=["GET"])
+def places_detail_get(place_id):
+    """ returns a specific Place with its city, country, host, amenities and reviews """
+    return Place.detail(place_id)
+
+@api_routes.route('/places/<place_id>/similar', methods=["GET"])
+def places_similar_get(place_id):
+    """ returns the Places of the same city that are most like the specified one """
+    # -- Usage example --
+    # curl "[URL]/api/v1/places/<place_id>/similar?limit=5"
+    try:
+        limit = int(request.args.get("limit", "10"))
+    except ValueError:
+        abort(400, "limit must be a whole number")
+
+    if limit < 0:
+        abort(400, "limit can't be negative")
+
+    return Place.similar(place_id, limit)
+
 @api_routes.route('/places/<place_id>/user', methods=["GET"])
 def place_specific_user_get(place_id):
     """ returns host user data of specified place """
@@ -42,3 +87,18 @@ def place_specific_reviews_get(place_id):
 def places_amenities_get(place_id):
     """ returns list of amenities from a specified place """
     return Place.places_amenities_get(place_id)
+
+@api_routes.route('/places/count', methods=["GET"])
+def places_count():
+    """ returns the number of places """
+    return Place.count()
+
+@api_routes.route('/places/<place_id>/review/count', methods=["GET"])
+def place_reviews_count(place_id):
+    """ returns the number of reviews of the place """
+    return Place.reviews_count(place_id)
+
+@api_routes.route('/places/<place_id>/places_amenities/count', methods=["GET"])
+def place_amenities_count(place_id):
+    """ returns the number of amenities of the place """
+    return Place.amenities_count(place_id)
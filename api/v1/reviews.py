@@ -1,6 +1,7 @@
 #!/usr/bin/python3
 """ objects that handles all default RestFul API actions for Review"""
-from api.v1 import api_routes
+from flask import request
+from api.v1 import api_routes, requested_ids, sort_arguments
 from models.review import Review
 
 # url http://127.0.0.1:5000/api/v1/reviews
@@ -8,9 +9,21 @@ from models.review import Review
 @api_routes.route('/reviews', methods=["GET"])
 def reviews_get():
     """returns reviews"""
+    if "ids" in request.args:
+        # multi-get: ?ids=a,b,c
+        return Review.many(requested_ids())
+    if "sort" in request.args:
+        # e.g. ?sort=created_at&order=desc&limit=10
+        return Review.all_sorted(**sort_arguments())
+
     # use the review class' static .all method
     return Review.all()
 
+@api_routes.route('/reviews/batch_get', methods=["POST"])
+def reviews_batch_get():
+    """ returns the reviews with the ids in the JSON body, e.g. {"ids": ["a", "b", "c"]} """
+    return Review.many(requested_ids())
+
 @api_routes.route('/reviews/<review_id>', methods=["GET"])
 def reviews_specific_get(review_id):
     """returns specified reviews"""
@@ -49,3 +62,8 @@ def users_specific_reviews_get(review_id):
 def places_specific_reviews_get(review_id):
     """ return place data from specified review """
     return Review.places_get(review_id)
+
+@api_routes.route('/reviews/count', methods=["GET"])
+def reviews_count():
+    """ returns the number of reviews """
+    return Review.count()
@@ -1,6 +1,7 @@
 #!/usr/bin/python3
 """ objects that handles all default RestFul API actions for User"""
-from api.v1 import api_routes
+from flask import request
+from api.v1 import api_routes, requested_ids, sort_arguments
 from models.user import User
 
 # url http://127.0.0.1:5000/api/v1/users
@@ -8,9 +9,21 @@ from models.user import User
 @api_routes.route('/users', methods=["GET"])
 def users_get():
     """returns Users"""
+    if "ids" in request.args:
+        # multi-get: ?ids=a,b,c
+        return User.many(requested_ids())
+    if "sort" in request.args:
+        # e.g. ?sort=created_at&order=desc&limit=10
+        return User.all_sorted(**sort_arguments())
+
     # use the User class' static .all method
     return User.all()
 
+@api_routes.route('/users/batch_get', methods=["POST"])
+def users_batch_get():
+    """ returns the users with the ids in the JSON body, e.g. {"ids": ["a", "b", "c"]} """
+    return User.many(requested_ids())
+
 @api_routes.route('/users/<user_id>', methods=["GET"])
 def users_specific_get(user_id):
     """returns specified user"""
@@ -49,3 +62,18 @@ def reviews_specific_users_get(user_id):
 def places_specific_host_get(user_id):
     """Getting all places of specified host """
     return User.place_data(user_id)
+
+@api_routes.route('/users/count', methods=["GET"])
+def users_count():
+    """ returns the number of users """
+    return User.count()
+
+@api_routes.route('/users/<user_id>/reviews/count', methods=["GET"])
+def user_reviews_count(user_id):
+    """ returns the number of reviews written by the user """
+    return User.reviews_count(user_id)
+
+@api_routes.route('/users/<user_id>/places/count', methods=["GET"])
+def user_places_count(user_id):
+    """ returns the number of places hosted by the user """
+    return User.places_count(user_id)
@@ -0,0 +1,46 @@
+#!/usr/bin/python3
+""" Blueprint for the async API used by asgi.py """
+import importlib
+from quart import Blueprint, abort
+from data import storage, USE_DB_STORAGE
+from data.export import module_names, hidden_fields, plain
+
+api_routes_async = Blueprint('api_routes_async', __name__, url_prefix='/api/v1')
+
+# The async storage reads the same data as the sync one.
+# FileStorage has already been loaded by the data module so we just wrap it.
+if USE_DB_STORAGE:
+    from data.async_db_storage import AsyncDBStorage
+    async_storage = AsyncDBStorage()
+else:
+    from data.async_file_storage import AsyncFileStorage
+    async_storage = AsyncFileStorage(storage)
+
+
+def to_dict(class_name, row):
+    """ Returns the record from either storage as a JSON friendly dictionary. The model's output_data()
+    gives both storages the same keys, e.g. host_id for the host_user_id of the data files """
+    model = getattr(importlib.import_module("models." + module_names[class_name]), class_name)
+    hidden = hidden_fields.get(class_name, [])
+    return {k: plain(v) for k, v in model.output_data(row).items() if k not in hidden}
+
+def to_list(class_name, rows):
+    """ Returns a list of JSON friendly dictionaries from the result of a storage call """
+    if isinstance(rows, dict):
+        rows = rows.values()
+    return [to_dict(class_name, row) for row in rows]
+
+async def get_or_404(class_name, record_id):
+    """ Returns the specified record as a dictionary or aborts with 404 if it doesn't exist """
+    try:
+        return to_dict(class_name, await async_storage.get(class_name, record_id))
+    except IndexError:
+        abort(404, "{} not found!".format(class_name))
+
+
+from api.v1_async.amenities import *
+from api.v1_async.cities import *
+from api.v1_async.countries import *
+from api.v1_async.places import *
+from api.v1_async.reviews import *
+from api.v1_async.users import *
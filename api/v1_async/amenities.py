@@ -0,0 +1,20 @@
+""" async versions of the read-only RestFul API actions for Amenity """
+from quart import jsonify
+from api.v1_async import api_routes_async, async_storage, to_list, get_or_404
+
+
+@api_routes_async.route('/amenities', methods=["GET"])
+async def amenity_get():
+    """ Gets all Amenities """
+    return jsonify(to_list('Amenity', await async_storage.get('Amenity')))
+
+@api_routes_async.route('/amenities/<amenity_id>', methods=["GET"])
+async def amenity_specific_get(amenity_id):
+    """ Gets a specific Amenity """
+    return jsonify(await get_or_404('Amenity', amenity_id))
+
+@api_routes_async.route('/amenities/<amenity_id>/amenities_places', methods=['GET'])
+async def amenities_places_get(amenity_id):
+    """ Provides all places that contain the specified amenity """
+    await get_or_404('Amenity', amenity_id)
+    return jsonify(to_list('Place', await async_storage.get_linked('Amenity', amenity_id, 'Place')))
@@ -0,0 +1,19 @@
+""" async versions of the read-only RestFul API actions for City """
+from quart import jsonify
+from api.v1_async import api_routes_async, async_storage, to_list, get_or_404
+
+@api_routes_async.route('/cities', methods=["GET"])
+async def cities_get():
+    """ get data for all cities """
+    return jsonify(to_list('City', await async_storage.get('City')))
+
+@api_routes_async.route('/cities/<city_id>', methods=["GET"])
+async def cities_specific_get(city_id):
+    """ returns specific city data """
+    return jsonify(await get_or_404('City', city_id))
+
+@api_routes_async.route('/cities/<city_id>/country', methods=["GET"])
+async def cities_specific_country_get(city_id):
+    """ Retrieves the data for the country the city belongs to """
+    city = await get_or_404('City', city_id)
+    return jsonify(await get_or_404('Country', city['country_id']))
@@ -0,0 +1,26 @@
+""" async versions of the read-only RestFul API actions for Country """
+from quart import jsonify, abort
+from api.v1_async import api_routes_async, async_storage, to_dict, to_list
+
+async def country_by_code(country_code):
+    """ Returns the country with the specified code or aborts with 404 """
+    rows = await async_storage.get_by('Country', 'code', country_code)
+    if len(rows) == 0:
+        abort(404, "Country not found for code {}".format(country_code))
+    return to_dict('Country', rows[0])
+
+@api_routes_async.route('/countries', methods=["GET"])
+async def countries_get():
+    """ returns countires data """
+    return jsonify(to_list('Country', await async_storage.get('Country')))
+
+@api_routes_async.route('/countries/<country_code>', methods=["GET"])
+async def countries_specific_get(country_code):
+    """ returns specific country data """
+    return jsonify(await country_by_code(country_code))
+
+@api_routes_async.route('/countries/<country_code>/cities', methods=["GET"])
+async def countries_specific_cities_get(country_code):
+    """ returns cities data of specified country """
+    country = await country_by_code(country_code)
+    return jsonify(to_list('City', await async_storage.get_by('City', 'country_id', country['id'])))
@@ -0,0 +1,46 @@
+""" async versions of the read-only RestFul API actions for Place """
+import asyncio
+from quart import jsonify
+from api.v1_async import api_routes_async, async_storage, to_list, get_or_404
+
+
+@api_routes_async.route('/places', methods=["GET"])
+async def places_get():
+    """returns all Places"""
+    return jsonify(to_list('Place', await async_storage.get('Place')))
+
+@api_routes_async.route('/places/<place_id>', methods=["GET"])
+async def places_specific_get(place_id):
+    """returns a specific Places"""
+    return jsonify(await get_or_404('Place', place_id))
+
+@api_routes_async.route('/places/<place_id>/user', methods=["GET"])
+async def place_specific_user_get(place_id):
+    """ returns host user data of specified place """
+    place = await get_or_404('Place', place_id)
+    return jsonify(await get_or_404('User', place['host_id']))
+
+@api_routes_async.route('/places/<place_id>/city', methods=["GET"])
+async def place_specific_city_get(place_id):
+    """ returns city info of specified place"""
+    place = await get_or_404('Place', place_id)
+    return jsonify(await get_or_404('City', place['city_id']))
+
+@api_routes_async.route('/places/<place_id>/review', methods=["GET"])
+async def place_specific_reviews_get(place_id):
+    """ returns list of reviews of specified place"""
+    # no need to wait for the place lookup before starting on the reviews
+    _, reviews = await asyncio.gather(
+        get_or_404('Place', place_id),
+        async_storage.get_by('Review', 'place_id', place_id)
+    )
+    return jsonify(to_list('Review', reviews))
+
+@api_routes_async.route('/places/<place_id>/places_amenities', methods=["GET"])
+async def places_amenities_get(place_id):
+    """ returns list of amenities from a specified place """
+    _, amenities = await asyncio.gather(
+        get_or_404('Place', place_id),
+        async_storage.get_linked('Place', place_id, 'Amenity')
+    )
+    return jsonify(to_list('Amenity', amenities))
@@ -0,0 +1,26 @@
+#!/usr/bin/python3
+""" async versions of the read-only RestFul API actions for Review"""
+from quart import jsonify
+from api.v1_async import api_routes_async, async_storage, to_list, get_or_404
+
+@api_routes_async.route('/reviews', methods=["GET"])
+async def reviews_get():
+    """returns reviews"""
+    return jsonify(to_list('Review', await async_storage.get('Review')))
+
+@api_routes_async.route('/reviews/<review_id>', methods=["GET"])
+async def reviews_specific_get(review_id):
+    """returns specified reviews"""
+    return jsonify(await get_or_404('Review', review_id))
+
+@api_routes_async.route('/reviews/<review_id>/users', methods=["GET"])
+async def users_specific_reviews_get(review_id):
+    """ return user data from specified review """
+    review = await get_or_404('Review', review_id)
+    return jsonify(await get_or_404('User', review['user_id']))
+
+@api_routes_async.route('/reviews/<review_id>/places', methods=["GET"])
+async def places_specific_reviews_get(review_id):
+    """ return place data from specified review """
+    review = await get_or_404('Review', review_id)
+    return jsonify(await get_or_404('Place', review['place_id']))
@@ -0,0 +1,34 @@
+#!/usr/bin/python3
+""" async versions of the read-only RestFul API actions for User"""
+import asyncio
+from quart import jsonify
+from api.v1_async import api_routes_async, async_storage, to_list, get_or_404
+
+@api_routes_async.route('/users', methods=["GET"])
+async def users_get():
+    """returns Users"""
+    return jsonify(to_list('User', await async_storage.get('User')))
+
+@api_routes_async.route('/users/<user_id>', methods=["GET"])
+async def users_specific_get(user_id):
+    """returns specified user"""
+    return jsonify(await get_or_404('User', user_id))
+
+@api_routes_async.route('/users/<user_id>/reviews', methods=["GET"])
+async def reviews_specific_users_get(user_id):
+    """ Getting all reviews of specified user """
+    # no need to wait for the user lookup before starting on the reviews
+    _, reviews = await asyncio.gather(
+        get_or_404('User', user_id),
+        async_storage.get_by('Review', 'user_id', user_id)
+    )
+    return jsonify(to_list('Review', reviews))
+
+@api_routes_async.route('/users/<user_id>/places', methods=["GET"])
+async def places_specific_host_get(user_id):
+    """Getting all places of specified host """
+    _, places = await asyncio.gather(
+        get_or_404('User', user_id),
+        async_storage.get_by('Place', 'host_id', user_id)
+    )
+    return jsonify(to_list('Place', places))
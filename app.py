@@ -2,12 +2,24 @@
 
 from flask import Flask, jsonify
 from api.v1 import api_routes
+from monitoring.routes import monitoring_routes
+from monitoring.profiling import profiling_routes
 from models.country import Country
 from models.user import User
 from data import USE_DB_STORAGE
 
 app = Flask(__name__)
 app.register_blueprint(api_routes)
+app.register_blueprint(monitoring_routes)
+app.register_blueprint(profiling_routes)
+
+@app.teardown_appcontext
+def close_storage_session(exc):
+    """ Give every request a storage session of its own - end this one now that the request is done """
+    from data import storage
+    # a request that never touched the storage didn't create it
+    if storage.is_initialised():
+        storage.close_session()
 
 @app.route('/')
 def hello_world():
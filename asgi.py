@@ -0,0 +1,77 @@
+#!/usr/bin/python3
+""" ASGI entry point for the API. Same read endpoints as app.py but the handlers are coroutines
+so that a single process can have lots of requests waiting on storage at the same time """
+
+# -- Usage example --
+# hypercorn asgi:app --bind 0.0.0.0:5000
+# STORAGE=FILE hypercorn asgi:app --bind 0.0.0.0:5000
+#
+# Only the GET endpoints are available here. Creating / updating records still goes through app.py
+#
+# Smoke check: every route is called once with ids that exist and has to answer 200, e.g. against SQLite:
+# HBNB_DB_URL=sqlite:////tmp/hbnb.db python3 -m data.migrate
+# HBNB_DB_URL=sqlite:////tmp/hbnb.db python3 -m data.generate --size 1k --db
+# HBNB_DB_URL=sqlite:////tmp/hbnb.db python3 asgi.py --check
+
+import argparse
+import asyncio
+import sys
+from quart import Quart
+from api.v1_async import api_routes_async, async_storage, to_dict
+
+app = Quart(__name__)
+app.register_blueprint(api_routes_async)
+
+@app.route('/')
+async def hello_world():
+    """ Hello world """
+    return 'Hello World'
+
+
+# route parameter -> (class_name, field) of the record whose value is used
+check_parameters = {
+    "amenity_id": ("Amenity", "id"),
+    "city_id": ("City", "id"),
+    "country_code": ("Country", "code"),
+    "place_id": ("Place", "id"),
+    "review_id": ("Review", "id"),
+    "user_id": ("User", "id")
+}
+
+async def check_routes():
+    """ Calls every route of the async API once and returns the (url, status) of the ones that didn't answer 200 """
+    values = {}
+    for parameter, (class_name, field) in check_parameters.items():
+        rows = await async_storage.get(class_name)
+        rows = list(rows.values()) if isinstance(rows, dict) else rows
+        if len(rows) == 0:
+            raise IndexError("No {} records to check the routes with".format(class_name))
+        values[parameter] = to_dict(class_name, rows[0])[field]
+
+    client = app.test_client()
+    failures = []
+    for rule in app.url_map.iter_rules():
+        if not rule.endpoint.startswith("api_routes_async.") or "GET" not in rule.methods:
+            continue
+
+        url = rule.rule
+        for parameter in rule.arguments:
+            url = url.replace("<{}>".format(parameter), str(values[parameter]))
+
+        response = await client.get(url)
+        print("{} {}".format(response.status_code, url))
+        if response.status_code != 200:
+            failures.append((url, response.status_code))
+
+    return failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Async API of HBnB Evolution")
+    parser.add_argument("--check", action="store_true", help="call every route once instead of serving, fail unless all answer 200")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(1 if len(asyncio.run(check_routes())) > 0 else 0)
+
+    app.run(host='localhost', port=5000, debug=True)
@@ -0,0 +1,2 @@
+#!/usr/bin/python3
+""" Endpoint benchmarks for both storage engines. See benchmarks/__main__.py """
@@ -0,0 +1,184 @@
+#!/usr/bin/python3
+""" Benchmarks every route of the API against FileStorage and DBStorage with synthetic datasets """
+
+# -- Usage example --
+# python3 -m benchmarks                                    (1k dataset, both storage engines)
+# python3 -m benchmarks --sizes 1k,100k,1m --requests 200
+# python3 -m benchmarks --storage file --output results.json
+# python3 -m benchmarks --compare old.json new.json
+#
+# DBStorage runs against a SQLite file so no database server is needed.
+# The generated datasets are kept in benchmarks/datasets so they only have to be generated once.
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from data.generate import dataset_sizes, write_json
+
+datasets_dirpath = "benchmarks/datasets"
+results_dirpath = "benchmarks/results"
+
+
+def prepare_dataset(size, storage_name):
+    """ Generates the dataset files for the size if they don't exist yet and returns their paths """
+    dirpath = Path(datasets_dirpath) / size
+    dirpath.mkdir(parents=True, exist_ok=True)
+    counts = dataset_sizes[size]
+
+    if storage_name == "file":
+        models_filepath = dirpath / "models.json"
+        relations_filepath = dirpath / "relations.json"
+        if not models_filepath.is_file() or not relations_filepath.is_file():
+            print("Generating {} JSON dataset...".format(size), file=sys.stderr)
+            write_json(counts, models_filepath, relations_filepath)
+        return {"HBNB_MODELS_FILE": str(models_filepath), "HBNB_RELATIONS_FILE": str(relations_filepath)}
+
+    db_filepath = dirpath / "hbnb.db"
+    if not db_filepath.is_file():
+        print("Generating {} SQLite dataset...".format(size), file=sys.stderr)
+        # the data module picks up HBNB_DB_URL when it's imported, so do this in another process
+        url = "sqlite:///" + str(db_filepath.resolve())
+        env = {**os.environ, "HBNB_DB_URL": url}
+        env.pop("STORAGE", None)
+        env.pop("TESTING", None)
+        script = ("from sqlalchemy import create_engine\n"
+                  "from data import Base\n"
+                  "from data.migrate import load_models\n"
+                  "from data.generate import write_db\n"
+                  "load_models()\n"
+                  "engine = create_engine({!r})\n"
+                  "Base.metadata.create_all(engine)\n"
+                  "write_db({!r}, engine)\n").format(url, counts)
+        subprocess.run([sys.executable, "-c", script], env=env, check=True)
+    return {"HBNB_DB_FILE": str(db_filepath)}
+
+def run_benchmark(size, storage_name, requests, max_seconds):
+    """ Runs benchmarks/run.py in a new process for the size and storage and returns its results """
+    dataset = prepare_dataset(size, storage_name)
+    env = {**os.environ}
+    env.pop("TESTING", None)
+    workdir = None
+
+    if storage_name == "file":
+        env["STORAGE"] = "FILE"
+        env.update(dataset)
+    else:
+        env.pop("STORAGE", None)
+        # The writes would change the dataset, so work on a copy
+        workdir = tempfile.mkdtemp(prefix="hbnb_bench_")
+        db_filepath = os.path.join(workdir, "hbnb.db")
+        shutil.copyfile(dataset["HBNB_DB_FILE"], db_filepath)
+        env["HBNB_DB_URL"] = "sqlite:///" + db_filepath
+
+    # The child writes its results to this file. Whatever the app prints goes to stderr, out of the way of the summary
+    output_fd, output_filepath = tempfile.mkstemp(prefix="hbnb_bench_", suffix=".json")
+    os.close(output_fd)
+    try:
+        subprocess.run(
+            [sys.executable, "-m", "benchmarks.run", json.dumps(dataset_sizes[size]), str(requests), str(max_seconds),
+             output_filepath],
+            env=env, check=True, stdout=sys.stderr
+        )
+        with open(output_filepath) as f:
+            output = json.load(f)
+    finally:
+        os.remove(output_filepath)
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    return {"size": size, "storage": storage_name, **output}
+
+def git_commit():
+    """ Returns the current commit hash or None if it can't be found """
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], check=True, stdout=subprocess.PIPE,
+                              stderr=subprocess.DEVNULL, text=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_summary(results):
+    """ Prints a short human readable table of the results """
+    for run in results["runs"]:
+        print("\n== {} / {} - load {:.2f}s, peak RSS {:.1f} MB".format(
+            run["storage"], run["size"], run["load_seconds"], run["peak_rss_kb"] / 1024))
+        for route in run["routes"]:
+            print("  {:4} {:50} p50 {:8.2f} ms  p99 {:8.2f} ms  {:8.1f} req/s  {}".format(
+                route["method"], route["route"], route["p50_ms"], route["p99_ms"],
+                route["throughput_rps"], route["statuses"]))
+
+def compare(old_filepath, new_filepath):
+    """ Prints the p50 / p99 change of every route between two result files """
+    with open(old_filepath) as f:
+        old = json.load(f)
+    with open(new_filepath) as f:
+        new = json.load(f)
+
+    old_routes = {}
+    for run in old["runs"]:
+        for route in run["routes"]:
+            old_routes[(run["storage"], run["size"], route["method"], route["route"])] = route
+
+    print("{} -> {}".format(old.get("commit"), new.get("commit")))
+    for run in new["runs"]:
+        for route in run["routes"]:
+            key = (run["storage"], run["size"], route["method"], route["route"])
+            if key not in old_routes:
+                continue
+            before = old_routes[key]
+            print("  {:5} {:5} {:4} {:50} p50 {:+7.1f}%  p99 {:+7.1f}%".format(
+                *key,
+                (route["p50_ms"] / before["p50_ms"] - 1) * 100,
+                (route["p99_ms"] / before["p99_ms"] - 1) * 100))
+
+
+def main():
+    """ Parse the command line and run the benchmarks """
+    parser = argparse.ArgumentParser(description="Benchmark the HBnB Evolution API")
+    parser.add_argument("--sizes", default="1k", help="comma separated dataset sizes: {} (default: %(default)s)".format(", ".join(dataset_sizes)))
+    parser.add_argument("--storage", default="file,db", help="comma separated storage engines: file, db (default: %(default)s)")
+    parser.add_argument("--requests", type=int, default=100, help="requests per route (default: %(default)s)")
+    parser.add_argument("--max-seconds", type=float, default=10, help="time budget per route (default: %(default)s)")
+    parser.add_argument("--output", help="where to write the JSON results (default: benchmarks/results/<commit>-<time>.json)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files instead of running")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    results = {
+        "commit": git_commit(),
+        "started_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "runs": []
+    }
+
+    for size in args.sizes.split(","):
+        if size not in dataset_sizes:
+            sys.exit("Unknown dataset size: {}".format(size))
+        for storage_name in args.storage.split(","):
+            results["runs"].append(run_benchmark(size, storage_name, args.requests, args.max_seconds))
+
+    output = args.output
+    if output is None:
+        Path(results_dirpath).mkdir(parents=True, exist_ok=True)
+        output = "{}/{}-{}.json".format(results_dirpath, (results["commit"] or "unknown")[:10], int(time.time()))
+
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print_summary(results)
+    print("\nResults written to {}".format(output))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/python3
+""" Runs every route of the API against one storage engine and one dataset and writes the results as JSON.
+
+This is started in a separate process by benchmarks/__main__.py, because the storage engine is
+picked from the environment variables when the data module is imported. The results go to a file
+rather than to stdout, because the app prints its own messages (e.g. "Error: ...") there. """
+
+import json
+import random
+import resource
+import sys
+import time
+from datetime import date, timedelta
+from data.file_storage import FileStorage
+from data.generate import record_id, country_code, letters_for
+
+# The methods we know how to benchmark, in the order they are run (reads before writes)
+methods = ["GET", "POST", "PUT"]
+
+# What GET /export/<resource> exports. Small tables only - the export of a big one is a benchmark of its own
+export_resources = ["amenities", "countries"]
+
+# The benchmark bookings start here, well clear of any real ones
+first_booking_date = date(2100, 1, 1)
+
+# The class of the records of each resource, e.g. /api/v1/places/batch_get
+resource_classes = {
+    "amenities": "Amenity",
+    "bookings": "Booking",
+    "cities": "City",
+    "countries": "Country",
+    "places": "Place",
+    "reviews": "Review",
+    "users": "User"
+}
+
+# Number of ids in each multi-get request (?ids=... and POST /<resource>/batch_get)
+batch_size = 20
+
+# These GET routes do something else depending on the query string, so each query is measured as a route
+# of its own. The names are the query() ones and None is no query string. All the other routes get None
+route_queries = {
+    "/api/v1/amenities": [None, "ids", "sort"],
+    "/api/v1/cities": [None, "ids", "sort"],
+    "/api/v1/countries": [None, "ids", "sort"],
+    "/api/v1/places": [None, "ids", "sort"],
+    "/api/v1/reviews": [None, "ids", "sort"],
+    "/api/v1/users": [None, "ids", "sort"],
+    "/api/v1/places/filter": ["ranges"],
+    "/api/v1/places/with_amenities": ["amenities"],
+    "/api/v1/places/available": ["dates"]
+}
+
+
+class RequestMaker():
+    """ Builds the urls and JSON bodies for the routes using ids that exist in the dataset """
+
+    def __init__(self, counts, seed = 0):
+        """ constructor """
+        self.counts = counts
+        self.rng = random.Random(seed)
+        self.serial = 0
+
+    def url(self, rule):
+        """ Returns the rule with all its <params> replaced by existing values """
+        url = rule
+        params = {
+            "<user_id>": lambda: record_id("User", self.rng.randrange(self.counts["User"])),
+            "<place_id>": lambda: record_id("Place", self.rng.randrange(self.counts["Place"])),
+            "<city_id>": lambda: record_id("City", self.rng.randrange(self.counts["City"])),
+            "<amenity_id>": lambda: record_id("Amenity", self.rng.randrange(self.counts["Amenity"])),
+            "<review_id>": lambda: record_id("Review", self.rng.randrange(self.counts["Review"])),
+            # The generated datasets have no bookings unless the counts ask for some - then this measures the 404
+            "<booking_id>": lambda: record_id("Booking", self.rng.randrange(max(self.counts.get("Booking", 0), 1))),
+            "<country_code>": lambda: country_code(self.rng.randrange(self.counts["Country"])),
+            "<resource>": lambda: self.rng.choice(export_resources)
+        }
+        for param, value in params.items():
+            if param in url:
+                url = url.replace(param, value())
+
+        return url
+
+    def ids(self, class_name):
+        """ Returns batch_size different ids of existing records of the class """
+        count = self.counts[class_name]
+        return [record_id(class_name, index) for index in self.rng.sample(range(count), min(batch_size, count))]
+
+    def query(self, rule, name):
+        """ Returns the query string (without the ?) called name in route_queries for the rule """
+        class_name = resource_classes.get(rule.split("/")[3])
+
+        if name == "ids":
+            return "ids=" + ",".join(self.ids(class_name))
+        if name == "sort":
+            # a page of the results, like a client would ask for
+            return "sort={}&order={}&limit=10".format(
+                self.rng.choice(FileStorage.sorted_fields[class_name]), self.rng.choice(["asc", "desc"]))
+        if name == "ranges":
+            low = self.rng.randint(20, 800)
+            return "price_per_night={}..{}&max_guests={}..".format(low, low + 200, self.rng.randint(1, 8))
+        if name == "amenities":
+            amenity_ids = self.rng.sample(range(self.counts["Amenity"]), min(2, self.counts["Amenity"]))
+            return "amenities=" + ",".join(record_id("Amenity", index) for index in amenity_ids)
+        if name == "dates":
+            # the weeks before the benchmark bookings, so the answer doesn't change while they are made
+            check_in = first_booking_date - timedelta(days=self.rng.randint(7, 365))
+            return "check_in={}&check_out={}".format(check_in.isoformat(), (check_in + timedelta(days=7)).isoformat())
+
+        raise ValueError("Unknown query {} for {}".format(name, rule))
+
+    def body(self, method, rule):
+        """ Returns a valid JSON body for the POST / PUT routes """
+        self.serial += 1
+        word = letters_for(self.serial).capitalize()
+        resource_name = rule.split("/")[3]
+
+        if rule.endswith("/batch_get"):
+            return {"ids": self.ids(resource_classes[resource_name])}
+        user_id = record_id("User", self.rng.randrange(self.counts["User"]))
+        place_id = record_id("Place", self.rng.randrange(self.counts["Place"]))
+
+        if method == "POST":
+            bodies = {
+                "countries": {"name": "Bench " + word, "code": country_code(self.counts["Country"] + self.serial)},
+                "cities": {"name": "Bench " + word, "country_id": record_id("Country", self.rng.randrange(self.counts["Country"]))},
+                "users": {"first_name": word, "last_name": word, "email": "bench{}@example.com".format(self.serial), "password": "benchmark"},
+                "amenities": {"name": "Bench " + word},
+                "places": {
+                    "name": "Bench " + word, "description": "Benchmark place", "address": "1 Bench Street",
+                    "latitude": 1.5, "longitude": 103.8, "number_of_rooms": 2, "number_of_bathrooms": 1,
+                    "price_per_night": 100, "max_guests": 4, "host_id": user_id,
+                    "city_id": record_id("City", self.rng.randrange(self.counts["City"]))
+                },
+                "reviews": {"comment": "A benchmark review " + word, "user_id": user_id, "place_id": place_id, "rating": 4},
+                # a night of its own for every booking, so they never overlap
+                "bookings": {
+                    "place_id": place_id, "user_id": user_id,
+                    "check_in": (first_booking_date + timedelta(days=self.serial)).isoformat(),
+                    "check_out": (first_booking_date + timedelta(days=self.serial + 1)).isoformat()
+                }
+            }
+        else:
+            bodies = {
+                "countries": {"name": "Renamed " + word},
+                "cities": {"name": "Renamed " + word},
+                "users": {"first_name": word, "last_name": word},
+                "amenities": {"name": "Renamed " + word},
+                "places": {"name": "Renamed " + word, "price_per_night": 120},
+                "reviews": {"comment": "An updated benchmark review " + word, "rating": 3}
+            }
+
+        return bodies.get(resource_name, {})
+
+
+def percentile(sorted_values, fraction):
+    """ Returns the value at the fraction (0 - 1) of the already sorted values """
+    if len(sorted_values) == 0:
+        return None
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+def benchmark_route(client, maker, method, rule, query, requests, max_seconds):
+    """ Sends up to `requests` requests to the route (with the query string called query, if not None)
+    and returns the stats """
+    latencies = []
+    statuses = {}
+    started = time.perf_counter()
+
+    for _ in range(requests):
+        url = maker.url(rule)
+        if query is not None:
+            url += "?" + maker.query(rule, query)
+        body = maker.body(method, rule) if method != "GET" else None
+
+        start_time = time.perf_counter()
+        response = client.open(url, method=method, json=body)
+        response.get_data()
+        latencies.append(time.perf_counter() - start_time)
+
+        statuses[str(response.status_code)] = statuses.get(str(response.status_code), 0) + 1
+        if time.perf_counter() - started > max_seconds:
+            break
+
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+
+    return {
+        "route": rule if query is None else rule + "?" + query,
+        "method": method,
+        "requests": len(latencies),
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "throughput_rps": len(latencies) / elapsed,
+        "statuses": statuses
+    }
+
+def peak_rss_kb():
+    """ Returns the peak resident set size of this process in KB """
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def main():
+    """ Expects the dataset counts as JSON, the number of requests, the time budget per route
+    and the file to write the results to """
+    counts = json.loads(sys.argv[1])
+    requests = int(sys.argv[2])
+    max_seconds = float(sys.argv[3])
+    output_filepath = sys.argv[4]
+
+    from app import app
+    from data import storage
+
+    # Loading the data (or connecting) is measured separately from the requests
+    start_time = time.perf_counter()
+    storage.ensure_initialised()
+    load_seconds = time.perf_counter() - start_time
+
+    # The errors are counted in the statuses, no need for all the tracebacks
+    app.logger.disabled = True
+
+    client = app.test_client()
+    maker = RequestMaker(counts)
+
+    rules = [r for r in app.url_map.iter_rules() if r.endpoint.startswith("api_routes.")]
+    routes = []
+    for method in methods:
+        for rule in sorted(rules, key=lambda r: r.rule):
+            if method not in rule.methods:
+                continue
+            for query in (route_queries.get(rule.rule, [None]) if method == "GET" else [None]):
+                routes.append(benchmark_route(client, maker, method, rule.rule, query, requests, max_seconds))
+
+    with open(output_filepath, "w") as f:
+        json.dump({
+            "load_seconds": load_seconds,
+            "peak_rss_kb": peak_rss_kb(),
+            "routes": routes
+        }, f)
+
+
+if __name__ == '__main__':
+    main()
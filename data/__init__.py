@@ -2,9 +2,7 @@
 """ initialize the storage used by models """
 
 import os
-from data.db_storage import DBStorage
-from data.file_storage import FileStorage
-from sqlalchemy.ext.declarative import declarative_base
+from data.lazy_storage import LazyStorage
 
 # check for STORAGE=FILE from command line
 # command to use: STORAGE=FILE python3 ./app.py
@@ -12,16 +10,79 @@ USE_DB_STORAGE = True
 if "STORAGE" in os.environ and os.environ['STORAGE'] == "FILE":
     USE_DB_STORAGE = False
 
+# STORAGE=SQLITE is DB Storage with a local SQLite file instead of a MySQL server. No server needed!
+# command to use: STORAGE=SQLITE python3 ./app.py   (the file is set with HBNB_SQLITE_FILE)
+# USE_DB_STORAGE stays True - see DBStorage.connection_url()
+
 # check for TESTING=1 from command line
 # command to use: TESTING=1 python3 -m unittest discover
 is_testing = "TESTING" in os.environ and os.environ['TESTING'] == "1"
 
+class DuplicateRecordError(IndexError):
+    """ Raised by the storage when a record would clash with a unique field of another record.
+    It's an IndexError so anything that already catches storage errors still catches this one """
+
+class OverlappingRecordError(DuplicateRecordError):
+    """ Raised by the storage when a record's date range would overlap another record of the same group,
+    e.g. two bookings of the same place. Handled like any other clash with an existing record """
+
+def create_db_storage():
+    """ Returns a new DBStorage object """
+    # Only import SQLAlchemy stuff when it is actually needed
+    from data.db_storage import DBStorage
+    from data.metered_storage import MeteredStorage
+    from data.reference_cache import ReferenceCache
+    from data.query_cache import QueryCache
+    from data.place_documents import PlaceDocuments
+    from data.leaderboards import Leaderboards
+    from data.similar_places import SimilarPlaces
+
+    # Other processes may write to the database too, so cached query results are only used for a few seconds
+    max_age = float(os.getenv('HBNB_QUERY_CACHE_TTL', "5"))
+    queries = QueryCache(ReferenceCache(MeteredStorage(DBStorage())), max_age)
+
+    # The leaderboards read every review to start with, so they are made again less often
+    similar = SimilarPlaces(PlaceDocuments(queries, max_age), max_age)
+    return Leaderboards(similar, float(os.getenv('HBNB_LEADERBOARD_TTL', "60")))
+
+def create_file_storage():
+    """ Returns a new FileStorage object with the data files loaded """
+    from data.file_storage import FileStorage
+    from data.metered_storage import MeteredStorage
+    from data.reference_cache import ReferenceCache
+    from data.query_cache import QueryCache
+    from data.place_documents import PlaceDocuments
+    from data.leaderboards import Leaderboards
+    from data.similar_places import SimilarPlaces
+    file_storage = FileStorage()
+    file_storage.load_data(is_testing)
+    references = ReferenceCache(MeteredStorage(file_storage))
+
+    # All the writes go through this process, so cached query results never need to expire
+    queries = QueryCache(references, 0)
+    documents = PlaceDocuments(queries, 0)
+    similar = SimilarPlaces(documents, 0)
+    leaderboards = Leaderboards(similar, 0)
+
+    # Pick up changes to the data files without a restart. HBNB_RELOAD_INTERVAL=0 turns this off
+    file_storage.add_reload_listener(references.forget)
+    file_storage.add_reload_listener(queries.invalidate)
+    file_storage.add_reload_listener(documents.reloaded)
+    file_storage.add_reload_listener(similar.reloaded)
+    file_storage.add_reload_listener(leaderboards.reloaded)
+    file_storage.watch_files(float(os.getenv('HBNB_RELOAD_INTERVAL', "2")))
+
+    return leaderboards
+
 # Note that we are creating object instances of the Storage classes
 # Each storage object could have different settings that affect loading/saving of data.
+# The storage object is only created the first time it is used, so importing the models is cheap.
+# The database tables are NOT created here. Use this command for that:
+#   python3 -m data.migrate
 if USE_DB_STORAGE:
+    from sqlalchemy.orm import declarative_base
     Base = declarative_base()
-    storage = DBStorage(Base)
+    storage = LazyStorage(create_db_storage)
 else:
     Base = object
-    storage = FileStorage()
-    storage.load_data(is_testing)
+    storage = LazyStorage(create_file_storage)
@@ -0,0 +1,115 @@
+#!/usr/bin/python3
+"""This module defines a class to manage async database storage for hbnb evolution"""
+
+import importlib
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from data.db_storage import DBStorage
+
+class AsyncDBStorage():
+    """ Class for reading data from databases without blocking the event loop """
+    __engine = None
+    __session_factory = None
+    __module_names = {
+        "User": "user",
+        "Country": "country",
+        "City": "city",
+        "Amenity": "place_amenity",
+        "Place": "place_amenity",
+        "Review": "review",
+        "Booking": "booking"
+    }
+
+    # The sync drivers used by DBStorage and their async equivalents
+    __async_drivers = {
+        "mysql+mysqldb": "mysql+aiomysql",
+        "mysql": "mysql+aiomysql",
+        "sqlite": "sqlite+aiosqlite"
+    }
+
+    def __init__(self):
+        """Instantiate an AsyncDBStorage object"""
+
+        # All the models have to be loaded before any of them can be used: their relationships refer to
+        # each other by name, e.g. Place.reviews -> 'Review'. Same as the data.export command line
+        for name in sorted(set(self.__module_names.values())):
+            importlib.import_module("models." + name)
+
+        # Same database as DBStorage, just swap in the async driver.
+        # The schema is created by DBStorage so we don't do it again here.
+        url = DBStorage.connection_url()
+        driver, rest = url.split("://", 1)
+        if driver in self.__async_drivers:
+            driver = self.__async_drivers[driver]
+
+        self.__engine = create_async_engine(driver + "://" + rest)
+        if driver.startswith("sqlite"):
+            event.listen(self.__engine.sync_engine, "connect", DBStorage.set_sqlite_pragmas)
+
+        # Sessions are cheap. Each call gets its own so that concurrent requests never share one
+        self.__session_factory = async_sessionmaker(
+            bind=self.__engine, expire_on_commit=False)
+
+    def __class_for(self, class_name):
+        """ Returns the model class for the specified class name """
+        if class_name == "" or class_name not in self.__module_names:
+            raise IndexError("Unable to load Model data. Specified class name not found")
+
+        namespace = self.__module_names[class_name]
+        module = importlib.import_module("models." + namespace)
+        return getattr(module, class_name)
+
+    async def get(self, class_name = "", record_id = ""):
+        """ Return data for specified class name with or without record id"""
+
+        if class_name == "":
+            raise IndexError("Unable to load Model data. No class name specified")
+
+        class_ = self.__class_for(class_name)
+
+        async with self.__session_factory() as session:
+            if record_id == "":
+                result = await session.execute(select(class_))
+                return result.scalars().all()
+
+            result = await session.execute(select(class_).where(class_.id == record_id).limit(1))
+            row = result.scalars().first()
+
+        if row is None:
+            raise IndexError("Unable to load Model data. Specified id not found")
+
+        return row
+
+    async def get_by(self, class_name, field, value):
+        """ Return all records of specified class where field is equal to value """
+
+        class_ = self.__class_for(class_name)
+
+        # Use the table columns since most of the model attributes are private
+        if field not in class_.__table__.c:
+            raise IndexError("Unable to load Model data. Specified field not found")
+
+        async with self.__session_factory() as session:
+            result = await session.execute(select(class_).where(class_.__table__.c[field] == value))
+            return result.scalars().all()
+
+    async def get_linked(self, class_name, record_id, linked_class_name):
+        """ Return the records of linked_class_name that are related to the specified record
+        through a many-to-many table, e.g. the Amenities of a Place """
+
+        class_ = self.__class_for(class_name)
+        linked_class = self.__class_for(linked_class_name)
+
+        # Only Place <-> Amenity exists for now
+        module = importlib.import_module("models.place_amenity")
+        table = module.place_amenity
+        own_key = table.c[class_name.lower() + "_id"]
+        linked_key = table.c[linked_class_name.lower() + "_id"]
+
+        async with self.__session_factory() as session:
+            result = await session.execute(
+                select(linked_class)
+                .join(table, linked_key == linked_class.id)
+                .where(own_key == record_id)
+            )
+            return result.scalars().all()
@@ -0,0 +1,54 @@
+#!/usr/bin/python3
+"""This module defines a class to manage async file storage for hbnb evolution"""
+
+import asyncio
+
+class AsyncFileStorage():
+    """ Coroutine wrapper around FileStorage so that it can be used by the ASGI app """
+    __storage = None
+
+    # Scans over big classes give control back to the event loop every this many rows
+    # so that one slow request doesn't hold up all the others
+    scan_chunk_size = 1000
+
+    def __init__(self, file_storage):
+        """ Wraps an existing (and usually already loaded) FileStorage object """
+        self.__storage = file_storage
+
+    async def get(self, class_name = "", record_id = ""):
+        """ Return all data or data for specified class name and / or id"""
+        # All the data is in memory already. Nothing to wait on here
+        return self.__storage.get(class_name, record_id)
+
+    async def get_by(self, class_name, field, value):
+        """ Return all records of specified class where field is equal to value """
+        data = []
+
+        for count, row in enumerate(self.__storage.get(class_name).values(), 1):
+            # the data files use some older field names, e.g. host_user_id for host_id
+            if self.__storage.field_value(class_name, row, field) == value:
+                data.append(row)
+            if count % self.scan_chunk_size == 0:
+                await asyncio.sleep(0)
+
+        return data
+
+    async def get_linked(self, class_name, record_id, linked_class_name):
+        """ Return the records of linked_class_name that are related to the specified record
+        through a many-to-many relation, e.g. the Amenities of a Place """
+        data = []
+
+        try:
+            relations = self.__storage.get_relations(class_name, linked_class_name)
+            linked_ids = relations.get(record_id, [])
+        except IndexError:
+            # relations.json only stores one direction (Place -> Amenity), so flip it around
+            relations = self.__storage.get_relations(linked_class_name, class_name)
+            linked_ids = [k for k, v in relations.items() if record_id in v]
+
+        linked_data = self.__storage.get(linked_class_name)
+        for linked_id in linked_ids:
+            if linked_id in linked_data:
+                data.append(linked_data[linked_id])
+
+        return data
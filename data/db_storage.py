@@ -2,33 +2,122 @@
 """This module defines a class to manage file storage for hbnb evolution"""
 
 import importlib
+import threading
+import time
+from contextlib import contextmanager
 from os import getenv
-from copy import deepcopy
+from collections import namedtuple
 from datetime import datetime
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, func, select, DateTime
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import scoped_session, sessionmaker
+from sqlalchemy.orm.util import identity_key
+from data import DuplicateRecordError, OverlappingRecordError
+from monitoring.profiling import before_cursor_execute, after_cursor_execute
 
 class DBStorage():
     """ Class for reading data from databases """
     __engine = None
-    __session = None
+    __sessions = None
+    __replicas = None
     __module_names = {
         "User": "user",
         "Country": "country",
         "City": "city",
         "Amenity": "place_amenity",
         "Place": "place_amenity",
-        "Review": "review"
+        "Review": "review",
+        "Booking": "booking"
     }
 
-    def __init__(self, Base):
+    # Max number of values in a single IN (...) list
+    __in_chunk_size = 500
+
+    # Columns that update() never changes, whatever it is given
+    __readonly_columns = ["id", "created_at", "updated_at"]
+
+    # Named tuple types of the update() results, by class name
+    __record_types = {}
+
+    # Records of these classes have a (group, start, end) range, and the ranges in the same group
+    # must not overlap, e.g. two bookings of the same place. Same as FileStorage
+    __interval_fields = {
+        "Booking": ("place_id", "check_in", "check_out")
+    }
+
+    # Run on every new SQLite connection. WAL lets readers carry on while something is being written,
+    # and with WAL, synchronous=NORMAL is still safe from corruption (a power cut may lose the last commits).
+    # Reads of a file that fits in mmap_size come straight from the OS page cache
+    sqlite_pragmas = [
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",
+        "PRAGMA mmap_size=268435456",
+        "PRAGMA cache_size=-65536",
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA busy_timeout=5000",
+        "PRAGMA foreign_keys=ON"
+    ]
+
+    # Compiled statements kept per SQLite connection (Python's default is 128)
+    sqlite_statement_cache_size = 512
+
+    def __init__(self):
         """Instantiate a DBStorage object"""
 
+        # How many transaction() blocks the current thread is inside,
+        # and until when the reads of its current request have to go to the primary (see __read_session)
+        self.__unit_of_work = threading.local()
+
+        # Note that the tables are not created here. See data/migrate.py
+        self.__engine = DBStorage.new_engine()
+
+        # One session per thread, handed out by the registry. close_session() ends it when the request is done,
+        # so every request starts with a session of its own and one request's rollback can't throw away
+        # what another one has added but not committed yet
+        session_factory = sessionmaker(
+            bind=self.__engine, expire_on_commit=False)
+        self.__sessions = scoped_session(session_factory)
+
+        # Read replicas, if any. Each one is [engine, session registry], one session per thread like the primary.
+        # They only ever run reads, so there's no need for transactions - every statement sees the latest data
+        self.__replicas = []
+        for url in DBStorage.replica_urls():
+            engine = DBStorage.new_engine(url).execution_options(isolation_level="AUTOCOMMIT")
+            self.__replicas.append([engine, scoped_session(sessionmaker(bind=engine, expire_on_commit=False))])
+
+        self.__replica_strategy = getenv('HBNB_REPLICA_STRATEGY', "round_robin")
+        self.__next_replica = 0
+        self.__replica_lock = threading.Lock()
+
+        # After a write, the same client reads from the primary for this many seconds so that it sees
+        # its own changes even if the replicas haven't caught up yet. The API hands the time over from one
+        # request of the client to the next, see read_from_primary_until()
+        self.__read_your_writes_seconds = float(getenv('HBNB_READ_YOUR_WRITES_SECONDS', "5"))
+
+    @staticmethod
+    def connection_url():
+        """ Returns the SQLAlchemy connection url built from the HBNB_* environment variables """
+
+        # HBNB_DB_URL overrides everything else. Handy for testing locally against SQLite
+        # e.g. HBNB_DB_URL=sqlite:///hbnb_local.db python3 ./app.py
+        url = getenv('HBNB_DB_URL')
+        if url is not None:
+            return url
+
+        is_testing = getenv('TESTING')
+
+        # STORAGE=SQLITE uses a local database file instead of a MySQL server
+        if getenv('STORAGE') == "SQLITE":
+            filepath = getenv('HBNB_SQLITE_FILE')
+            if filepath is None:
+                filepath = "data/hbnb_test.db" if is_testing == "1" else "data/hbnb_evo.db"
+            return 'sqlite:///{}'.format(filepath)
+
         user = getenv('HBNB_MYSQL_USER')
         pwd = getenv('HBNB_MYSQL_PWD')
         host = getenv('HBNB_MYSQL_HOST')
         db = getenv('HBNB_MYSQL_DB')
-        is_testing = getenv('TESTING')
 
         # If you were lazy and didn't specify anything on the command line, then the defaults below will be used
         # PLEASE DON'T DO THIS IN A REAL WORKING ENVIRONMENT
@@ -48,17 +137,58 @@ class DBStorage():
             else:
                 db = "hbnb_evo_db"
 
-        self.__engine = create_engine('mysql+mysqldb://{}:{}@{}/{}'.format(user, pwd, host, db))
+        return 'mysql+mysqldb://{}:{}@{}/{}'.format(user, pwd, host, db)
 
-        if is_testing == "1":
-            Base.metadata.drop_all(self.__engine)
+    @staticmethod
+    def replica_urls():
+        """ Returns the connection urls of the read replicas (none by default) """
 
-        Base.metadata.create_all(self.__engine)
+        # Full urls, comma separated. e.g. to try it out with two SQLite files:
+        # HBNB_DB_URL=sqlite:///primary.db HBNB_DB_REPLICA_URLS=sqlite:///replica.db python3 ./app.py
+        urls = getenv('HBNB_DB_REPLICA_URLS')
+        if urls is not None:
+            return [url.strip() for url in urls.split(",") if url.strip() != ""]
 
-        session_factory = sessionmaker(
-            bind=self.__engine, expire_on_commit=False)
-        Session = scoped_session(session_factory)
-        self.__session = Session()
+        # Or just the host names, comma separated. Everything else is the same as the primary
+        hosts = getenv('HBNB_MYSQL_REPLICA_HOSTS')
+        if hosts is not None:
+            primary_url = make_url(DBStorage.connection_url())
+            return [primary_url.set(host=host.strip()).render_as_string(hide_password=False)
+                    for host in hosts.split(",") if host.strip() != ""]
+
+        return []
+
+    @staticmethod
+    def new_engine(url = None):
+        """ Returns a new engine for the url (default: connection_url()). SQLite engines get tuned connections.
+        The SQL statements of profiled requests are recorded """
+        if url is None:
+            url = DBStorage.connection_url()
+
+        if not url.startswith("sqlite"):
+            engine = create_engine(url)
+        else:
+            engine = create_engine(url, connect_args={"cached_statements": DBStorage.sqlite_statement_cache_size})
+            event.listen(engine, "connect", DBStorage.set_sqlite_pragmas)
+
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", after_cursor_execute)
+        return engine
+
+    @staticmethod
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        """ Engine 'connect' event handler that runs sqlite_pragmas on the new connection """
+        cursor = dbapi_connection.cursor()
+        for pragma in DBStorage.sqlite_pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+    @staticmethod
+    def is_duplicate_error(exc):
+        """ Returns True if the IntegrityError was caused by a unique index (and not e.g. a foreign key) """
+        # MySQL: (1062, "Duplicate entry ...")  SQLite: UNIQUE constraint failed: ...
+        message = str(exc.orig)
+        return "Duplicate entry" in message or "UNIQUE constraint failed" in message
 
     def get(self, class_name = "", record_id = ""):
         """ Return data for specified class name with or without record id"""
@@ -73,16 +203,412 @@ class DBStorage():
         module = importlib.import_module("models." + namespace)
         class_ = getattr(module, class_name)
 
+        query = self.__read_query(class_)
         if record_id == "":
-            rows = self.__session.query(class_).all()
+            rows = query.all()
         else:
             try:
-                rows = self.__session.query(class_).where(class_.id == record_id).limit(1).one()
+                rows = query.where(class_.id == record_id).limit(1).one()
             except:
                 raise IndexError("Unable to load Model data. Specified id not found")
 
         return rows
 
+    def find(self, class_name, filters = None, offset = 0, limit = None):
+        """ Returns a list of the records of the specified class whose columns match all the filters,
+        e.g. find('City', {"country_id": country_id}). With offset / limit the records are ordered by id """
+
+        if class_name.strip() == "" or not self.__module_names[class_name]:
+            raise IndexError("Specified class name is not valid")
+
+        namespace = self.__module_names[class_name]
+        module = importlib.import_module("models." + namespace)
+        class_ = getattr(module, class_name)
+        columns = class_.__table__.c
+
+        query = self.__read_query(class_)
+        for column_name, value in (filters or {}).items():
+            if column_name not in columns:
+                raise IndexError("Unable to filter {} records by '{}'".format(class_name, column_name))
+            query = query.where(columns[column_name] == value)
+
+        if offset > 0 or limit is not None:
+            query = query.order_by(columns.id).offset(offset).limit(limit)
+
+        return query.all()
+
+    def existing_ids(self, class_name, record_ids):
+        """ Returns the set of the specified ids that exist in the table of the specified class.
+        The ids are checked with IN (...) queries - one per chunk of ids rather than one per id """
+
+        if class_name.strip() == "" or not self.__module_names[class_name]:
+            raise IndexError("Specified class name is not valid")
+
+        namespace = self.__module_names[class_name]
+        module = importlib.import_module("models." + namespace)
+        class_ = getattr(module, class_name)
+
+        record_ids = list(record_ids)
+        found = set()
+        for start in range(0, len(record_ids), self.__in_chunk_size):
+            chunk = record_ids[start:start + self.__in_chunk_size]
+            rows = self.__read_query(class_.id).where(class_.id.in_(chunk)).all()
+            found.update(row[0] for row in rows)
+
+        return found
+
+    def find_sorted(self, class_name, field, descending = False, offset = 0, limit = None, low = None, high = None):
+        """ Returns a list of the records of the specified class ordered by the column, only the ones
+        with values from low to high (both included) if given. Timestamps can be given as epoch seconds """
+
+        if class_name.strip() == "" or not self.__module_names[class_name]:
+            raise IndexError("Specified class name is not valid")
+
+        namespace = self.__module_names[class_name]
+        module = importlib.import_module("models." + namespace)
+        class_ = getattr(module, class_name)
+        columns = class_.__table__.c
+
+        if field not in columns:
+            raise IndexError("Unable to sort {} records by '{}'".format(class_name, field))
+        column = columns[field]
+
+        # Same as FileStorage, where the timestamps are epoch seconds
+        if isinstance(column.type, DateTime):
+            low = datetime.fromtimestamp(low) if isinstance(low, (int, float)) else low
+            high = datetime.fromtimestamp(high) if isinstance(high, (int, float)) else high
+
+        query = self.__read_query(class_)
+        if low is not None:
+            query = query.where(column >= low)
+        if high is not None:
+            query = query.where(column <= high)
+
+        # ties are broken by id, like the FileStorage index
+        if descending:
+            query = query.order_by(column.desc(), columns.id.desc())
+        else:
+            query = query.order_by(column, columns.id)
+
+        return query.offset(offset).limit(limit).all()
+
+    def find_in_ranges(self, class_name, ranges):
+        """ Returns a list of the records of the specified class whose columns are within all the ranges,
+        e.g. find_in_ranges('Place', {"price_per_night": (50, 120), "max_guests": (4, None)}).
+        Both ends are included and None means no limit """
+
+        if class_name.strip() == "" or not self.__module_names[class_name]:
+            raise IndexError("Specified class name is not valid")
+
+        namespace = self.__module_names[class_name]
+        module = importlib.import_module("models." + namespace)
+        class_ = getattr(module, class_name)
+        columns = class_.__table__.c
+
+        query = self.__read_query(class_)
+        for column_name, (low, high) in ranges.items():
+            if column_name not in columns:
+                raise IndexError("Unable to filter {} records by '{}'".format(class_name, column_name))
+            query = query.where(columns[column_name].isnot(None))
+            if low is not None:
+                query = query.where(columns[column_name] >= low)
+            if high is not None:
+                query = query.where(columns[column_name] <= high)
+
+        return query.all()
+
+    def find_linked_to_all(self, class_name, linked_class_name, linked_ids):
+        """ Returns a list of the records of the specified class that are linked to every one of linked_ids
+        through a many-to-many table, e.g. find_linked_to_all('Place', 'Amenity', [wifi_id, pool_id]).
+        One query: the link rows of the wanted ids, grouped by record, keeping the records with all of them """
+
+        if class_name.strip() == "" or not self.__module_names[class_name]:
+            raise IndexError("Specified class name is not valid")
+
+        namespace = self.__module_names[class_name]
+        module = importlib.import_module("models." + namespace)
+        class_ = getattr(module, class_name)
+
+        linked_ids = list(dict.fromkeys(linked_ids))
+        if len(linked_ids) == 0:
+            return self.__read_query(class_).all()
+
+        for relationship in class_.__mapper__.relationships:
+            if relationship.secondary is None or relationship.mapper.class_.__name__ != linked_class_name:
+                continue
+
+            # the columns of the link table that point at the two tables
+            own = [c for c in relationship.secondary.c if c.references(class_.__table__.c.id)][0]
+            linked = [c for c in relationship.secondary.c if c.references(relationship.mapper.class_.__table__.c.id)][0]
+            record_ids = select(own).where(linked.in_(linked_ids)).group_by(own) \
+                .having(func.count() == len(linked_ids))
+
+            return self.__read_query(class_).where(class_.id.in_(record_ids)).all()
+
+        raise IndexError("Unable to load relations data. No relation between specified classes")
+
+    def overlapping_groups(self, class_name, group_ids, start, end):
+        """ Returns the set of the group ids that have a record of the class overlapping the dates from start
+        up to (not including) end, e.g. overlapping_groups('Booking', place_ids, check_in, check_out)
+        -> the places that are booked then. One query per chunk of group ids """
+
+        if class_name not in self.__interval_fields:
+            raise IndexError("{} records don't have date ranges".format(class_name))
+
+        namespace = self.__module_names[class_name]
+        module = importlib.import_module("models." + namespace)
+        class_ = getattr(module, class_name)
+        group, start_column, end_column = (class_.__table__.c[f] for f in self.__interval_fields[class_name])
+
+        group_ids = list(dict.fromkeys(group_ids))
+        found = set()
+        for first in range(0, len(group_ids), self.__in_chunk_size):
+            chunk = group_ids[first:first + self.__in_chunk_size]
+            rows = self.__read_query(group).distinct() \
+                .where(group.in_(chunk), end_column > start, start_column < end).all()
+            found.update(row[0] for row in rows)
+
+        return found
+
+    def count(self, class_name, filters = None):
+        """ Returns the number of records of the specified class whose columns match all the filters,
+        e.g. count('Place', {"city_id": city_id}). A single COUNT(*) - filter on indexed columns to keep it cheap """
+
+        if class_name.strip() == "" or not self.__module_names[class_name]:
+            raise IndexError("Specified class name is not valid")
+
+        namespace = self.__module_names[class_name]
+        module = importlib.import_module("models." + namespace)
+        class_ = getattr(module, class_name)
+        columns = class_.__table__.c
+
+        query = self.__read_query(func.count(columns.id))
+        for column_name, value in (filters or {}).items():
+            if column_name not in columns:
+                raise IndexError("Unable to filter {} records by '{}'".format(class_name, column_name))
+            query = query.where(columns[column_name] == value)
+
+        return query.scalar()
+
+    def count_relations(self, class_name, linked_class_name, record_id):
+        """ Returns the number of linked_class_name records linked to the record through a many-to-many table,
+        e.g. count_relations('Place', 'Amenity', place_id). Only the link table is read """
+
+        if class_name.strip() == "" or not self.__module_names[class_name]:
+            raise IndexError("Specified class name is not valid")
+
+        namespace = self.__module_names[class_name]
+        module = importlib.import_module("models." + namespace)
+        class_ = getattr(module, class_name)
+
+        for relationship in class_.__mapper__.relationships:
+            if relationship.secondary is None or relationship.mapper.class_.__name__ != linked_class_name:
+                continue
+
+            # the column of the link table that points at this class' table
+            for column in relationship.secondary.c:
+                if column.references(class_.__table__.c.id):
+                    return self.__read_query(func.count()).select_from(relationship.secondary) \
+                        .where(column == record_id).scalar()
+
+        raise IndexError("Unable to load relations data. No relation between specified classes")
+
+    def linked_ids(self, class_name, linked_class_name, record_ids):
+        """ Returns { record_id: [linked_id, ...] } for the specified records through a many-to-many table,
+        e.g. linked_ids('Place', 'Amenity', place_ids). Only the link table is read, one query per chunk of ids """
+
+        if class_name.strip() == "" or not self.__module_names[class_name]:
+            raise IndexError("Specified class name is not valid")
+
+        namespace = self.__module_names[class_name]
+        module = importlib.import_module("models." + namespace)
+        class_ = getattr(module, class_name)
+
+        for relationship in class_.__mapper__.relationships:
+            if relationship.secondary is None or relationship.mapper.class_.__name__ != linked_class_name:
+                continue
+
+            # the columns of the link table that point at the two tables
+            own = [c for c in relationship.secondary.c if c.references(class_.__table__.c.id)][0]
+            linked = [c for c in relationship.secondary.c if c.references(relationship.mapper.class_.__table__.c.id)][0]
+
+            record_ids = list(dict.fromkeys(record_ids))
+            found = {record_id: [] for record_id in record_ids}
+            for start in range(0, len(record_ids), self.__in_chunk_size):
+                chunk = record_ids[start:start + self.__in_chunk_size]
+                for record_id, linked_id in self.__read_query(own).add_columns(linked).where(own.in_(chunk)).all():
+                    found[record_id].append(linked_id)
+
+            return found
+
+        raise IndexError("Unable to load relations data. No relation between specified classes")
+
+    def stream(self, class_name, batch_size = 1000):
+        """ Yields every record of the specified class, e.g. for an export. The records are read-only rows
+        with the same field names as the model objects. They come from a server-side cursor on a connection
+        of their own, batch_size rows at a time, so memory use stays the same however big the table is """
+
+        if class_name.strip() == "" or not self.__module_names[class_name]:
+            raise IndexError("Specified class name is not valid")
+
+        namespace = self.__module_names[class_name]
+        module = importlib.import_module("models." + namespace)
+        class_ = getattr(module, class_name)
+
+        yield from self.__stream_rows(select(class_.__table__), batch_size)
+
+    def stream_relations(self, class_name, linked_class_name, batch_size = 1000):
+        """ Yields (record_id, linked_id) for every link of a many-to-many table,
+        e.g. stream_relations('Place', 'Amenity'). Streamed the same way as stream() """
+
+        if class_name.strip() == "" or not self.__module_names[class_name]:
+            raise IndexError("Specified class name is not valid")
+
+        namespace = self.__module_names[class_name]
+        module = importlib.import_module("models." + namespace)
+        class_ = getattr(module, class_name)
+
+        for relationship in class_.__mapper__.relationships:
+            if relationship.secondary is None or relationship.mapper.class_.__name__ != linked_class_name:
+                continue
+
+            # the columns of the link table that point at the two tables
+            own = [c for c in relationship.secondary.c if c.references(class_.__table__.c.id)][0]
+            linked = [c for c in relationship.secondary.c if c.references(relationship.mapper.class_.__table__.c.id)][0]
+
+            for record_id, linked_id in self.__stream_rows(select(own, linked), batch_size):
+                yield record_id, linked_id
+            return
+
+        raise IndexError("Unable to load relations data. No relation between specified classes")
+
+    def __stream_rows(self, statement, batch_size):
+        """ Runs the statement on its own connection (to a replica if possible) and yields the rows as they arrive.
+        The session isn't used, so the rows don't pile up in it and other requests can carry on using it """
+        engine = self.__read_session().get_bind()
+        with engine.connect() as connection:
+            result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(statement)
+            yield from result
+
+    def get_many(self, class_name, record_ids):
+        """ Returns { record_id: record } for the specified ids that exist, in the order they were asked for.
+        The records are loaded with IN (...) queries - one per chunk of ids rather than one per id """
+
+        if class_name.strip() == "" or not self.__module_names[class_name]:
+            raise IndexError("Specified class name is not valid")
+
+        namespace = self.__module_names[class_name]
+        module = importlib.import_module("models." + namespace)
+        class_ = getattr(module, class_name)
+
+        record_ids = list(dict.fromkeys(record_ids))
+        found = {}
+        for start in range(0, len(record_ids), self.__in_chunk_size):
+            chunk = record_ids[start:start + self.__in_chunk_size]
+            for row in self.__read_query(class_).where(class_.id.in_(chunk)).all():
+                found[row.id] = row
+
+        return {record_id: found[record_id] for record_id in record_ids if record_id in found}
+
+    def __read_query(self, entity):
+        """ Returns a query for a read-only call, on a replica if possible """
+        session = self.__read_session()
+        if session is self.__sessions:
+            return session.query(entity)
+
+        # A replica session keeps its objects around like any other session.
+        # Overwrite them with what comes back from the replica, otherwise they would never change
+        return session.query(entity).populate_existing()
+
+    def __read_session(self):
+        """ Returns the session to use for a read-only call """
+        if len(self.__replicas) == 0 or self.in_transaction():
+            return self.__sessions
+
+        # read-your-writes
+        if self.primary_until() > time.time():
+            return self.__sessions
+
+        with self.__replica_lock:
+            if self.__replica_strategy == "least_connections":
+                # the replica with the fewest connections in use right now
+                replica = min(self.__replicas, key=lambda r: DBStorage.checked_out(r[0]))
+            else:
+                replica = self.__replicas[self.__next_replica % len(self.__replicas)]
+                self.__next_replica += 1
+
+        return replica[1]
+
+    @staticmethod
+    def checked_out(engine):
+        """ Returns the number of connections of the engine that are in use """
+        pool = engine.pool
+        return pool.checkedout() if hasattr(pool, "checkedout") else 0
+
+    @contextmanager
+    def transaction(self):
+        """ Unit of work. The adds and updates made inside the block are sent to the
+        database and committed together at the end of the block instead of one by one.
+        Blocks can be nested - only the outermost one commits.
+        Raises DuplicateRecordError / IndexError at the end of the block if the commit fails """
+        depth = getattr(self.__unit_of_work, "depth", 0)
+        self.__unit_of_work.depth = depth + 1
+
+        try:
+            yield self
+            if depth == 0:
+                self.__commit("records")
+        except:
+            if depth == 0:
+                self.__sessions.rollback()
+            raise
+        finally:
+            self.__unit_of_work.depth = depth
+
+    def in_transaction(self):
+        """ Returns True if the current thread is inside a transaction() block """
+        return getattr(self.__unit_of_work, "depth", 0) > 0
+
+    def __commit(self, description):
+        """ Commits the session. Unique index violations become DuplicateRecordError """
+        try:
+            self.__sessions.commit()
+        except IntegrityError as exc:
+            self.__sessions.rollback()
+            if DBStorage.is_duplicate_error(exc):
+                raise DuplicateRecordError("Unable to save {}. Same unique values as an existing record".format(description)) from exc
+            raise IndexError("Unable to save {}".format(description)) from exc
+
+        self.__unit_of_work.primary_until = time.time() + self.__read_your_writes_seconds
+
+    def primary_until(self):
+        """ Returns until when (epoch seconds) the current request's client has to read from the primary
+        to see its own writes. 0 if it doesn't """
+        return getattr(self.__unit_of_work, "primary_until", 0)
+
+    def read_from_primary_until(self, until):
+        """ Sends the reads of the current request to the primary until the time (epoch seconds), e.g. the
+        primary_until() of an earlier request of the same client. Wall clock time, so that any worker can use it """
+        self.__unit_of_work.primary_until = until
+
+    def __flush(self, description):
+        """ Sends the pending changes of the session without committing them. Unique index violations become
+        DuplicateRecordError. The unit of work can't be committed after that - it is rolled back at its end """
+        try:
+            self.__sessions.flush()
+        except IntegrityError as exc:
+            if DBStorage.is_duplicate_error(exc):
+                raise DuplicateRecordError("Unable to save {}. Same unique values as an existing record".format(description)) from exc
+            raise IndexError("Unable to save {}".format(description)) from exc
+
+    def close_session(self):
+        """ Ends the current thread's sessions. Call at the end of every request - anything not committed is dropped.
+        The next request on this thread may be from another client, so it starts out reading from the replicas again """
+        self.__sessions.remove()
+        for engine, sessions in self.__replicas:
+            sessions.remove()
+        self.__unit_of_work.primary_until = 0
+
     def add(self, class_name, new_record):
         """ Adds another record to specified class """
 
@@ -91,16 +617,32 @@ class DBStorage():
 
         # Assume that the database table already exists so we're not doing CREATE TABLE here
 
-        self.__session.add(new_record)
-        self.__session.commit()
-        self.__session.refresh(new_record)
+        # Uniqueness is enforced by the unique indexes in the database.
+        # No need to look at the existing records first - just try to insert and see what happens.
+        # Overlapping ranges can't be caught by an index, so those are checked first
+        if class_name in self.__interval_fields:
+            table = new_record.__table__
+            self.__check_overlap(class_name, table, new_record.id,
+                                 *(getattr(new_record, f) for f in self.__interval_fields[class_name]))
+
+        self.__sessions.add(new_record)
+        if self.in_transaction():
+            # Send the INSERT now rather than at the end of the unit of work, so that a clash with a unique index
+            # is raised here - where the model can answer with its own 409 message
+            self.__flush("{} record".format(class_name))
+        else:
+            self.__commit("{} record".format(class_name))
+
+        # No refresh() afterwards. The id and timestamps are set by the model itself
+        # and the session doesn't expire them on commit, so there's nothing to read back
 
     def update(self, class_name, record_id, update_data, allowed = None):
-        """ Updates existing record of specified class """
+        """ Updates existing record of specified class.
+        Returns the updated record as a read-only named tuple with one field per column """
 
-        # 1. find the record using the record_id
-        # 2. update the record according to what is specified in the 'allowed' list
-        # 3. 'save' the record back into the db and return it
+        # 1. check the new values using the setters of the model
+        # 2. UPDATE the row directly - no need to load the record first
+        # 3. return the new values of the row (RETURNING, or a plain SELECT if the database can't do that)
 
         if class_name.strip() == "" or not self.__module_names[class_name]:
             raise IndexError("Specified class name is not valid")
@@ -110,28 +652,119 @@ class DBStorage():
         namespace = self.__module_names[class_name]
         module = importlib.import_module("models." + namespace)
         class_ = getattr(module, class_name)
+        table = class_.__table__
 
+        # A throwaway instance runs the setters, so the new values get the same validation as before
+        probe = class_()
+        values = {}
         try:
-            record = self.__session.query(class_).where(class_.id == record_id).limit(1).one()
-        except:
+            for k, v in update_data.items():
+                if allowed is not None and len(allowed) > 0 and k not in allowed:
+                    continue
+                if k in self.__readonly_columns or k not in table.c:
+                    continue
+                setattr(probe, k, v)
+                values[k] = getattr(probe, k)
+        except Exception as exc:
+            raise IndexError("Unable to update record") from exc
+
+        # Don't forget to update the updated_at value! You just updated the record you know...
+        values["updated_at"] = datetime.now()
+
+        fields = self.__interval_fields.get(class_name, ())
+        if any(f in values for f in fields):
+            current = self.__sessions.execute(table.select().where(table.c.id == record_id)).first()
+            if current is None:
+                raise IndexError("Unable to find the record to update")
+            self.__check_overlap(class_name, table, record_id,
+                                 *(values.get(f, getattr(current, f)) for f in fields))
+
+        statement = table.update().where(table.c.id == record_id).values(values)
+        can_return = self.__engine.dialect.update_returning
+        if can_return:
+            statement = statement.returning(*table.c)
+
+        try:
+            result = self.__sessions.execute(statement)
+            row = result.first() if can_return else None
+            if not can_return and result.rowcount > 0:
+                row = self.__sessions.execute(table.select().where(table.c.id == record_id)).first()
+        except IntegrityError as exc:
+            if not self.in_transaction():
+                self.__sessions.rollback()
+            if DBStorage.is_duplicate_error(exc):
+                raise DuplicateRecordError("A {} with the same unique values already exists".format(class_name)) from exc
+            raise IndexError("Unable to update record") from exc
+
+        if row is None:
             raise IndexError("Unable to find the record to update")
 
-        # update the record values
+        # The sessions may already have this record loaded. Make sure they don't keep the old values
+        for session in [self.__sessions] + [replica[1] for replica in self.__replicas]:
+            loaded = session.identity_map.get(identity_key(class_, record_id))
+            if loaded is not None:
+                session.expire(loaded)
 
+        if not self.in_transaction():
+            self.__commit("{} record".format(class_name))
+
+        return self.__record_type(class_name, table)(*(self.__column_value(c, v) for c, v in zip(table.c, row)))
+
+    def __check_overlap(self, class_name, table, record_id, group_id, start, end):
+        """ Raises OverlappingRecordError if [start, end) overlaps another range of the group.
+        The group's row (e.g. the place) is locked until the commit, so that two workers can't
+        both find the dates free and then both save a booking for them """
+        group, start_column, end_column = (table.c[f] for f in self.__interval_fields[class_name])
+        parent = list(group.foreign_keys)[0].column
+        self.__sessions.execute(select(parent).where(parent == group_id).with_for_update())
+
+        clash = self.__sessions.execute(
+            select(table.c.id).where(group == group_id, table.c.id != record_id,
+                                     end_column > start, start_column < end).limit(1)).first()
+        if clash is not None:
+            if not self.in_transaction():
+                self.__sessions.rollback()
+            raise OverlappingRecordError("The {} overlaps another one from {} to {}".format(class_name, start, end))
+
+    def __record_type(self, class_name, table):
+        """ Returns the named tuple type used for the update results of the class """
+        if class_name not in self.__record_types:
+            self.__record_types[class_name] = namedtuple(class_name + "Record", [c.name for c in table.c])
+
+        return self.__record_types[class_name]
+
+    def __column_value(self, column, value):
+        """ Returns the value as the Python type of the column. SQLite's RETURNING gives back numbers
+        as they were sent, before the column's type is applied, e.g. 1 for 1.0 in a Float column """
         try:
-            for k, v in update_data.items():
-                if allowed is not None and len(allowed) > 0:
-                    if k in allowed:
-                        setattr(record, k, v)
-                else:
-                    setattr(record, k, v)
+            python_type = column.type.python_type
+        except NotImplementedError:
+            return value
 
-            # Don't forget to update the updated_at value! You just updated the record you know...
-            record.updated_at = datetime.now()
+        if python_type is float and isinstance(value, int) and not isinstance(value, bool):
+            return float(value)
 
-            self.__session.commit()
-        except:
-            raise IndexError("Unable to update record")
+        return value
+
+    def after_fork(self):
+        """ Drops the pooled connections inherited from the parent process.
+        Forked workers must call this before using the storage so that no two processes share a connection """
+        self.__engine.dispose(close=False)
+        for engine, session in self.__replicas:
+            engine.dispose(close=False)
+
+    def pool_status(self, engine = None):
+        """ Returns the number of connections in the pool (of the primary by default) by state """
+        pool = (engine or self.__engine).pool
+        status = {}
+
+        # Not every kind of pool keeps these numbers (e.g. the one used for in-memory SQLite)
+        for state in ["size", "checkedin", "checkedout", "overflow"]:
+            if hasattr(pool, state):
+                status[state] = getattr(pool, state)()
+
+        return status
 
-        # For safety, don't return the original record. Return a copy instead
-        return deepcopy(record)
+    def replica_pool_status(self):
+        """ Returns the pool_status() of each read replica """
+        return [self.pool_status(engine) for engine, session in self.__replicas]
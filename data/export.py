@@ -0,0 +1,164 @@
+#!/usr/bin/python3
+""" Streams a whole table out as NDJSON or CSV, without loading it all first """
+
+# -- Usage example --
+# python3 -m data.export reviews > reviews.ndjson
+# python3 -m data.export places --format csv --gzip -o places.csv.gz
+# python3 -m data.export place_amenity --format csv
+# The same is served by GET /api/v1/export/<resource>?format=csv&compress=gzip
+#
+# The records come from storage.stream() one batch at a time, are written out and are then forgotten,
+# so exporting a million reviews takes no more memory than exporting ten.
+
+import argparse
+import csv
+import importlib
+import io
+import json
+import sys
+import zlib
+from datetime import datetime
+
+# resource name -> (class_name, linked_class_name). Resources with a linked class are many-to-many tables
+resources = {
+    "amenities": ("Amenity", None),
+    "bookings": ("Booking", None),
+    "cities": ("City", None),
+    "countries": ("Country", None),
+    "places": ("Place", None),
+    "reviews": ("Review", None),
+    "users": ("User", None),
+    "place_amenity": ("Place", "Amenity")
+}
+
+# The module of each model class
+module_names = {
+    "Amenity": "place_amenity",
+    "Booking": "booking",
+    "City": "city",
+    "Country": "country",
+    "Place": "place_amenity",
+    "Review": "review",
+    "User": "user"
+}
+
+# Never exported
+hidden_fields = {
+    "User": ["password"]
+}
+
+# format -> (content type, file extension)
+formats = {
+    "ndjson": ("application/x-ndjson", ".ndjson"),
+    "csv": ("text/csv", ".csv")
+}
+
+# Records per batch: read from the storage at a time, and per chunk of output
+batch_size = 1000
+
+datetime_format = "%Y-%m-%dT%H:%M:%S.%f"
+
+
+def export(storage, resource, output_format = "ndjson", compress = False):
+    """ Returns an iterator of the bytes of the export. Raises IndexError for an unknown resource or format
+    straight away, before anything is read """
+    if resource not in resources:
+        raise IndexError("Unknown resource {}. Use one of: {}".format(resource, ", ".join(resources)))
+    if output_format not in formats:
+        raise IndexError("Unknown format {}. Use one of: {}".format(output_format, ", ".join(formats)))
+
+    lines = ndjson_chunks(rows(storage, resource)) if output_format == "ndjson" else csv_chunks(rows(storage, resource))
+    chunks = (chunk.encode() for chunk in lines)
+    return gzip_chunks(chunks) if compress else chunks
+
+def rows(storage, resource):
+    """ Yields the records of the resource as plain dictionaries: the same fields as the API, with text dates """
+    class_name, linked_class_name = resources[resource]
+
+    if linked_class_name is not None:
+        # e.g. place_amenity -> place_id, amenity_id
+        own_field, linked_field = class_name.lower() + "_id", linked_class_name.lower() + "_id"
+        for record_id, linked_id in storage.stream_relations(class_name, linked_class_name, batch_size):
+            yield {own_field: record_id, linked_field: linked_id}
+        return
+
+    model = getattr(importlib.import_module("models." + module_names[class_name]), class_name)
+    hidden = hidden_fields.get(class_name, [])
+    for record in storage.stream(class_name, batch_size):
+        row = model.output_data(record)
+        yield {k: plain(v) for k, v in row.items() if k not in hidden}
+
+def plain(value):
+    """ FileStorage records give datetime objects - the same text as the DBStorage ones instead """
+    if isinstance(value, datetime):
+        return value.strftime(datetime_format)
+
+    return value
+
+def ndjson_chunks(records):
+    """ Yields the records as JSON text, one per line, batch_size lines at a time """
+    lines = []
+    for record in records:
+        lines.append(json.dumps(record))
+        if len(lines) == batch_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+
+    if len(lines) > 0:
+        yield "\n".join(lines) + "\n"
+
+def csv_chunks(records):
+    """ Yields the records as CSV text with a header line, batch_size lines at a time.
+    The columns are the fields of the first record. An empty table gives nothing at all """
+    buffer = io.StringIO()
+    writer = None
+    count = 0
+    for record in records:
+        if writer is None:
+            writer = csv.DictWriter(buffer, fieldnames=list(record), extrasaction="ignore")
+            writer.writeheader()
+
+        writer.writerow(record)
+        count += 1
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+
+    if buffer.tell() > 0:
+        yield buffer.getvalue()
+
+def gzip_chunks(chunks):
+    """ Compresses the chunks as they go, into a .gz file """
+    # wbits=31 makes zlib write the gzip header and trailer
+    compressor = zlib.compressobj(wbits=31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+
+    yield compressor.flush()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Export a whole table of HBnB Evolution as NDJSON or CSV")
+    parser.add_argument("resource", choices=list(resources))
+    parser.add_argument("--format", choices=list(formats), default="ndjson")
+    parser.add_argument("--gzip", action="store_true", help="compress the output")
+    parser.add_argument("-o", "--output", help="file to write to (default: standard output)")
+    args = parser.parse_args()
+
+    # Only imported now so that --help works without connecting to anything
+    from data import storage
+
+    # All the models have to be loaded before any of them can be used (they refer to each other)
+    for name in sorted(set(module_names.values())):
+        importlib.import_module("models." + name)
+
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        for chunk in export(storage, args.resource, args.format, args.gzip):
+            output.write(chunk)
+    finally:
+        if args.output:
+            output.close()
@@ -1,13 +1,100 @@
 #!/usr/bin/python3
 """This module defines a class to manage file storage for hbnb evolution"""
 
+import bisect
 import json
+import os
+import threading
+from contextlib import contextmanager
+from os import getenv
 from pathlib import Path
+from data import DuplicateRecordError, OverlappingRecordError
+from data.interval_index import IntervalIndex
+from data.link_bitmaps import LinkBitmaps
 
 class FileStorage():
     """ Class for reading data from JSON files """
+
+    # The records, the relations and every index built from them, all in one dictionary:
+    # 'models', 'relations', 'unique_index', 'counts', 'relation_counts', 'sorted_index',
+    # 'place_columns', 'link_bitmaps' and 'intervals'. A reload builds a whole new one and swaps it in,
+    # so a reader that looks up self.__data once sees records and indexes that go together
     __data = {}
-    __classes = ["Amenity", "City", "Country", "Place", "Review", "User"]
+    __classes = ["Amenity", "Booking", "City", "Country", "Place", "Review", "User"]
+
+    # Same as the unique indexes of the database tables
+    __unique_fields = {
+        "Amenity": [("name",)],
+        "City": [("country_id", "name")],
+        "Country": [("code",), ("name",)],
+        "Place": [("name",)],
+        "User": [("email",)]
+    }
+
+    # __data['unique_index'] is { class_name: { fields: { values: record_id } } }
+
+    # Records are counted by these fields, e.g. the number of places in each city.
+    # Same as the (foreign key) indexes of the database tables
+    __counted_fields = {
+        "Booking": [("place_id",), ("user_id",)],
+        "City": [("country_id",)],
+        "Place": [("city_id",), ("host_id",)],
+        "Review": [("place_id",), ("user_id",)]
+    }
+
+    # Older names of some fields, still used by the records in the data files. Same as the models' output_data()
+    __legacy_fields = {
+        "Place": {"host_id": "host_user_id", "city_id": "city", "number_of_bathrooms": "bathrooms"},
+        "Review": {"user_id": "commentor_user_id", "comment": "feedback"}
+    }
+
+    # __data['counts'] is { class_name: { fields: { values: count } } } and __data['relation_counts'] is
+    # { (class_name, linked_class_name): { record_id: count } }, so that counting doesn't need to go through the records
+
+    # Fields with a sorted index, for find_sorted(). Change this before load_data() to index other fields.
+    # Only numbers are indexed (the timestamps are epoch seconds, so they count)
+    sorted_fields = {
+        "Amenity": ["created_at"],
+        "City": ["created_at"],
+        "Country": ["created_at"],
+        "Place": ["price_per_night", "max_guests", "number_of_rooms", "created_at"],
+        "Review": ["rating", "created_at"],
+        "User": ["created_at"]
+    }
+
+    # __data['sorted_index'] is { class_name: { field: [(value, record_id), ...] } } kept in order of value, then id
+
+    # Greater than any record id, for finding the end of a run of equal values
+    __max_id = "\uffff"
+
+    # Fields that find_in_ranges() can filter by. The Place ones are also kept as NumPy arrays (see PlaceColumns)
+    range_fields = {
+        "Place": ["price_per_night", "number_of_rooms", "number_of_bathrooms", "max_guests", "latitude", "longitude"]
+    }
+
+    # __data['place_columns'] stays None if numpy isn't installed
+
+    # __data['link_bitmaps'] is { (class_name, linked_class_name): LinkBitmaps }
+
+    # Records of these classes have a (group, start, end) range, and the ranges in the same group
+    # must not overlap, e.g. two bookings of the same place. Same as DBStorage
+    __interval_fields = {
+        "Booking": ("place_id", "check_in", "check_out")
+    }
+
+    # __data['intervals'] is { class_name: IntervalIndex }
+
+    # The data files and their (mtime, size) when they were last loaded
+    __models_filepath = ""
+    __relations_filepath = ""
+    __file_stats = None
+
+    # Writes and reloads take turns. Reads don't need the lock
+    __write_lock = threading.Lock()
+    __watcher = None
+    __watch_interval = 0
+    __stop_watching = None
+    __reload_listeners = []
 
     # No constructor in this class - doesn't seem like we really need one anyway
 
@@ -17,8 +104,102 @@ class FileStorage():
         models_filepath = "data/models_testing.json" if is_testing else "data/models.json"
         relations_filepath = "data/relations_testing.json" if is_testing else "data/relations.json"
 
-        self.__data['models'] = self.__load_models_data(models_filepath)
-        self.__data['relations'] = self.__load_many_to_many_relations_data(relations_filepath)
+        # Other data files can be used instead, e.g. the ones generated for the benchmarks
+        models_filepath = getenv('HBNB_MODELS_FILE', models_filepath)
+        relations_filepath = getenv('HBNB_RELATIONS_FILE', relations_filepath)
+
+        self.__models_filepath = models_filepath
+        self.__relations_filepath = relations_filepath
+        self.__file_stats = self.__current_file_stats()
+
+        models = self.__load_models_data(models_filepath)
+        relations = self.__load_many_to_many_relations_data(relations_filepath)
+        self.__data = self.__build_data(models, relations)
+
+    def watch_files(self, interval):
+        """ Starts a background thread that checks the data files every 'interval' seconds
+        and reloads them when they change. Requests carry on using the old data until then """
+        self.__watch_interval = interval
+        if interval <= 0 or (self.__watcher is not None and self.__watcher.is_alive()):
+            return
+
+        self.__stop_watching = threading.Event()
+        self.__watcher = threading.Thread(target=self.__watch, name="FileStorage watcher", daemon=True)
+        self.__watcher.start()
+
+    def stop_watching(self):
+        """ Stops the watcher thread and waits for it to finish whatever reload it is in the middle of.
+        A process that is going to fork calls this first: the locks held by a running thread at the time
+        of the fork would stay locked forever in the child. watch_files() or after_fork() starts it again """
+        if self.__watcher is None:
+            return
+
+        self.__stop_watching.set()
+        self.__watcher.join()
+        self.__watcher = None
+
+    def after_fork(self):
+        """ Threads don't survive a fork, so forked workers must call this to get their own watcher """
+        self.__write_lock = threading.Lock()
+        self.__watcher = None
+        self.watch_files(self.__watch_interval)
+
+    def add_reload_listener(self, listener):
+        """ listener(class_name, record_ids) is called for each class whose records were changed by a reload.
+        record_ids are the ids of the records that were removed (can be empty) """
+        self.__reload_listeners.append(listener)
+
+    def reload_if_changed(self):
+        """ Reloads the data files if they have changed since they were last loaded.
+        The files are the source of truth: records added or changed through the API since the
+        last load are replaced by what is in the files. Returns True if the data was reloaded """
+        file_stats = self.__current_file_stats()
+        if file_stats == self.__file_stats:
+            return False
+
+        # Parse everything before touching the current data. If the file is still being
+        # written the JSON will be broken - keep the old data and try again next time
+        try:
+            new_models = self.__load_models_data(self.__models_filepath)
+            new_relations = self.__load_many_to_many_relations_data(self.__relations_filepath)
+        except (ValueError, FileNotFoundError) as exc:
+            print("Error: ", exc)
+            return False
+
+        with self.__write_lock:
+            old_models = self.__data['models']
+            removed = {}
+            counts = [0, 0, 0]
+            for class_name in set(old_models) | set(new_models):
+                old_records = old_models.get(class_name, {})
+                new_records = new_models.get(class_name, {})
+
+                # Records that haven't changed keep their existing dictionary
+                for record_id, record in new_records.items():
+                    if record_id not in old_records:
+                        counts[0] += 1
+                    elif old_records[record_id] == record:
+                        new_records[record_id] = old_records[record_id]
+                    else:
+                        counts[1] += 1
+
+                removed_ids = [record_id for record_id in old_records if record_id not in new_records]
+                counts[2] += len(removed_ids)
+                if len(removed_ids) > 0 or any(new_records[k] is not old_records.get(k) for k in new_records):
+                    removed[class_name] = removed_ids
+
+            # Build the indexes before anything is swapped in, then swap the data and the indexes together.
+            # Readers see either all of the old data and indexes or all of the new ones
+            new_data = self.__build_data(new_models, new_relations)
+            self.__data = new_data
+            self.__file_stats = file_stats
+
+        for class_name, record_ids in removed.items():
+            for listener in self.__reload_listeners:
+                listener(class_name, record_ids)
+
+        print("Data files reloaded: {} added, {} changed, {} removed".format(*counts))
+        return True
 
     def get(self, class_name = "", record_id = ""):
         """ Return all data or data for specified class name and / or id"""
@@ -29,13 +210,211 @@ class FileStorage():
         if class_name not in self.__classes:
             raise IndexError("Unable to load Model data. Specified class name not found")
 
+        # Only look up self.__data once. A reload may swap it at any time.
+        # Classes added after the data files were made (e.g. Booking) may not be in there
+        records = self.__data['models'].get(class_name, {})
         if record_id == "":
-            return self.__data['models'][class_name]
+            return records
         else:
-            if record_id not in self.__data['models'][class_name]:
+            if record_id not in records:
                 raise IndexError("Unable to load Model data. Specified id not found")
 
-            return self.__data['models'][class_name][record_id]
+            return records[record_id]
+
+    def get_relations(self, class_name, linked_class_name):
+        """ Return the many-to-many relation data between the two specified classes
+        e.g. get_relations('Place', 'Amenity') -> { place_id: [amenity_id, ...] } """
+
+        relations = self.__data['relations']
+        if class_name not in relations or linked_class_name not in relations[class_name]:
+            raise IndexError("Unable to load relations data. No relation between specified classes")
+
+        return relations[class_name][linked_class_name]
+
+    def linked_ids(self, class_name, linked_class_name, record_ids):
+        """ Returns { record_id: [linked_id, ...] } for the specified records,
+        e.g. linked_ids('Place', 'Amenity', place_ids). Same as DBStorage """
+        relations = self.get_relations(class_name, linked_class_name)
+        return {record_id: list(relations.get(record_id, [])) for record_id in record_ids}
+
+    def stream(self, class_name, batch_size = 1000):
+        """ Yields every record of the specified class, e.g. for an export. Same as DBStorage.
+        The records are already in memory - only their ids are copied, so writes made meanwhile can't break the loop """
+        if class_name not in self.__classes:
+            raise IndexError("Unable to load Model data. Specified class name not found")
+
+        records = self.__data['models'].get(class_name, {})
+        for record_id in list(records):
+            record = records.get(record_id)
+            if record is not None:
+                yield record
+
+    def stream_relations(self, class_name, linked_class_name, batch_size = 1000):
+        """ Yields (record_id, linked_id) for every link between the two classes,
+        e.g. stream_relations('Place', 'Amenity'). Same as DBStorage """
+        relations = self.get_relations(class_name, linked_class_name)
+        for record_id in list(relations):
+            for linked_id in list(relations.get(record_id, [])):
+                yield record_id, linked_id
+
+    def find(self, class_name, filters = None, offset = 0, limit = None):
+        """ Returns a list of the records of the specified class whose values match all the filters,
+        e.g. find('City', {"country_id": country_id}). With offset / limit the records are ordered by id """
+
+        if class_name not in self.__classes:
+            raise IndexError("Specified class name is not valid")
+
+        filters = filters or {}
+        records = self.__data['models'].get(class_name, {})
+        rows = [record for record in records.values()
+                if all(self.field_value(class_name, record, k) == v for k, v in filters.items())]
+
+        if offset > 0 or limit is not None:
+            rows.sort(key=lambda record: record['id'])
+            rows = rows[offset:] if limit is None else rows[offset:offset + limit]
+
+        return rows
+
+    def get_many(self, class_name, record_ids):
+        """ Returns { record_id: record } for the specified ids that exist, in the order they were asked for """
+
+        if class_name not in self.__classes:
+            raise IndexError("Specified class name is not valid")
+
+        records = self.__data['models'].get(class_name, {})
+        return {record_id: records[record_id] for record_id in dict.fromkeys(record_ids) if record_id in records}
+
+    def existing_ids(self, class_name, record_ids):
+        """ Returns the set of the specified ids that exist for the specified class """
+
+        if class_name not in self.__classes:
+            raise IndexError("Specified class name is not valid")
+
+        records = self.__data['models'].get(class_name, {})
+        return {record_id for record_id in record_ids if record_id in records}
+
+    def find_sorted(self, class_name, field, descending = False, offset = 0, limit = None, low = None, high = None):
+        """ Returns a list of the records of the specified class ordered by the field, only the ones
+        with values from low to high (both included) if given. Uses the sorted index of the field, so
+        this is a binary search plus the records returned - the other records are never looked at.
+        Records without a number in the field are left out """
+
+        if class_name not in self.__classes:
+            raise IndexError("Specified class name is not valid")
+
+        # Only look up self.__data once. A reload may swap it at any time
+        data = self.__data
+        index = data['sorted_index'].get(class_name, {}).get(field)
+        if index is None:
+            raise IndexError("Unable to sort {} records by '{}'".format(class_name, field))
+
+        start = 0 if low is None else bisect.bisect_left(index, (low,))
+        end = len(index) if high is None else bisect.bisect_right(index, (high, self.__max_id))
+        if descending:
+            stop = end - offset
+            first = start if limit is None else max(start, stop - limit)
+            entries = index[first:max(first, stop)][::-1]
+        else:
+            first = start + offset
+            entries = index[first:end if limit is None else min(end, first + limit)]
+
+        records = data['models'].get(class_name, {})
+        return [records[record_id] for value, record_id in entries if record_id in records]
+
+    def find_in_ranges(self, class_name, ranges):
+        """ Returns a list of the records of the specified class whose values are within all the ranges,
+        e.g. find_in_ranges('Place', {"price_per_night": (50, 120), "max_guests": (4, None)}).
+        Both ends are included and None means no limit. Records without a number in a filtered field never match """
+
+        if class_name not in self.__classes:
+            raise IndexError("Specified class name is not valid")
+
+        for field in ranges:
+            if field not in self.range_fields.get(class_name, []):
+                raise IndexError("Unable to filter {} records by '{}'".format(class_name, field))
+
+        # Only look up self.__data once. A reload may swap it at any time
+        data = self.__data
+        records = data['models'].get(class_name, {})
+        columns = data['place_columns']
+
+        if class_name == "Place" and columns is not None:
+            # vectorised - one pass over each filtered array
+            return [records[record_id] for record_id in columns.select(ranges) if record_id in records]
+
+        return [record for record in records.values()
+                if all(FileStorage.is_in_range(record.get(field), low, high) for field, (low, high) in ranges.items())]
+
+    def find_linked_to_all(self, class_name, linked_class_name, linked_ids):
+        """ Returns a list of the records of the specified class that are linked to every one of linked_ids,
+        e.g. find_linked_to_all('Place', 'Amenity', [wifi_id, pool_id]). A few bitmap ANDs, see LinkBitmaps """
+
+        data = self.__data
+        bitmaps = data['link_bitmaps'].get((class_name, linked_class_name))
+        if bitmaps is None:
+            raise IndexError("Unable to load relations data. No relation between specified classes")
+
+        records = data['models'].get(class_name, {})
+        if len(linked_ids) == 0:
+            # every record is linked to all of nothing, including the ones without any links
+            return list(records.values())
+
+        return [records[record_id] for record_id in bitmaps.linked_to_all(linked_ids) if record_id in records]
+
+    def overlapping_groups(self, class_name, group_ids, start, end):
+        """ Returns the set of the group ids that have a record of the class overlapping the dates from start
+        up to (not including) end, e.g. overlapping_groups('Booking', place_ids, check_in, check_out)
+        -> the places that are booked then. A binary search per group, see IntervalIndex """
+
+        if class_name not in self.__interval_fields:
+            raise IndexError("{} records don't have date ranges".format(class_name))
+
+        # the dates are stored as "YYYY-MM-DD" text
+        return self.__data['intervals'][class_name].overlapping_groups(group_ids, start.isoformat(), end.isoformat())
+
+    def count(self, class_name, filters = None):
+        """ Returns the number of records of the specified class whose values match all the filters.
+        Filtering by nothing or by one of the counted fields is a dictionary lookup, anything else is a scan """
+
+        if class_name not in self.__classes:
+            raise IndexError("Specified class name is not valid")
+
+        filters = filters or {}
+        data = self.__data
+        if len(filters) == 0:
+            return len(data['models'].get(class_name, {}))
+
+        fields = tuple(sorted(filters))
+        counts = data['counts'].get(class_name, {})
+        if fields in counts:
+            return counts[fields].get(tuple(filters[f] for f in fields), 0)
+
+        return len(self.find(class_name, filters))
+
+    def count_relations(self, class_name, linked_class_name, record_id):
+        """ Returns the number of linked_class_name records linked to the record,
+        e.g. count_relations('Place', 'Amenity', place_id) or count_relations('Amenity', 'Place', amenity_id) """
+
+        counts = self.__data['relation_counts'].get((class_name, linked_class_name))
+        if counts is None:
+            raise IndexError("Unable to load relations data. No relation between specified classes")
+
+        return counts.get(record_id, 0)
+
+    @contextmanager
+    def transaction(self):
+        """ Same interface as DBStorage.transaction(). Writes go straight into memory so there's nothing to batch """
+        yield self
+
+    def close_session(self):
+        """ Same interface as DBStorage.close_session(). There are no sessions here """
+
+    def primary_until(self):
+        """ Same interface as DBStorage.primary_until(). There are no replicas here """
+        return 0
+
+    def read_from_primary_until(self, until):
+        """ Same interface as DBStorage.read_from_primary_until(). There are no replicas here """
 
     def add(self, class_name, new_record):
         """ Adds another entry to specified class """
@@ -43,15 +422,24 @@ class FileStorage():
         if class_name.strip() == "" or class_name not in self.__classes:
             raise IndexError("Specified class name is not valid")
 
-        # create if it doesn't exist
-        if class_name not in self.__data['models']:
-            self.__data['models'][class_name] = {}
+        with self.__write_lock:
+            # reloads hold the lock too, so this is the current data until the end of the block
+            data = self.__data
+
+            # create if it doesn't exist
+            if class_name not in data['models']:
+                data['models'][class_name] = {}
 
-        if new_record['id'] in self.__data['models'][class_name]:
-            raise IndexError("An item with the same id already exists")
+            if new_record['id'] in data['models'][class_name]:
+                raise IndexError("An item with the same id already exists")
 
-        # add to existing data and return
-        self.__data['models'][class_name][new_record['id']] = new_record
+            # a dictionary lookup per unique index instead of going through all the records
+            self.__check_unique(data, class_name, new_record['id'], new_record)
+            self.__check_overlap(data, class_name, new_record['id'], new_record)
+
+            # add to existing data and return
+            data['models'][class_name][new_record['id']] = new_record
+            self.__index_record(data, class_name, new_record)
 
     def update(self, class_name, record_id, update_data, allowed = None):
         """ Updates existing entry of specified class """
@@ -60,24 +448,240 @@ class FileStorage():
         # 2. update the record according to what is specified in the 'allowed' list
         # 3. 'save' the record back into memory and return it
 
-        if class_name in self.__classes:
-            if class_name not in self.__data['models'] or record_id not in self.__data['models'][class_name]:
-                raise IndexError("Unable to find the record to update")
+        with self.__write_lock:
+            # reloads hold the lock too, so this is the current data until the end of the block
+            data = self.__data
+
+            if class_name in self.__classes:
+                if class_name not in data['models'] or record_id not in data['models'][class_name]:
+                    raise IndexError("Unable to find the record to update")
 
-        record = self.get(class_name, record_id)
+            record = self.get(class_name, record_id)
 
-        # update the record values
-        for k, v in update_data.items():
-            if allowed is not None and len(allowed) > 0:
-                if k in allowed:
-                    record[k] = v
-            else:
-                record[k] = v
+            # work out the new values first so that nothing changes if they clash with another record
+            new_values = {}
+            for k, v in update_data.items():
+                if allowed is not None and len(allowed) > 0:
+                    if k in allowed:
+                        new_values[k] = v
+                else:
+                    new_values[k] = v
 
-        self.__data['models'][class_name][record_id] = record
+            self.__check_unique(data, class_name, record_id, {**record, **new_values})
+            self.__check_overlap(data, class_name, record_id, {**record, **new_values})
+
+            # update the record values
+            self.__unindex_unique(data['unique_index'], class_name, record)
+            self.__count(data['counts'], class_name, record, -1)
+            self.__unindex_sorted(data['sorted_index'], class_name, record)
+            self.__unindex_interval(data['intervals'], class_name, record)
+            record.update(new_values)
+            self.__index_record(data, class_name, record)
+
+            data['models'][class_name][record_id] = record
 
         return record
 
+    def __watch(self):
+        """ Body of the watcher thread """
+        while not self.__stop_watching.wait(self.__watch_interval):
+            try:
+                self.reload_if_changed()
+            except Exception as exc:
+                # Never let the watcher die - the next change might load fine
+                print("Error: ", exc)
+
+    def __current_file_stats(self):
+        """ Returns the (mtime, size) of the data files. Missing files count as (0, 0) """
+        stats = []
+        for filepath in [self.__models_filepath, self.__relations_filepath]:
+            try:
+                stat = os.stat(filepath)
+                stats.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stats.append((0, 0))
+
+        return stats
+
+    def __build_data(self, models, relations):
+        """ Returns a new __data with the records, the relations and all the indexes built from them.
+        Nothing is changed, so readers carry on using the current __data meanwhile """
+        counts, relation_counts = self.__build_counts(models, relations)
+        return {
+            'models': models,
+            'relations': relations,
+            'unique_index': self.__build_unique_index(models),
+            'counts': counts,
+            'relation_counts': relation_counts,
+            'sorted_index': self.__build_sorted_index(models),
+            'place_columns': self.__build_place_columns(models),
+            'link_bitmaps': self.__build_link_bitmaps(relations),
+            'intervals': self.__build_intervals(models)
+        }
+
+    def __index_record(self, data, class_name, record):
+        """ Adds the record to all the indexes of its class """
+        self.__index_unique(data['unique_index'], class_name, record)
+        self.__count(data['counts'], class_name, record, 1)
+        self.__index_sorted(data['sorted_index'], class_name, record)
+        self.__index_interval(data['intervals'], class_name, record)
+        if class_name == "Place" and data['place_columns'] is not None:
+            data['place_columns'].set(record)
+
+    def __build_unique_index(self, models):
+        """ Returns the unique indexes of the records """
+        unique_index = {}
+        for class_name, records in models.items():
+            for record in records.values():
+                self.__index_unique(unique_index, class_name, record)
+
+        return unique_index
+
+    def __check_unique(self, data, class_name, record_id, record):
+        """ Raises DuplicateRecordError if the record has the same unique values as another record """
+        for fields, index in data['unique_index'].get(class_name, {}).items():
+            owner = index.get(tuple(record.get(f) for f in fields))
+            if owner is not None and owner != record_id:
+                raise DuplicateRecordError("A {} with the same {} already exists".format(class_name, " and ".join(fields)))
+
+    def __index_unique(self, unique_index, class_name, record):
+        """ Adds the unique values of the record to the indexes """
+        for fields in self.__unique_fields.get(class_name, []):
+            index = unique_index.setdefault(class_name, {}).setdefault(fields, {})
+            index[tuple(record.get(f) for f in fields)] = record['id']
+
+    def __unindex_unique(self, unique_index, class_name, record):
+        """ Removes the unique values of the record from the indexes """
+        for fields in self.__unique_fields.get(class_name, []):
+            index = unique_index.get(class_name, {}).get(fields, {})
+            values = tuple(record.get(f) for f in fields)
+            if index.get(values) == record['id']:
+                del index[values]
+
+    def __build_counts(self, models, relations):
+        """ Returns the counters of the records and of the relations """
+        counts = {}
+        for class_name, records in models.items():
+            for record in records.values():
+                self.__count(counts, class_name, record, 1)
+
+        # The relations are stored one way round, e.g. { place_id: [amenity_id, ...] }. Count both ways
+        relation_counts = {}
+        for class_name, linked in relations.items():
+            for linked_class_name, class_relations in linked.items():
+                forward = relation_counts.setdefault((class_name, linked_class_name), {})
+                backward = relation_counts.setdefault((linked_class_name, class_name), {})
+                for record_id, linked_ids in class_relations.items():
+                    forward[record_id] = len(linked_ids)
+                    for linked_id in linked_ids:
+                        backward[linked_id] = backward.get(linked_id, 0) + 1
+
+        return counts, relation_counts
+
+    def __count(self, counts, class_name, record, change):
+        """ Adds change (1 or -1) to the counters of the record's values """
+        for fields in self.__counted_fields.get(class_name, []):
+            counter = counts.setdefault(class_name, {}).setdefault(fields, {})
+            values = tuple(self.field_value(class_name, record, f) for f in fields)
+            counter[values] = counter.get(values, 0) + change
+            if counter[values] <= 0:
+                del counter[values]
+
+    def __build_sorted_index(self, models):
+        """ Returns the sorted indexes of the records. Sorting everything once is quicker than inserting one by one """
+        sorted_index = {}
+        for class_name, fields in self.sorted_fields.items():
+            records = models.get(class_name, {}).values()
+            for field in fields:
+                entries = [(record[field], record['id']) for record in records if FileStorage.is_sortable(record.get(field))]
+                entries.sort()
+                sorted_index.setdefault(class_name, {})[field] = entries
+
+        return sorted_index
+
+    def __index_sorted(self, sorted_index, class_name, record):
+        """ Adds the record to the sorted indexes of its class """
+        for field in self.sorted_fields.get(class_name, []):
+            if FileStorage.is_sortable(record.get(field)):
+                bisect.insort(sorted_index.setdefault(class_name, {}).setdefault(field, []), (record[field], record['id']))
+
+    def __unindex_sorted(self, sorted_index, class_name, record):
+        """ Removes the record from the sorted indexes of its class """
+        for field in self.sorted_fields.get(class_name, []):
+            index = sorted_index.get(class_name, {}).get(field, [])
+            entry = (record.get(field), record['id'])
+            position = bisect.bisect_left(index, entry) if FileStorage.is_sortable(entry[0]) else len(index)
+            if position < len(index) and index[position] == entry:
+                del index[position]
+
+    def __build_place_columns(self, models):
+        """ Returns the NumPy arrays of the Place fields, or None without numpy """
+        try:
+            # Only import numpy when it is actually needed
+            from data.place_columns import PlaceColumns
+        except ImportError:
+            # find_in_ranges() goes through the records one by one instead
+            return None
+
+        return PlaceColumns(models.get("Place", {}).values(), self.range_fields["Place"])
+
+    def __build_link_bitmaps(self, relations):
+        """ Returns the link bitmaps of the relations """
+        link_bitmaps = {}
+        for class_name, linked in relations.items():
+            for linked_class_name, class_relations in linked.items():
+                link_bitmaps[(class_name, linked_class_name)] = LinkBitmaps(class_relations)
+
+        return link_bitmaps
+
+    def __build_intervals(self, models):
+        """ Returns the interval indexes of the records """
+        intervals = {class_name: IntervalIndex() for class_name in self.__interval_fields}
+        for class_name in self.__interval_fields:
+            for record in models.get(class_name, {}).values():
+                self.__index_interval(intervals, class_name, record)
+
+        return intervals
+
+    def __check_overlap(self, data, class_name, record_id, record):
+        """ Raises OverlappingRecordError if the record's range overlaps another one of the same group """
+        if class_name not in self.__interval_fields:
+            return
+
+        group, start, end = (record.get(f) for f in self.__interval_fields[class_name])
+        if data['intervals'][class_name].overlaps(group, start, end, record_id):
+            raise OverlappingRecordError("The {} overlaps another one from {} to {}".format(class_name, start, end))
+
+    def __index_interval(self, intervals, class_name, record):
+        """ Adds the record's range to the interval index of its class """
+        if class_name in self.__interval_fields:
+            group, start, end = (record.get(f) for f in self.__interval_fields[class_name])
+            intervals[class_name].add(group, start, end, record['id'])
+
+    def __unindex_interval(self, intervals, class_name, record):
+        """ Removes the record's range from the interval index of its class """
+        if class_name in self.__interval_fields:
+            group, start, end = (record.get(f) for f in self.__interval_fields[class_name])
+            intervals[class_name].remove(group, start, end, record['id'])
+
+    def field_value(self, class_name, record, field):
+        """ Returns the value of the field, looking under its older name if the record doesn't have the new one """
+        if field in record:
+            return record[field]
+
+        legacy = self.__legacy_fields.get(class_name, {}).get(field)
+        return record.get(legacy) if legacy is not None else None
+
+    @staticmethod
+    def is_in_range(value, low, high):
+        """ Returns True if the value is a number from low to high. None means no limit """
+        return FileStorage.is_sortable(value) and (low is None or value >= low) and (high is None or value <= high)
+
+    @staticmethod
+    def is_sortable(value):
+        """ Returns True if the value can go in a sorted index """
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+
     def __load_models_data(self, filepath):
         """ Load JSON data from models file and returns as dictionary """
         temp = {}
@@ -0,0 +1,332 @@
+#!/usr/bin/python3
+""" Generates synthetic but referentially consistent data for all the models """
+
+# -- Usage example --
+# python3 -m data.generate --size 100k --json data/generated
+# python3 -m data.generate --size 1m --reviews 5000000 --review-skew 1.2 --sql hbnb_1m.sql
+# python3 -m data.generate --places 50000 --users 10000 --seed 42 --db    (inserts into the configured database)
+#
+# The ids are derived from the class name and the row number (uuid5), so any id can be
+# worked out again later without keeping the generated data around. Rows are written out as they
+# are generated, so memory use stays the same no matter how many rows are asked for.
+
+import argparse
+import json
+import math
+import random
+import sys
+import uuid
+from datetime import datetime
+
+id_namespace = uuid.UUID("6f1b0c3e-2a47-4f0e-9d55-0c6b1f6a7e21")
+
+# Rows per table for the standard dataset sizes. The size is roughly the total number of rows
+dataset_sizes = {
+    "1k": {"Country": 10, "City": 40, "User": 200, "Place": 200, "Amenity": 20, "Place_to_Amenity": 330, "Review": 200},
+    "100k": {"Country": 100, "City": 2000, "User": 20000, "Place": 20000, "Amenity": 50, "Place_to_Amenity": 37850, "Review": 20000},
+    "1m": {"Country": 250, "City": 15000, "User": 200000, "Place": 200000, "Amenity": 100, "Place_to_Amenity": 384650, "Review": 200000}
+}
+
+# The order matters - a row can only refer to rows of the classes that come before it
+model_order = ["Country", "City", "User", "Amenity", "Place", "Review"]
+
+table_names = {
+    "Country": "countries",
+    "City": "cities",
+    "User": "users",
+    "Amenity": "amenities",
+    "Place": "places",
+    "Review": "reviews",
+    "Place_to_Amenity": "place_amenity"
+}
+
+letters = "abcdefghijklmnopqrstuvwxyz"
+
+
+def record_id(class_name, index):
+    """ Returns the id of the specified row of the specified class """
+    return str(uuid.uuid5(id_namespace, "{}-{}".format(class_name, index)))
+
+def letters_for(index, length = 6):
+    """ Returns a unique letters-only word for the index (names can't have digits in them) """
+    word = ""
+    for _ in range(length):
+        index, remainder = divmod(index, len(letters))
+        word = letters[remainder] + word
+    return word
+
+def country_code(index):
+    """ Returns a unique two letter country code. There are only 676 of them """
+    return letters_for(index, 2).upper()
+
+
+class Picker():
+    """ Picks row numbers from 0 to n - 1, either uniformly or following a Zipf-like distribution """
+
+    def __init__(self, n, exponent, rng):
+        """ An exponent of 0 means uniform. The bigger the exponent, the more the popular rows get picked """
+        self.n = n
+        self.exponent = exponent
+        self.rng = rng
+
+        # Popular rows shouldn't all be at the start of the table, so the ranks are scattered
+        # over the rows with a multiplier that has no common factor with n
+        self.multiplier = 7919
+        while math.gcd(self.multiplier, n) != 1:
+            self.multiplier += 2
+
+    def pick(self):
+        """ Returns a row number """
+        if self.exponent == 0:
+            return self.rng.randrange(self.n)
+
+        # Inverse of the (continuous) power law CDF. Gives a rank between 1 and n
+        u = self.rng.random()
+        if self.exponent == 1:
+            rank = self.n ** u
+        else:
+            rank = (1 + u * (self.n ** (1 - self.exponent) - 1)) ** (1 / (1 - self.exponent))
+
+        rank = min(self.n, int(rank)) - 1
+        return (rank * self.multiplier) % self.n
+
+
+def generate_rows(class_name, counts, seed = 0, skew = None):
+    """ Yields the rows of the specified class one by one. created_at / updated_at are timestamps.
+    skew is an optional dict of "Class.foreign_key" -> exponent, see Picker """
+    rng = random.Random("{}-{}".format(seed, class_name))
+    now = datetime.now().timestamp()
+    skew = skew or {}
+
+    def picker(key, parent_class_name):
+        """ Returns a Picker for the foreign key """
+        return Picker(counts[parent_class_name], skew.get(key, 0), rng)
+
+    if class_name == "Place":
+        hosts = picker("Place.host_id", "User")
+        cities = picker("Place.city_id", "City")
+    elif class_name == "Review":
+        places = picker("Review.place_id", "Place")
+        users = picker("Review.user_id", "User")
+
+    for i in range(counts[class_name]):
+        created_at = now - rng.uniform(0, 365 * 24 * 3600)
+        row = {"id": record_id(class_name, i)}
+
+        if class_name == "Country":
+            row["name"] = "Country " + letters_for(i).capitalize()
+            row["code"] = country_code(i)
+        elif class_name == "City":
+            row["country_id"] = record_id("Country", rng.randrange(counts["Country"]))
+            row["name"] = "City " + letters_for(i).capitalize()
+        elif class_name == "User":
+            row["first_name"] = letters_for(i).capitalize()
+            row["last_name"] = letters_for(rng.randrange(10 ** 6)).capitalize()
+            row["email"] = "user{}@example.com".format(i)
+            row["password"] = "password{}".format(i)
+        elif class_name == "Amenity":
+            row["name"] = "Amenity " + letters_for(i).capitalize()
+        elif class_name == "Place":
+            row["host_id"] = record_id("User", hosts.pick())
+            row["city_id"] = record_id("City", cities.pick())
+            row["name"] = "Place " + letters_for(i)
+            row["description"] = "A lovely place number {}".format(i)
+            row["address"] = "{} Some Street".format(i)
+            row["latitude"] = round(rng.uniform(-90, 90), 6)
+            row["longitude"] = round(rng.uniform(-180, 180), 6)
+            row["number_of_rooms"] = rng.randint(1, 8)
+            row["number_of_bathrooms"] = rng.randint(1, 4)
+            row["max_guests"] = rng.randint(1, 16)
+            row["price_per_night"] = rng.randint(20, 1000)
+        elif class_name == "Review":
+            row["user_id"] = record_id("User", users.pick())
+            row["place_id"] = record_id("Place", places.pick())
+            row["comment"] = "Review number {} of this place".format(i)
+            row["rating"] = rng.randint(0, 5)
+
+        row["created_at"] = created_at
+        row["updated_at"] = created_at
+        yield row
+
+def generate_place_amenities(counts, seed = 0):
+    """ Yields unique (place_id, amenity_id) pairs """
+    rng = random.Random("{}-Place_to_Amenity".format(seed))
+    total = min(counts["Place_to_Amenity"], counts["Place"] * counts["Amenity"])
+
+    # Spread the links over the places in order so we never need to remember which pairs were used
+    per_place, extra = divmod(total, counts["Place"])
+    for i in range(counts["Place"]):
+        wanted = per_place + (1 if i < extra else 0)
+        for amenity_index in rng.sample(range(counts["Amenity"]), wanted):
+            yield record_id("Place", i), record_id("Amenity", amenity_index)
+
+
+def write_json(counts, models_filepath, relations_filepath, seed = 0, skew = None):
+    """ Writes the data in the FileStorage format. Rows are written as they are generated """
+    with open(models_filepath, "w") as f:
+        f.write("{\n")
+        for n, class_name in enumerate(model_order):
+            f.write('    "{}": [\n'.format(class_name))
+            for i, row in enumerate(generate_rows(class_name, counts, seed, skew)):
+                f.write(("        " if i == 0 else ",\n        ") + json.dumps(row))
+            f.write("\n    ]" + (",\n" if n < len(model_order) - 1 else "\n"))
+        f.write("}\n")
+
+    with open(relations_filepath, "w") as f:
+        f.write('{\n    "Place_to_Amenity": [\n')
+        for i, (place_id, amenity_id) in enumerate(generate_place_amenities(counts, seed)):
+            row = {"place_id": place_id, "amenity_id": amenity_id}
+            f.write(("        " if i == 0 else ",\n        ") + json.dumps(row))
+        f.write("\n    ]\n}\n")
+
+def sql_value(value):
+    """ Returns the value as a MySQL literal """
+    if value is None:
+        return "NULL"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, datetime):
+        value = value.strftime("%Y-%m-%d %H:%M:%S")
+    return "'" + str(value).replace("\\", "\\\\").replace("'", "\\'") + "'"
+
+def write_sql(counts, sql_filepath, seed = 0, skew = None, rows_per_insert = 1000):
+    """ Writes the data as a MySQL script with multi-row INSERTs, like the dump in data/hbnb_evo_db.sql.
+    The tables must exist already, e.g. mysql hbnb_evo_db < data/hbnb_evo_db.sql first """
+
+    def write_inserts(f, table_name, rows):
+        """ Writes the rows as INSERT statements of rows_per_insert rows each """
+        columns = None
+        values = []
+        for row in rows:
+            if columns is None:
+                columns = list(row.keys())
+            values.append("(" + ",".join(sql_value(row[column]) for column in columns) + ")")
+            if len(values) == rows_per_insert:
+                f.write(insert_statement(table_name, columns, values))
+                values = []
+        if len(values) > 0:
+            f.write(insert_statement(table_name, columns, values))
+
+    def insert_statement(table_name, columns, values):
+        """ Returns one INSERT statement """
+        return "INSERT INTO `{}` ({}) VALUES {};\n".format(
+            table_name, ",".join("`{}`".format(c) for c in columns), ",".join(values))
+
+    with open(sql_filepath, "w") as f:
+        f.write("-- Generated by data/generate.py (seed {})\n".format(seed))
+        f.write("SET @OLD_UNIQUE_CHECKS=@@UNIQUE_CHECKS, UNIQUE_CHECKS=0;\n")
+        f.write("SET @OLD_FOREIGN_KEY_CHECKS=@@FOREIGN_KEY_CHECKS, FOREIGN_KEY_CHECKS=0;\n")
+        f.write("SET autocommit=0;\n\n")
+
+        for class_name in model_order:
+            table_name = table_names[class_name]
+            f.write("ALTER TABLE `{}` DISABLE KEYS;\n".format(table_name))
+            write_inserts(f, table_name, (with_datetimes(row) for row in generate_rows(class_name, counts, seed, skew)))
+            f.write("ALTER TABLE `{}` ENABLE KEYS;\nCOMMIT;\n\n".format(table_name))
+
+        pairs = ({"place_id": p, "amenity_id": a} for p, a in generate_place_amenities(counts, seed))
+        write_inserts(f, table_names["Place_to_Amenity"], pairs)
+        f.write("COMMIT;\n\n")
+
+        f.write("SET FOREIGN_KEY_CHECKS=@OLD_FOREIGN_KEY_CHECKS;\n")
+        f.write("SET UNIQUE_CHECKS=@OLD_UNIQUE_CHECKS;\n")
+        f.write("SET autocommit=1;\n")
+
+def with_datetimes(row):
+    """ Turns the created_at / updated_at timestamps of the row into datetimes for the database """
+    row["created_at"] = datetime.fromtimestamp(row["created_at"])
+    row["updated_at"] = datetime.fromtimestamp(row["updated_at"])
+    return row
+
+def batches(rows, batch_size):
+    """ Groups the rows into lists of batch_size """
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if len(batch) > 0:
+        yield batch
+
+def write_db(counts, engine, seed = 0, skew = None, batch_size = 5000):
+    """ Inserts the data into the database of the engine. The tables must exist already """
+    # imported here so that the JSON / SQL side can be used without the models
+    from data import Base
+    from data.migrate import load_models
+
+    load_models()
+
+    with engine.begin() as conn:
+        for class_name in model_order:
+            table = Base.metadata.tables[table_names[class_name]]
+            rows = (with_datetimes(row) for row in generate_rows(class_name, counts, seed, skew))
+            for batch in batches(rows, batch_size):
+                conn.execute(table.insert(), batch)
+
+        table = Base.metadata.tables[table_names["Place_to_Amenity"]]
+        pairs = ({"place_id": p, "amenity_id": a} for p, a in generate_place_amenities(counts, seed))
+        for batch in batches(pairs, batch_size):
+            conn.execute(table.insert(), batch)
+
+
+def main():
+    """ Parse the command line and write the data wherever it was asked for """
+    parser = argparse.ArgumentParser(description="Generate synthetic data for HBnB Evolution")
+    parser.add_argument("--size", default="1k", choices=list(dataset_sizes),
+                        help="base number of rows per table (default: %(default)s)")
+    for class_name, option in [("Country", "countries"), ("City", "cities"), ("User", "users"),
+                               ("Place", "places"), ("Amenity", "amenities"),
+                               ("Place_to_Amenity", "place-amenities"), ("Review", "reviews")]:
+        parser.add_argument("--" + option, type=int, dest=class_name,
+                            help="number of {} rows (overrides --size)".format(table_names[class_name]))
+    parser.add_argument("--seed", type=int, default=0, help="same seed, same data (default: %(default)s)")
+    parser.add_argument("--review-skew", type=float, default=0,
+                        help="Zipf exponent for reviews per place, 0 is uniform (default: %(default)s)")
+    parser.add_argument("--reviewer-skew", type=float, default=0, help="Zipf exponent for reviews per user")
+    parser.add_argument("--host-skew", type=float, default=0, help="Zipf exponent for places per host")
+    parser.add_argument("--city-skew", type=float, default=0, help="Zipf exponent for places per city")
+    parser.add_argument("--json", metavar="DIR", help="write models.json and relations.json to DIR")
+    parser.add_argument("--sql", metavar="FILE", help="write a MySQL bulk-load script to FILE")
+    parser.add_argument("--db", action="store_true", help="insert into the database configured by the HBNB_* variables")
+    args = parser.parse_args()
+
+    if not args.json and not args.sql and not args.db:
+        parser.error("nothing to do. Use --json, --sql and / or --db")
+
+    counts = dict(dataset_sizes[args.size])
+    for class_name in counts:
+        if getattr(args, class_name) is not None:
+            counts[class_name] = getattr(args, class_name)
+
+    if counts["Country"] > 26 * 26:
+        parser.error("there are only {} two letter country codes".format(26 * 26))
+    for class_name in ["Country", "City", "User", "Place"]:
+        if counts[class_name] < 1:
+            parser.error("at least one {} row is needed".format(table_names[class_name]))
+
+    skew = {
+        "Review.place_id": args.review_skew,
+        "Review.user_id": args.reviewer_skew,
+        "Place.host_id": args.host_skew,
+        "Place.city_id": args.city_skew
+    }
+
+    if args.json:
+        from pathlib import Path
+        Path(args.json).mkdir(parents=True, exist_ok=True)
+        write_json(counts, Path(args.json) / "models.json", Path(args.json) / "relations.json", args.seed, skew)
+        print("JSON data written to {}".format(args.json), file=sys.stderr)
+
+    if args.sql:
+        write_sql(counts, args.sql, args.seed, skew)
+        print("SQL written to {}".format(args.sql), file=sys.stderr)
+
+    if args.db:
+        from data.db_storage import DBStorage
+        write_db(counts, DBStorage.new_engine(), args.seed, skew)
+        print("Data inserted into the database", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -31,7 +31,8 @@ CREATE TABLE `amenities` (
   `created_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
   `updated_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
   `name` varchar(128) NOT NULL,
-  PRIMARY KEY (`id`)
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_amenities_name` (`name`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
@@ -43,6 +44,36 @@ CREATE TABLE `amenities` (
 INSERT INTO `amenities` VALUES ('036bc824-74ed-44dc-a183-1ab6c4878fc2','2024-06-02 15:32:16','2024-06-02 15:32:16','TV'),('2ec8cf22-e5ea-4a1f-aedd-89f15fcc60e9','2024-06-02 15:32:16','2024-06-02 15:32:16','Toilet'),('3ca936e3-8a1e-4313-8308-9c94d5918437','2024-06-02 15:32:16','2024-06-02 15:32:16','Wi-fi'),('544cd593-7475-494d-ba3a-b5ec66b3945d','2024-06-02 15:32:16','2024-06-02 15:32:16','Mini-fridge'),('83874c62-1902-4572-b76a-5cffb7a08a91','2024-06-02 15:32:16','2024-06-02 15:32:16','Air-con');
 /*!40000 ALTER TABLE `amenities` ENABLE KEYS */;
 
+--
+-- Table structure for table `bookings`
+--
+
+DROP TABLE IF EXISTS `bookings`;
+/*!40101 SET @saved_cs_client     = @@character_set_client */;
+/*!50503 SET character_set_client = utf8mb4 */;
+CREATE TABLE `bookings` (
+  `id` varchar(60) NOT NULL,
+  `created_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `updated_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
+  `place_id` varchar(60) NOT NULL,
+  `user_id` varchar(60) NOT NULL,
+  `check_in` date NOT NULL,
+  `check_out` date NOT NULL,
+  PRIMARY KEY (`id`),
+  KEY `ix_bookings_place_id_check_out` (`place_id`,`check_out`),
+  KEY `ix_bookings_user_id` (`user_id`),
+  CONSTRAINT `bookings_ibfk_1` FOREIGN KEY (`place_id`) REFERENCES `places` (`id`),
+  CONSTRAINT `bookings_ibfk_2` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
+/*!40101 SET character_set_client = @saved_cs_client */;
+
+--
+-- Dumping data for table `bookings`
+--
+
+/*!40000 ALTER TABLE `bookings` DISABLE KEYS */;
+/*!40000 ALTER TABLE `bookings` ENABLE KEYS */;
+
 --
 -- Table structure for table `cities`
 --
@@ -57,6 +88,7 @@ CREATE TABLE `cities` (
   `name` varchar(128) NOT NULL,
   `country_id` varchar(60) NOT NULL,
   PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_cities_country_id_name` (`country_id`,`name`),
   KEY `country_id` (`country_id`),
   CONSTRAINT `cities_ibfk_1` FOREIGN KEY (`country_id`) REFERENCES `countries` (`id`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
@@ -83,7 +115,9 @@ CREATE TABLE `countries` (
   `updated_at` datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
   `name` varchar(128) NOT NULL,
   `code` varchar(2) NOT NULL,
-  PRIMARY KEY (`id`)
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_countries_code` (`code`),
+  UNIQUE KEY `uq_countries_name` (`name`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
@@ -143,6 +177,7 @@ CREATE TABLE `places` (
   `latitude` float DEFAULT NULL,
   `longitude` float DEFAULT NULL,
   PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_places_name` (`name`),
   KEY `city_id` (`city_id`),
   KEY `host_id` (`host_id`),
   CONSTRAINT `places_ibfk_1` FOREIGN KEY (`city_id`) REFERENCES `cities` (`id`),
@@ -203,7 +238,8 @@ CREATE TABLE `users` (
   `password` varchar(128) NOT NULL,
   `first_name` varchar(128) DEFAULT NULL,
   `last_name` varchar(128) DEFAULT NULL,
-  PRIMARY KEY (`id`)
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `uq_users_email` (`email`)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 /*!40101 SET character_set_client = @saved_cs_client */;
 
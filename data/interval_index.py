@@ -0,0 +1,50 @@
+#!/usr/bin/python3
+"""This module defines an index of date ranges that must not overlap within a group, e.g. the bookings of each place"""
+
+# -- Usage example --
+# bookings = IntervalIndex()
+# bookings.add(place_id, "2026-11-01", "2026-11-05", booking_id)      -> from the 1st up to (not including) the 5th
+# bookings.overlaps(place_id, "2026-11-04", "2026-11-06")             -> True
+# bookings.overlapping_groups(place_ids, "2026-11-05", "2026-11-08")  -> the place ids that are booked then
+#
+# The ranges of a group never overlap, so once they are sorted by start their ends are sorted too.
+# That makes the range that starts last before a given end the only one that can overlap it,
+# and it is found with a binary search - however many ranges the group has.
+
+import bisect
+
+class IntervalIndex():
+    """ Sorted runs of non-overlapping [start, end) ranges per group. Starts / ends can be anything
+    that sorts in date order, e.g. "YYYY-MM-DD" strings """
+    __groups = None
+
+    def __init__(self):
+        """ Starts off empty """
+        # group -> [(start, end, record_id), ...] sorted by start
+        self.__groups = {}
+
+    def overlaps(self, group, start, end, ignore_id = None):
+        """ Returns True if a range of the group other than ignore_id overlaps [start, end) """
+        entries = self.__groups.get(group, [])
+        position = bisect.bisect_left(entries, (end,)) - 1
+
+        # Step over the range being replaced, if that's the one found
+        while position >= 0 and entries[position][2] == ignore_id:
+            position -= 1
+
+        return position >= 0 and entries[position][1] > start
+
+    def overlapping_groups(self, groups, start, end):
+        """ Returns the set of the groups that have a range overlapping [start, end) """
+        return {group for group in groups if self.overlaps(group, start, end)}
+
+    def add(self, group, start, end, record_id):
+        """ Adds a range to the group. Check overlaps() first - this doesn't """
+        bisect.insort(self.__groups.setdefault(group, []), (start, end, record_id))
+
+    def remove(self, group, start, end, record_id):
+        """ Removes a range from the group """
+        entries = self.__groups.get(group, [])
+        position = bisect.bisect_left(entries, (start, end, record_id))
+        if position < len(entries) and entries[position] == (start, end, record_id):
+            del entries[position]
@@ -0,0 +1,35 @@
+#!/usr/bin/python3
+"""This module defines a stand-in that creates the real storage object on first use"""
+
+import threading
+
+class LazyStorage():
+    """ Looks like a storage object but only creates the real one the first time it is used.
+    This keeps imports fast - nothing is loaded or connected until a request actually needs data """
+    __factory = None
+    __instance = None
+    __lock = None
+
+    def __init__(self, factory):
+        """ factory is a function with no arguments that returns a ready-to-use storage object """
+        self.__factory = factory
+        self.__instance = None
+        self.__lock = threading.Lock()
+
+    def ensure_initialised(self):
+        """ Creates the real storage object if it doesn't exist yet and returns it """
+        if self.__instance is None:
+            with self.__lock:
+                # check again in case another thread got here first
+                if self.__instance is None:
+                    self.__instance = self.__factory()
+
+        return self.__instance
+
+    def is_initialised(self):
+        """ Returns True if the real storage object has been created """
+        return self.__instance is not None
+
+    def __getattr__(self, name):
+        """ Anything that isn't defined here goes to the real storage object """
+        return getattr(self.ensure_initialised(), name)
@@ -0,0 +1,254 @@
+#!/usr/bin/python3
+"""This module defines a wrapper that keeps the best-rated places of every city and country ready to send"""
+
+# -- Usage example --
+# storage.leaderboard("City", city_id)                          -> the top places of the city by average rating
+# storage.leaderboard("Country", country_id, "reviews", 5)      -> the 5 places of the country with the most reviews
+#
+# The rating total and review count of every place are kept, and each city / country has a short sorted list of
+# its best places for each ranking. A new or changed review only moves that one place up or down the lists of
+# its city and country. Only when a place drops off the bottom of a full list are the other places of the
+# city / country looked at again, to find the one that takes its spot.
+
+import bisect
+import heapq
+import threading
+import time
+from data.place_documents import PlaceDocuments
+from data.write_listener import WriteListener
+
+class Leaderboards(WriteListener):
+    """ Wraps a storage object and serves top-N lists of places built from its records.
+    Writes made by other processes can't be seen here, so the lists are also rebuilt after max_age seconds """
+    __storage = None
+    __lock = None
+    __expiry = None
+    __stats = None
+    __reviews = None
+    __place_cities = None
+    __city_countries = None
+    __members = None
+    __boards = None
+
+    # Places kept per list. A leaderboard can't be longer than this
+    size = 100
+
+    # ranking name -> sort key of a place, from its (rating total, review count). Smallest key first
+    rankings = {
+        "rating": lambda place_id, total, count: (-total / count, -count, place_id),
+        "reviews": lambda place_id, total, count: (-count, -total / count, place_id)
+    }
+
+    def __init__(self, storage, max_age):
+        """ storage is the real storage object. max_age is in seconds, 0 means the lists never expire """
+        super().__init__(storage)
+        self.__storage = storage
+        self.max_age = max_age
+        self.__lock = threading.Lock()
+
+    def leaderboard(self, class_name, record_id, ranking = "rating", limit = 10):
+        """ Returns [{"place_id", "average_rating", "review_count"}, ...] for the best places of the city or country.
+        Places without reviews aren't ranked """
+        if class_name not in ["City", "Country"]:
+            raise IndexError("There are only leaderboards of cities and countries")
+        if ranking not in self.rankings:
+            raise IndexError("Unknown ranking {}. Use one of: {}".format(ranking, ", ".join(self.rankings)))
+
+        with self.__lock:
+            if self.__expiry is None or (self.max_age > 0 and self.__expiry <= time.monotonic()):
+                self.__build()
+
+            entries = self.__boards.get((ranking, class_name, record_id), [])[:limit]
+            output = []
+            for entry in entries:
+                total, count = self.__stats[entry[-1]]
+                output.append({"place_id": entry[-1], "average_rating": round(total / count, 2), "review_count": count})
+
+        return output
+
+    def clear(self):
+        """ Throws the lists away. The next leaderboard request builds them again """
+        with self.__lock:
+            self.__expiry = None
+
+    def write_committed(self, class_name, record_id, new_record):
+        """ Moves the places affected by the written record """
+        if class_name not in ["Review", "Place", "City"] or self.__expiry is None:
+            # Nothing built yet - the first leaderboard request reads everything anyway
+            return
+
+        record = new_record if new_record is not None else self.__get(class_name, record_id)
+        if record is None:
+            return
+
+        with self.__lock:
+            if self.__expiry is None:
+                return
+
+            if class_name == "Review":
+                place_id = PlaceDocuments.value(record, "place_id")
+                rating = Leaderboards.rating(PlaceDocuments.value(record, "rating"))
+                self.__score(record_id, place_id, rating)
+            elif class_name == "Place":
+                self.__move_place(record_id, PlaceDocuments.value(record, "city_id", "city"))
+            else:
+                self.__move_city(record_id, PlaceDocuments.value(record, "country_id"))
+
+    def write_abandoned(self, class_name, record_id, new_record):
+        """ The storage may or may not still have the write, so build the lists again when they are next asked for """
+        if class_name in ["Review", "Place", "City"]:
+            self.clear()
+
+    def __build(self):
+        """ Reads all the places, cities and reviews and makes every list. The lock must be held """
+        self.__stats = {}
+        self.__reviews = {}
+        self.__place_cities = {}
+        self.__city_countries = {}
+        self.__members = {}
+        self.__boards = {}
+
+        for city in Leaderboards.records(self.__storage.get("City")):
+            self.__city_countries[PlaceDocuments.value(city, "id")] = PlaceDocuments.value(city, "country_id")
+
+        for place in Leaderboards.records(self.__storage.get("Place")):
+            place_id = PlaceDocuments.value(place, "id")
+            self.__place_cities[place_id] = PlaceDocuments.value(place, "city_id", "city")
+            for group in self.__groups(place_id):
+                self.__members.setdefault(group, set()).add(place_id)
+
+        for review in Leaderboards.records(self.__storage.get("Review")):
+            rating = Leaderboards.rating(PlaceDocuments.value(review, "rating"))
+            place_id = PlaceDocuments.value(review, "place_id")
+            if rating is None:
+                continue
+            self.__reviews[PlaceDocuments.value(review, "id")] = (place_id, rating)
+            total, count = self.__stats.get(place_id, (0, 0))
+            self.__stats[place_id] = (total + rating, count + 1)
+
+        for group, place_ids in self.__members.items():
+            for ranking in self.rankings:
+                self.__refill((ranking,) + group, place_ids)
+
+        self.__expiry = time.monotonic() + self.max_age
+
+    def __score(self, review_id, place_id, rating):
+        """ Records a new or changed review and moves its place. The lock must be held """
+        old = self.__reviews.pop(review_id, None)
+        if old is not None:
+            self.__add_rating(old[0], -old[1], -1)
+        if rating is not None:
+            self.__reviews[review_id] = (place_id, rating)
+            self.__add_rating(place_id, rating, 1)
+
+    def __add_rating(self, place_id, rating, count):
+        """ Adds to the rating total and review count of the place and moves it in its lists. The lock must be held """
+        old_total, old_count = self.__stats.get(place_id, (0, 0))
+        total, new_count = old_total + rating, old_count + count
+        if new_count > 0:
+            self.__stats[place_id] = (total, new_count)
+        else:
+            self.__stats.pop(place_id, None)
+
+        for group in self.__groups(place_id):
+            for ranking, key in self.rankings.items():
+                old_key = key(place_id, old_total, old_count) if old_count > 0 else None
+                new_key = key(place_id, total, new_count) if new_count > 0 else None
+                self.__reposition((ranking,) + group, old_key, new_key)
+
+    def __move_place(self, place_id, city_id):
+        """ Moves the place to the lists of another city (and country). The lock must be held """
+        if place_id in self.__place_cities and self.__place_cities[place_id] == city_id:
+            return
+
+        self.__leave(place_id)
+        self.__place_cities[place_id] = city_id
+        self.__join(place_id)
+
+    def __move_city(self, city_id, country_id):
+        """ Moves the places of the city to the lists of another country. The lock must be held """
+        if self.__city_countries.get(city_id) == country_id:
+            return
+
+        place_ids = list(self.__members.get(("City", city_id), []))
+        for place_id in place_ids:
+            self.__leave(place_id)
+        self.__city_countries[city_id] = country_id
+        for place_id in place_ids:
+            self.__join(place_id)
+
+    def __leave(self, place_id):
+        """ Takes the place out of the lists of its city and country. The lock must be held """
+        stats = self.__stats.get(place_id)
+        for group in self.__groups(place_id):
+            self.__members.get(group, set()).discard(place_id)
+            if stats is not None:
+                for ranking, key in self.rankings.items():
+                    self.__reposition((ranking,) + group, key(place_id, *stats), None)
+
+    def __join(self, place_id):
+        """ Puts the place in the lists of its city and country. The lock must be held """
+        stats = self.__stats.get(place_id)
+        for group in self.__groups(place_id):
+            self.__members.setdefault(group, set()).add(place_id)
+            if stats is not None:
+                for ranking, key in self.rankings.items():
+                    self.__reposition((ranking,) + group, None, key(place_id, *stats))
+
+    def __reposition(self, board, old_key, new_key):
+        """ Replaces the place's old_key with new_key in the list. None means not ranked. The lock must be held """
+        entries = self.__boards.setdefault(board, [])
+        if old_key is not None:
+            position = bisect.bisect_left(entries, old_key)
+            if position < len(entries) and entries[position] == old_key:
+                was_full = len(entries) == self.size
+                del entries[position]
+
+                # A place that falls below the last one left may not belong in a full list any more -
+                # one of the places that weren't in the list could be better now
+                if was_full and (new_key is None or (len(entries) > 0 and new_key > entries[-1])):
+                    self.__refill(board, self.__members.get(board[1:], set()))
+                    return
+
+        if new_key is not None and (len(entries) < self.size or new_key < entries[-1]):
+            bisect.insort(entries, new_key)
+            if len(entries) > self.size:
+                entries.pop()
+
+    def __refill(self, board, place_ids):
+        """ Makes the list again from all the places of the city / country. The lock must be held """
+        key = self.rankings[board[0]]
+        keys = (key(place_id, *self.__stats[place_id]) for place_id in place_ids if place_id in self.__stats)
+        self.__boards[board] = heapq.nsmallest(self.size, keys)
+
+    def __groups(self, place_id):
+        """ The (class_name, record_id) of the city and country of the place """
+        city_id = self.__place_cities.get(place_id)
+        if city_id is None:
+            return []
+
+        groups = [("City", city_id)]
+        country_id = self.__city_countries.get(city_id)
+        if country_id is not None:
+            groups.append(("Country", country_id))
+        return groups
+
+    def __get(self, class_name, record_id):
+        """ Returns the record or None if it doesn't exist """
+        try:
+            return self.__storage.get(class_name, record_id)
+        except IndexError:
+            return None
+
+    @staticmethod
+    def records(data):
+        """ The records of a storage get(): a list of model objects (DBStorage) or a dictionary (FileStorage) """
+        return data.values() if isinstance(data, dict) else data
+
+    @staticmethod
+    def rating(value):
+        """ The rating as a number (the reviews table stores it as text). None if it isn't one """
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
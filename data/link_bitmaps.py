@@ -0,0 +1,51 @@
+#!/usr/bin/python3
+"""This module defines bitmaps of many-to-many links, for "linked to all of these" queries"""
+
+# -- Usage example --
+# bitmaps = LinkBitmaps(relations['Place']['Amenity'])      -> { place_id: [amenity_id, ...] }
+# bitmaps.linked_to_all([wifi_id, pool_id, parking_id])     -> [place_id, ...]
+#
+# Every place gets a row number. Each amenity has a bitmap with bit n set if the place in row n
+# has that amenity, so the places with WiFi AND Pool AND Parking are the bits left after ANDing
+# three bitmaps together. Python ints are used as the bitmaps: they grow as needed and & runs in C,
+# a machine word at a time.
+#
+# The bitmaps are never changed after they are built. FileStorage builds new ones from the relations
+# file every time it is loaded or reloaded, which is the only way the relations change.
+
+class LinkBitmaps():
+    """ A bitmap of record rows (e.g. places) per linked record (e.g. amenity) """
+    __ids = None
+    __bitmaps = None
+
+    def __init__(self, relations):
+        """ relations is { record_id: [linked_id, ...] }, as stored by FileStorage """
+        self.__ids = list(relations)
+
+        # Set the bits in a bytearray and turn it into an int once per linked record.
+        # ORing the bits in one at a time would copy the whole int every time
+        bits = {}
+        size = (len(self.__ids) + 7) // 8
+        for row, (record_id, linked_ids) in enumerate(relations.items()):
+            for linked_id in linked_ids:
+                bitmap = bits.setdefault(linked_id, bytearray(size))
+                bitmap[row >> 3] |= 1 << (row & 7)
+
+        self.__bitmaps = {linked_id: int.from_bytes(bitmap, "little") for linked_id, bitmap in bits.items()}
+
+    def linked_to_all(self, linked_ids):
+        """ Returns the ids of the records that are linked to every one of linked_ids, in row order """
+        bitmaps = [self.__bitmaps.get(linked_id, 0) for linked_id in linked_ids]
+        if len(bitmaps) == 0:
+            return list(self.__ids)
+
+        # Smallest first, so the result shrinks as early as possible
+        bitmaps.sort(key=lambda bitmap: bitmap.bit_length())
+        result = bitmaps[0]
+        for bitmap in bitmaps[1:]:
+            if result == 0:
+                break
+            result &= bitmap
+
+        # bin() lists the bits from the highest down, so reverse it to get the rows in order
+        return [self.__ids[row] for row, digit in enumerate(reversed(bin(result)[2:])) if digit == "1"]
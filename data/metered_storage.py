@@ -0,0 +1,93 @@
+#!/usr/bin/python3
+"""This module defines a wrapper that counts (and, when profiling, times) the calls made to a storage object"""
+
+import inspect
+import time
+from monitoring.registry import metrics
+from monitoring.profiling import trace_storage_call
+
+class MeteredStorage():
+    """ Wraps a storage object and records how it is used in the metrics registry """
+    __storage = None
+
+    # The calls that are timed and counted -> the number of rows in what they return,
+    # from (result, arguments by name). None means only the call is counted
+    timed_methods = {
+        "get": lambda result, arguments: len(result) if arguments["record_id"] == "" else 1,
+        "find": lambda result, arguments: len(result),
+        "get_many": lambda result, arguments: len(result),
+        "find_sorted": lambda result, arguments: len(result),
+        "find_in_ranges": lambda result, arguments: len(result),
+        "find_linked_to_all": lambda result, arguments: len(result),
+        "linked_ids": lambda result, arguments: sum(len(linked) for linked in result.values()),
+        "overlapping_groups": lambda result, arguments: len(result),
+        "existing_ids": lambda result, arguments: len(result),
+        "count": None,
+        "count_relations": None,
+        "add": None,
+        "update": lambda result, arguments: 1
+    }
+
+    # The calls that return a generator. The rows are counted as they go out
+    streamed_methods = ["stream", "stream_relations"]
+
+    def __init__(self, storage):
+        """ storage is the real storage object (DBStorage, FileStorage...) """
+        self.__storage = storage
+
+    def __timed(self, name, method):
+        """ Returns method wrapped so that its calls are timed and counted """
+        signature = inspect.signature(method)
+        rows = self.timed_methods[name]
+
+        def timed(*args, **kwargs):
+            """ Same as the storage method, but counted """
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = bound.arguments
+
+            start_time = time.perf_counter()
+            result = method(*args, **kwargs)
+            trace_storage_call(name, arguments["class_name"], arguments.get("record_id", ""), time.perf_counter() - start_time)
+
+            labels = {"method": name, "class": arguments["class_name"]}
+            metrics.inc("hbnb_storage_calls_total", labels)
+            if rows is not None:
+                metrics.inc("hbnb_storage_rows_returned_total", labels, rows(result, arguments))
+
+            return result
+
+        return timed
+
+    def __streamed(self, name, method):
+        """ Returns the generator method wrapped so that its calls and rows are counted """
+        signature = inspect.signature(method)
+
+        def streamed(*args, **kwargs):
+            """ Same as the storage method, but counted. The rows are counted as they go out """
+            labels = {"method": name, "class": signature.bind(*args, **kwargs).arguments["class_name"]}
+            metrics.inc("hbnb_storage_calls_total", labels)
+
+            count = 0
+            try:
+                for row in method(*args, **kwargs):
+                    count += 1
+                    yield row
+            finally:
+                metrics.inc("hbnb_storage_rows_returned_total", labels, count)
+
+        return streamed
+
+    def __getattr__(self, name):
+        """ The methods above are wrapped the first time they are asked for. Anything else goes straight to the real storage object """
+        method = getattr(self.__storage, name)
+        if name in self.timed_methods:
+            wrapper = self.__timed(name, method)
+        elif name in self.streamed_methods:
+            wrapper = self.__streamed(name, method)
+        else:
+            return method
+
+        # Kept on the object, so that the next lookups don't come through here at all
+        self.__dict__[name] = wrapper
+        return wrapper
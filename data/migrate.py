@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+""" Creates the database tables for the models. Run this once before starting the app with DB Storage """
+
+# -- Usage example --
+# python3 -m data.migrate
+# python3 -m data.migrate --force    (check the database again even if it has been verified before)
+# TESTING=1 python3 -m data.migrate  (drops and recreates all the tables of the test database)
+#
+# Checking the schema means talking to the database, so once it's done we write a small marker file.
+# As long as the models and the connection settings stay the same, running this again costs nothing.
+
+import argparse
+import hashlib
+import importlib
+import sys
+from pathlib import Path
+from sqlalchemy.schema import CreateIndex, CreateTable
+from data import Base, USE_DB_STORAGE, is_testing
+from data.db_storage import DBStorage
+
+marker_filepath = "data/.schema_verified"
+
+# Every module that defines tables has to be imported before Base.metadata knows about them
+model_modules = ["user", "country", "city", "place_amenity", "review", "booking"]
+
+
+def load_models():
+    """ Imports all the model modules so that their tables get registered with Base """
+    for name in model_modules:
+        importlib.import_module("models." + name)
+
+def schema_fingerprint(engine):
+    """ Returns a hash of the connection url and the CREATE TABLE / INDEX statements of all the models """
+    fingerprint = hashlib.sha256(str(engine.url).encode())
+    for table in Base.metadata.sorted_tables:
+        fingerprint.update(str(CreateTable(table).compile(engine)).encode())
+        for index in sorted(table.indexes, key=lambda i: i.name):
+            fingerprint.update(str(CreateIndex(index).compile(engine)).encode())
+
+    return fingerprint.hexdigest()
+
+def is_schema_verified(engine):
+    """ Returns True if the marker file says the current schema has already been created """
+    marker = Path(marker_filepath)
+    return marker.is_file() and marker.read_text().strip() == schema_fingerprint(engine)
+
+def migrate(force = False):
+    """ Creates any missing tables and records that the schema has been verified """
+    load_models()
+    engine = DBStorage.new_engine()
+
+    # The test database is always rebuilt from scratch
+    if is_testing:
+        Base.metadata.drop_all(engine)
+    elif not force and is_schema_verified(engine):
+        print("Schema already verified. Nothing to do.")
+        return
+
+    Base.metadata.create_all(engine)
+
+    # create_all skips tables that already exist, so indexes added to the models later have to be created separately
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+    engine.dispose()
+
+    if not is_testing:
+        Path(marker_filepath).write_text(schema_fingerprint(engine) + "\n")
+
+    print("Schema created / verified.")
+
+
+if __name__ == '__main__':
+    if not USE_DB_STORAGE:
+        sys.exit("Nothing to migrate with STORAGE=FILE")
+
+    parser = argparse.ArgumentParser(description="Create the database tables for HBnB Evolution")
+    parser.add_argument("--force", action="store_true",
+                        help="check the database even if the marker file says it has been verified")
+    args = parser.parse_args()
+
+    migrate(args.force)
@@ -0,0 +1,88 @@
+#!/usr/bin/python3
+"""This module defines a column store for the numeric Place fields of FileStorage"""
+
+# -- Usage example --
+# columns = PlaceColumns(places.values(), ["price_per_night", "max_guests"])
+# columns.select({"price_per_night": (50, 120), "max_guests": (4, None)})   -> [place_id, ...]
+#
+# Each numeric field is a NumPy array with one entry per place (the place's row).
+# A filter is worked out for all the rows at once - one comparison per array instead of
+# a Python loop over the records - and the boolean masks are ANDed together.
+
+import threading
+import numpy
+
+class PlaceColumns():
+    """ NumPy arrays of the numeric fields of the places, kept in step with the records by FileStorage """
+    __ids = None
+    __rows = None
+    __columns = None
+    __size = 0
+    __lock = None
+
+    # Rows allocated at first. The arrays double in size when they are full
+    initial_capacity = 1024
+
+    def __init__(self, records, fields):
+        """ records are the Place dictionaries of FileStorage. fields are the names of the numeric fields """
+        records = list(records)
+        self.fields = list(fields)
+        capacity = max(self.initial_capacity, len(records))
+
+        self.__ids = []
+        self.__rows = {}
+        self.__columns = {field: numpy.full(capacity, numpy.nan) for field in self.fields}
+        self.__size = 0
+        self.__lock = threading.Lock()
+
+        for record in records:
+            self.set(record)
+
+    def set(self, record):
+        """ Adds the place or updates its values """
+        with self.__lock:
+            row = self.__rows.get(record['id'])
+            if row is None:
+                row = self.__size
+                if row == len(self.__columns[self.fields[0]]):
+                    self.__grow()
+                self.__ids.append(record['id'])
+                self.__rows[record['id']] = row
+                self.__size += 1
+
+            for field in self.fields:
+                self.__columns[field][row] = PlaceColumns.number(record.get(field))
+
+    def select(self, ranges):
+        """ Returns the ids of the places whose values are within all the ranges, in row order.
+        ranges is { field: (low, high) } with both ends included. None means no limit on that side.
+        Places without a number in a filtered field never match """
+        with self.__lock:
+            size = self.__size
+            mask = numpy.ones(size, dtype=bool)
+            for field, (low, high) in ranges.items():
+                column = self.__columns[field][:size]
+                if low is None and high is None:
+                    # comparisons with NaN are always False, so this only drops the missing values
+                    mask &= ~numpy.isnan(column)
+                if low is not None:
+                    mask &= column >= low
+                if high is not None:
+                    mask &= column <= high
+
+            return [self.__ids[row] for row in numpy.flatnonzero(mask)]
+
+    def __grow(self):
+        """ Doubles the size of the arrays. The lock must be held """
+        for field, column in self.__columns.items():
+            bigger = numpy.full(len(column) * 2, numpy.nan)
+            bigger[:len(column)] = column
+            self.__columns[field] = bigger
+
+    @staticmethod
+    def number(value):
+        """ The value as it is stored in the arrays. Anything that isn't a number is NaN """
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return value
+
+        return numpy.nan
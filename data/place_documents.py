@@ -0,0 +1,319 @@
+#!/usr/bin/python3
+"""This module defines a wrapper that keeps ready-made "place detail" documents up to date"""
+
+# -- Usage example --
+# storage.place_document(place_id)
+#   -> { ...place fields..., "city": {..., "country": {...}}, "host": {...}, "amenities": [...], "reviews": [...] }
+#
+# A document is built the first time it is asked for and then kept. When one of the records it was
+# built from is written, only that part of the document is rebuilt, e.g. renaming a country replaces
+# "country" in the documents of all the places in that country and leaves everything else alone.
+# Documents are never changed once made - a new one replaces the old one - so whoever is still
+# sending the old one out can carry on safely.
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from data.write_listener import WriteListener
+from monitoring.registry import metrics
+
+class PlaceDocuments(WriteListener):
+    """ Wraps a storage object and serves denormalised place documents built from its records.
+    Writes made by other processes can't be seen here, so documents are also rebuilt after max_age seconds """
+    __storage = None
+    __documents = None
+    __dependents = None
+    __lock = None
+    __builds = None
+    __build_numbers = None
+
+    # Max number of documents kept
+    max_documents = 10000
+
+    datetime_format = "%Y-%m-%dT%H:%M:%S.%f"
+
+    def __init__(self, storage, max_age):
+        """ storage is the real storage object. max_age is in seconds, 0 means documents never expire """
+        super().__init__(storage)
+        self.__storage = storage
+        self.max_age = max_age
+
+        # place_id -> (expiry, document, dependencies)
+        self.__documents = OrderedDict()
+
+        # (class_name, record_id) -> place ids of the documents that contain the record
+        self.__dependents = {}
+        self.__lock = threading.Lock()
+
+        # build number -> (class_name, record_id) of the records written while that document was being built.
+        # A document built from a record that was written meanwhile may be out of date, so it isn't kept
+        self.__builds = {}
+        self.__build_numbers = itertools.count()
+
+    def place_document(self, place_id):
+        """ Returns the document of the place. Raises IndexError if the place doesn't exist """
+        labels = {"cache": "place_documents", "class": "Place"}
+
+        with self.__lock:
+            entry = self.__documents.get(place_id)
+            if entry is not None and (self.max_age <= 0 or entry[0] > time.monotonic()):
+                self.__documents.move_to_end(place_id)
+                metrics.inc("hbnb_cache_requests_total", {**labels, "result": "hit"})
+                return entry[1]
+
+        metrics.inc("hbnb_cache_requests_total", {**labels, "result": "miss"})
+        return self.__build_and_keep(place_id)
+
+    def clear(self):
+        """ Forgets all the documents """
+        with self.__lock:
+            self.__documents.clear()
+            self.__dependents.clear()
+
+    def write_committed(self, class_name, record_id, new_record):
+        """ Rebuilds the parts of the documents that contain the written record """
+        self.__written_during_builds(class_name, record_id, new_record)
+
+        if class_name == "Place":
+            # Easier to rebuild the whole document. A new place has no document yet
+            with self.__lock:
+                is_kept = record_id in self.__documents
+            if is_kept:
+                self.__rebuild(record_id)
+            return
+
+        if class_name == "Review":
+            review = new_record if new_record is not None else self.__get("Review", record_id)
+            place_id = None if review is None else PlaceDocuments.value(review, "place_id")
+            if place_id is not None:
+                self.__patch([place_id], lambda document: {
+                    **document,
+                    "reviews": [r for r in document["reviews"] if r["id"] != record_id] + [self.__review(review)]
+                })
+            return
+
+        with self.__lock:
+            place_ids = list(self.__dependents.get((class_name, record_id), []))
+        if len(place_ids) == 0:
+            return
+
+        record = self.__get(class_name, record_id)
+        if record is None:
+            for place_id in place_ids:
+                self.__rebuild(place_id)
+        elif class_name == "City":
+            city = self.__city(record)
+            self.__patch(place_ids, lambda document: {**document, "city": {**city, "country": document["city"]["country"]}})
+        elif class_name == "Country":
+            country = self.__country(record)
+            self.__patch(place_ids, lambda document: {**document, "city": {**document["city"], "country": country}})
+        elif class_name == "User":
+            host = self.__host(record)
+            self.__patch(place_ids, lambda document: {**document, "host": host})
+        elif class_name == "Amenity":
+            amenity = self.__amenity(record)
+            self.__patch(place_ids, lambda document: {
+                **document,
+                "amenities": [amenity if a["id"] == record_id else a for a in document["amenities"]]
+            })
+
+    def write_abandoned(self, class_name, record_id, new_record):
+        """ Drops the documents that contain the written record, to be built again when next asked for """
+        self.__written_during_builds(class_name, record_id, new_record)
+
+        if class_name == "Review":
+            review = new_record if new_record is not None else self.__get("Review", record_id)
+            place_ids = [] if review is None else [PlaceDocuments.value(review, "place_id")]
+        elif class_name == "Place":
+            place_ids = [record_id]
+        else:
+            with self.__lock:
+                place_ids = list(self.__dependents.get((class_name, record_id), []))
+
+        with self.__lock:
+            for place_id in place_ids:
+                self.__drop(place_id)
+
+    def __written_during_builds(self, class_name, record_id, new_record):
+        """ Tells the documents being built right now that the record was written """
+        written = {(class_name, record_id)}
+        if class_name == "Review":
+            # a review is part of its place's document without being one of the dependencies
+            review = new_record if new_record is not None else self.__get("Review", record_id)
+            if review is not None:
+                written.add(("Place", PlaceDocuments.value(review, "place_id")))
+
+        with self.__lock:
+            for records in self.__builds.values():
+                records.update(written)
+
+    def __patch(self, place_ids, change):
+        """ Replaces the documents of the places with change(document). Places without a document are skipped """
+        with self.__lock:
+            for place_id in place_ids:
+                entry = self.__documents.get(place_id)
+                if entry is not None:
+                    self.__documents[place_id] = (entry[0], change(entry[1]), entry[2])
+
+    def __rebuild(self, place_id):
+        """ Builds the document of the place again, or drops it if the place is gone """
+        try:
+            self.__build_and_keep(place_id)
+        except IndexError:
+            with self.__lock:
+                self.__drop(place_id)
+
+    def __build_and_keep(self, place_id):
+        """ Builds the document of the place and keeps it, unless one of the records it was built from
+        was written meanwhile. Then the current document (if any) is dropped instead. Returns the document """
+        with self.__lock:
+            build_number = next(self.__build_numbers)
+            self.__builds[build_number] = set()
+
+        try:
+            document, dependencies = self.__build(place_id)
+        except:
+            with self.__lock:
+                del self.__builds[build_number]
+            raise
+
+        with self.__lock:
+            written = self.__builds.pop(build_number)
+            if written.isdisjoint(dependencies) and ("Place", place_id) not in written:
+                self.__keep(place_id, document, dependencies)
+            else:
+                self.__drop(place_id)
+
+        return document
+
+    def __keep(self, place_id, document, dependencies):
+        """ Stores the document and remembers which records it was built from. The lock must be held """
+        self.__drop(place_id)
+        self.__documents[place_id] = (time.monotonic() + self.max_age, document, dependencies)
+        for dependency in dependencies:
+            self.__dependents.setdefault(dependency, set()).add(place_id)
+
+        while len(self.__documents) > self.max_documents:
+            self.__drop(next(iter(self.__documents)))
+
+    def __drop(self, place_id):
+        """ Forgets the document of the place. The lock must be held """
+        entry = self.__documents.pop(place_id, None)
+        if entry is None:
+            return
+
+        for dependency in entry[2]:
+            dependents = self.__dependents.get(dependency)
+            if dependents is not None:
+                dependents.discard(place_id)
+                if len(dependents) == 0:
+                    del self.__dependents[dependency]
+
+    def __build(self, place_id):
+        """ Returns a new document for the place and the (class_name, record_id) of every record used """
+        place = self.__storage.get("Place", place_id)
+        city = self.__storage.get("City", PlaceDocuments.value(place, "city_id", "city"))
+        country = self.__storage.get("Country", PlaceDocuments.value(city, "country_id"))
+        host = self.__storage.get("User", PlaceDocuments.value(place, "host_id", "host_user_id"))
+
+        if isinstance(place, dict):
+            # FileStorage keeps the links in the relations data
+            try:
+                amenity_ids = self.__storage.get_relations("Place", "Amenity").get(place_id, [])
+            except IndexError:
+                amenity_ids = []
+            amenities = [self.__storage.get("Amenity", amenity_id) for amenity_id in amenity_ids]
+        else:
+            amenities = list(place.amenities)
+
+        reviews = self.__storage.find("Review", {"place_id": place_id})
+
+        document = {
+            "id": place_id,
+            "name": PlaceDocuments.value(place, "name"),
+            "description": PlaceDocuments.value(place, "description"),
+            "address": PlaceDocuments.value(place, "address"),
+            "latitude": PlaceDocuments.value(place, "latitude"),
+            "longitude": PlaceDocuments.value(place, "longitude"),
+            "number_of_rooms": PlaceDocuments.value(place, "number_of_rooms"),
+            "number_of_bathrooms": PlaceDocuments.value(place, "number_of_bathrooms", "bathrooms"),
+            "price_per_night": PlaceDocuments.value(place, "price_per_night"),
+            "max_guests": PlaceDocuments.value(place, "max_guests"),
+            "created_at": PlaceDocuments.timestamp(PlaceDocuments.value(place, "created_at")),
+            "updated_at": PlaceDocuments.timestamp(PlaceDocuments.value(place, "updated_at")),
+            "city": {**self.__city(city), "country": self.__country(country)},
+            "host": self.__host(host),
+            "amenities": [self.__amenity(amenity) for amenity in amenities],
+            "reviews": [self.__review(review) for review in reviews]
+        }
+
+        dependencies = [("City", document["city"]["id"]),
+                        ("Country", document["city"]["country"]["id"]),
+                        ("User", document["host"]["id"])]
+        dependencies += [("Amenity", amenity["id"]) for amenity in document["amenities"]]
+
+        return document, dependencies
+
+    def __get(self, class_name, record_id):
+        """ Returns the record or None if it doesn't exist """
+        try:
+            return self.__storage.get(class_name, record_id)
+        except IndexError:
+            return None
+
+    def __city(self, city):
+        """ The city part of a document (without the country) """
+        return {"id": PlaceDocuments.value(city, "id"), "name": PlaceDocuments.value(city, "name")}
+
+    def __country(self, country):
+        """ The country part of a document """
+        return {
+            "id": PlaceDocuments.value(country, "id"),
+            "name": PlaceDocuments.value(country, "name"),
+            "code": PlaceDocuments.value(country, "code")
+        }
+
+    def __host(self, user):
+        """ The host part of a document. No email or password in here! """
+        return {
+            "id": PlaceDocuments.value(user, "id"),
+            "first_name": PlaceDocuments.value(user, "first_name"),
+            "last_name": PlaceDocuments.value(user, "last_name")
+        }
+
+    def __amenity(self, amenity):
+        """ An amenity in a document """
+        return {"id": PlaceDocuments.value(amenity, "id"), "name": PlaceDocuments.value(amenity, "name")}
+
+    def __review(self, review):
+        """ A review in a document """
+        return {
+            "id": PlaceDocuments.value(review, "id"),
+            "user_id": PlaceDocuments.value(review, "user_id", "commentor_user_id"),
+            "comment": PlaceDocuments.value(review, "comment", "feedback"),
+            "rating": PlaceDocuments.value(review, "rating"),
+            "created_at": PlaceDocuments.timestamp(PlaceDocuments.value(review, "created_at"))
+        }
+
+    @staticmethod
+    def value(record, *names):
+        """ Returns the first of the named values that the record has. Records are model objects
+        (DBStorage) or dictionaries (FileStorage), and some of the JSON data uses older field names """
+        for name in names:
+            if isinstance(record, dict):
+                if name in record:
+                    return record[name]
+            elif hasattr(record, name):
+                return getattr(record, name)
+
+        return None
+
+    @staticmethod
+    def timestamp(value):
+        """ datetime (DBStorage) or epoch seconds (FileStorage) -> text """
+        if isinstance(value, (int, float)):
+            value = datetime.fromtimestamp(value)
+
+        return value.strftime(PlaceDocuments.datetime_format) if value is not None else None
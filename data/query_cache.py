@@ -0,0 +1,113 @@
+#!/usr/bin/python3
+"""This module defines a wrapper that caches the results of storage queries in memory"""
+
+# -- Usage example --
+# storage.find('Country')                                -> the first call runs the query, the next ones don't
+# storage.find('City', {"country_id": country_id})
+# storage.count('Place', {"city_id": city_id})
+# storage.add('City', new_city)                          -> every cached City query is now out of date
+#
+# Each class has a generation number that goes up every time one of its records is written.
+# A cached result remembers the generation it was made in and is only used while that is still
+# the current one, so nothing needs to go through the cache looking for entries to delete.
+
+import threading
+import time
+from collections import OrderedDict
+from data.write_listener import WriteListener
+from monitoring.registry import metrics
+
+class QueryCache(WriteListener):
+    """ Wraps a storage object and caches what find(), find_sorted(), find_in_ranges() and count() return until the class is written to.
+    Writes made by other processes (e.g. the other server workers) can't be seen here,
+    so results are also dropped after max_age seconds """
+    __storage = None
+    __entries = None
+    __generations = None
+    __lock = None
+
+    # Max number of cached results
+    max_entries = 1000
+
+    def __init__(self, storage, max_age):
+        """ storage is the real storage object. max_age is in seconds, 0 means results never expire """
+        super().__init__(storage)
+        self.__storage = storage
+        self.max_age = max_age
+        self.__entries = OrderedDict()
+        self.__generations = {}
+        self.__lock = threading.Lock()
+
+    def find(self, class_name, filters = None, offset = 0, limit = None):
+        """ Same as the storage find. The result is shared between callers - don't change it! """
+        key = ("find", class_name, tuple(sorted((filters or {}).items())), offset, limit)
+        return self.__cached(class_name, key, lambda: self.__storage.find(class_name, filters, offset, limit))
+
+    def find_sorted(self, class_name, field, descending = False, offset = 0, limit = None, low = None, high = None):
+        """ Same as the storage find_sorted. Cached the same way as find() """
+        key = ("find_sorted", class_name, field, descending, offset, limit, low, high)
+        return self.__cached(class_name, key,
+                             lambda: self.__storage.find_sorted(class_name, field, descending, offset, limit, low, high))
+
+    def find_in_ranges(self, class_name, ranges):
+        """ Same as the storage find_in_ranges. Cached the same way as find() """
+        key = ("find_in_ranges", class_name, tuple(sorted(ranges.items())))
+        return self.__cached(class_name, key, lambda: self.__storage.find_in_ranges(class_name, ranges))
+
+    def count(self, class_name, filters = None):
+        """ Same as the storage count. Cached the same way as find() """
+        key = ("count", class_name, tuple(sorted((filters or {}).items())))
+        return self.__cached(class_name, key, lambda: self.__storage.count(class_name, filters))
+
+    def __cached(self, class_name, key, load):
+        """ Returns the cached result for the key, or calls load() and caches what it returns """
+        labels = {"cache": "queries", "class": class_name}
+
+        # Reads inside a unit of work may see writes that haven't been committed yet. Don't cache those
+        if self.in_transaction():
+            return load()
+
+        with self.__lock:
+            generation = self.__generations.get(class_name, 0)
+            entry = self.__entries.get(key)
+            if entry is not None and entry[0] == generation and (self.max_age <= 0 or entry[1] > time.monotonic()):
+                self.__entries.move_to_end(key)
+                metrics.inc("hbnb_cache_requests_total", {**labels, "result": "hit"})
+                return entry[2]
+
+        metrics.inc("hbnb_cache_requests_total", {**labels, "result": "miss"})
+        result = load()
+
+        with self.__lock:
+            # Only keep the result if nothing was written while the query was running
+            if self.__generations.get(class_name, 0) == generation:
+                self.__entries[key] = (generation, time.monotonic() + self.max_age, result)
+                self.__entries.move_to_end(key)
+                if len(self.__entries) > self.max_entries:
+                    self.__entries.popitem(last=False)
+
+        return result
+
+    def write_made(self, class_name, record_id, new_record):
+        """ Cached queries of the class are out of date as soon as it is written to """
+        self.invalidate(class_name)
+
+    def write_committed(self, class_name, record_id, new_record):
+        """ ...and again once the write is committed, in case another thread cached the class in between """
+        self.invalidate(class_name)
+
+    def write_abandoned(self, class_name, record_id, new_record):
+        """ ...or rolled back """
+        self.invalidate(class_name)
+
+    def invalidate(self, class_name, record_ids = None):
+        """ Makes every cached query of the class out of date. Can be used as a FileStorage reload listener """
+        with self.__lock:
+            self.__generations[class_name] = self.__generations.get(class_name, 0) + 1
+
+    def clear(self):
+        """ Makes every cached query out of date """
+        with self.__lock:
+            self.__entries.clear()
+            for class_name in self.__generations:
+                self.__generations[class_name] += 1
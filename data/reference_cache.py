@@ -0,0 +1,147 @@
+#!/usr/bin/python3
+"""This module defines a wrapper that remembers which record ids exist, for validating foreign keys"""
+
+# -- Usage example --
+# storage.exists('Country', country_id)                 -> True / False
+# storage.existing_ids('User', [user_id_1, user_id_2])  -> the ids (as a set) that exist
+#
+# When importing lots of records, call existing_ids() once with all the ids first.
+# That is a single query and the answers are remembered, so the model setters
+# that check the same ids afterwards don't need to go to the database at all.
+
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from monitoring.registry import metrics
+
+class ReferenceCache():
+    """ Wraps a storage object and caches the results of record existence checks.
+    Ids that exist are remembered until pushed out by newer ones or until the storage says the
+    records were removed (see forget). Ids that don't exist are only remembered for a few
+    seconds because another worker process may add the record at any time """
+    __storage = None
+    __known = None
+    __missing = None
+    __lock = None
+    __pending = None
+
+    # Max number of ids remembered per class
+    max_known_ids = 10000
+    max_missing_ids = 1000
+
+    # Seconds before an id that didn't exist is checked again
+    missing_ttl = 5
+
+    def __init__(self, storage):
+        """ storage is the real storage object, which must have an existing_ids method """
+        self.__storage = storage
+        self.__known = {}
+        self.__missing = {}
+        self.__lock = threading.Lock()
+
+        # Ids added inside the current thread's transaction() block
+        self.__pending = threading.local()
+
+    def exists(self, class_name, record_id):
+        """ Returns True if a record of the specified class has the specified id """
+        return record_id in self.existing_ids(class_name, [record_id])
+
+    def existing_ids(self, class_name, record_ids):
+        """ Returns the set of the specified ids that exist. Only the ids that aren't
+        cached are looked up in the storage, all in the same call """
+        wanted = list(dict.fromkeys(i for i in record_ids if isinstance(i, str)))
+        found = set()
+        unknown = []
+        now = time.monotonic()
+
+        with self.__lock:
+            known = self.__known.setdefault(class_name, OrderedDict())
+            missing = self.__missing.setdefault(class_name, OrderedDict())
+
+            for record_id in wanted:
+                if record_id in known:
+                    known.move_to_end(record_id)
+                    found.add(record_id)
+                elif missing.get(record_id, 0) <= now:
+                    unknown.append(record_id)
+
+        labels = {"cache": "references", "class": class_name}
+        metrics.inc("hbnb_cache_requests_total", {**labels, "result": "hit"}, len(wanted) - len(unknown))
+        if len(unknown) == 0:
+            return found
+
+        metrics.inc("hbnb_cache_requests_total", {**labels, "result": "miss"}, len(unknown))
+        existing = self.__storage.existing_ids(class_name, unknown)
+
+        with self.__lock:
+            for record_id in unknown:
+                if record_id in existing:
+                    self.__remember(class_name, record_id)
+                else:
+                    self.__remember_missing(class_name, record_id, now + self.missing_ttl)
+
+        return found | existing
+
+    def add(self, class_name, new_record):
+        """ Same as the storage add. The new id is remembered so that it can be referenced straight away """
+        result = self.__storage.add(class_name, new_record)
+
+        # DBStorage adds model objects, FileStorage adds dictionaries
+        record_id = new_record['id'] if isinstance(new_record, dict) else new_record.id
+        with self.__lock:
+            self.__remember(class_name, record_id)
+
+        pending = getattr(self.__pending, "ids", None)
+        if pending is not None:
+            pending.append((class_name, record_id))
+
+        return result
+
+    @contextmanager
+    def transaction(self):
+        """ Same as the storage transaction. If it fails, the ids added inside it are forgotten again """
+        is_outermost = getattr(self.__pending, "ids", None) is None
+        if is_outermost:
+            self.__pending.ids = []
+
+        try:
+            with self.__storage.transaction():
+                yield self
+        except:
+            if is_outermost:
+                for class_name, record_id in self.__pending.ids:
+                    self.forget(class_name, [record_id])
+            raise
+        finally:
+            if is_outermost:
+                self.__pending.ids = None
+
+    def forget(self, class_name, record_ids):
+        """ Drops the cached answers for the ids, e.g. because the records were removed """
+        with self.__lock:
+            for record_id in record_ids:
+                self.__known.get(class_name, {}).pop(record_id, None)
+                self.__missing.get(class_name, {}).pop(record_id, None)
+
+    def __remember(self, class_name, record_id):
+        """ Caches an id that exists. The lock must be held """
+        known = self.__known.setdefault(class_name, OrderedDict())
+        known[record_id] = None
+        known.move_to_end(record_id)
+        if len(known) > self.max_known_ids:
+            known.popitem(last=False)
+
+        self.__missing.get(class_name, {}).pop(record_id, None)
+
+    def __remember_missing(self, class_name, record_id, expiry):
+        """ Caches an id that doesn't exist until the expiry time. The lock must be held """
+        missing = self.__missing.setdefault(class_name, OrderedDict())
+        missing[record_id] = expiry
+        missing.move_to_end(record_id)
+        if len(missing) > self.max_missing_ids:
+            missing.popitem(last=False)
+
+    def __getattr__(self, name):
+        """ Anything else goes straight to the real storage object """
+        return getattr(self.__storage, name)
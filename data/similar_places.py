@@ -0,0 +1,201 @@
+#!/usr/bin/python3
+"""This module defines a wrapper that finds the places most like a given one"""
+
+# -- Usage example --
+# storage.similar_places(place_id)          -> [(place_id, similarity), ...] best first, 10 of them
+# storage.similar_places(place_id, 5)
+#
+# Every place of a city is turned into a row of numbers: its price, capacity, rooms and location
+# (scaled so that each of them counts about the same) followed by a 1 / 0 for each amenity.
+# The rows are scaled to length 1, so multiplying the matrix by its own transpose gives the cosine
+# similarity of every pair of places in the city at once. The best matches of all the places of the
+# city are kept, so asking for another place of the same city is a dictionary lookup.
+
+import threading
+import time
+from collections import OrderedDict
+from data.place_documents import PlaceDocuments
+from data.write_listener import WriteListener
+from monitoring.registry import metrics
+
+try:
+    # Only needed to work out the matches
+    import numpy
+    from data.place_columns import PlaceColumns
+except ImportError:
+    # similar_places() raises IndexError without it
+    numpy = None
+
+class SimilarPlaces(WriteListener):
+    """ Wraps a storage object and serves the places most like a given place, from the same city.
+    Writes made by other processes can't be seen here, so the matches are also worked out again after max_age seconds """
+    __storage = None
+    __cities = None
+    __place_cities = None
+    __generations = None
+    __lock = None
+
+    # The numeric Place fields compared. Same as the FileStorage range fields
+    fields = ["price_per_night", "number_of_rooms", "number_of_bathrooms", "max_guests", "latitude", "longitude"]
+
+    # Matches kept per place. A request can't ask for more than this
+    size = 20
+
+    # Max number of cities whose matches are kept
+    max_cities = 100
+
+    # Rows multiplied at a time, so a big city doesn't need a places x places matrix all at once
+    chunk_rows = 512
+
+    def __init__(self, storage, max_age):
+        """ storage is the real storage object. max_age is in seconds, 0 means matches never expire """
+        super().__init__(storage)
+        self.__storage = storage
+        self.max_age = max_age
+
+        # city_id -> (expiry, { place_id: [(place_id, similarity), ...] })
+        self.__cities = OrderedDict()
+
+        # place_id -> city_id of the places in the cities above, to know which city a moved place came from
+        self.__place_cities = {}
+
+        # city_id -> number of writes to its places. Matches worked out during a write aren't kept
+        self.__generations = {}
+        self.__lock = threading.Lock()
+
+    def similar_places(self, place_id, limit = 10):
+        """ Returns [(place_id, similarity), ...] for the places of the same city that are most like the place,
+        best first. similarity goes from -1 to 1. Raises IndexError if the place doesn't exist """
+        if numpy is None:
+            raise IndexError("Similar places need numpy")
+
+        place = self.__storage.get("Place", place_id)
+        city_id = PlaceDocuments.value(place, "city_id", "city")
+        labels = {"cache": "similar_places", "class": "Place"}
+
+        with self.__lock:
+            entry = self.__cities.get(city_id)
+            if entry is not None and (self.max_age <= 0 or entry[0] > time.monotonic()):
+                self.__cities.move_to_end(city_id)
+                metrics.inc("hbnb_cache_requests_total", {**labels, "result": "hit"})
+                return entry[1].get(place_id, [])[:limit]
+
+            generation = self.__generations.get(city_id, 0)
+
+        metrics.inc("hbnb_cache_requests_total", {**labels, "result": "miss"})
+        matches = self.__match(city_id)
+        with self.__lock:
+            if self.__generations.get(city_id, 0) == generation:
+                self.__keep(city_id, matches)
+
+        return matches.get(place_id, [])[:limit]
+
+    def clear(self):
+        """ Forgets all the matches """
+        with self.__lock:
+            for city_id in self.__cities:
+                self.__generations[city_id] = self.__generations.get(city_id, 0) + 1
+            self.__cities.clear()
+            self.__place_cities.clear()
+
+    def write_committed(self, class_name, record_id, new_record):
+        """ Drops the matches of the city the written place is in now, and of the one it was in before """
+        if class_name != "Place":
+            return
+
+        try:
+            record = new_record if new_record is not None else self.__storage.get(class_name, record_id)
+        except IndexError:
+            record = None
+
+        with self.__lock:
+            city_ids = {self.__place_cities.pop(record_id, None)}
+            if record is not None:
+                city_ids.add(PlaceDocuments.value(record, "city_id", "city"))
+
+            for city_id in city_ids - {None}:
+                self.__generations[city_id] = self.__generations.get(city_id, 0) + 1
+                self.__cities.pop(city_id, None)
+
+    def write_abandoned(self, class_name, record_id, new_record):
+        """ The storage may or may not still have the write, so the matches are dropped the same way """
+        self.write_committed(class_name, record_id, new_record)
+
+    def __keep(self, city_id, matches):
+        """ Stores the matches of the city. The lock must be held """
+        self.__cities.pop(city_id, None)
+        self.__cities[city_id] = (time.monotonic() + self.max_age, matches)
+        for place_id in matches:
+            self.__place_cities[place_id] = city_id
+
+        while len(self.__cities) > self.max_cities:
+            old_city_id, (expiry, old_matches) = self.__cities.popitem(last=False)
+            for place_id in old_matches:
+                if self.__place_cities.get(place_id) == old_city_id:
+                    del self.__place_cities[place_id]
+
+    def __match(self, city_id):
+        """ Returns { place_id: [(place_id, similarity), ...] } for all the places of the city """
+        places = self.__storage.find("Place", {"city_id": city_id})
+        place_ids = [PlaceDocuments.value(place, "id") for place in places]
+        matches = {place_id: [] for place_id in place_ids}
+        if len(place_ids) < 2:
+            return matches
+
+        features = self.__features(places, place_ids)
+
+        # Scale every row to length 1 - the dot product of two rows is then their cosine similarity.
+        # A row of zeros (an average place without amenities) stays as it is and matches everything with 0
+        lengths = numpy.linalg.norm(features, axis=1)
+        features /= numpy.where(lengths > 0, lengths, 1)[:, None]
+
+        count = min(self.size, len(place_ids) - 1)
+        for first in range(0, len(place_ids), self.chunk_rows):
+            scores = features[first:first + self.chunk_rows] @ features.T
+            rows = numpy.arange(len(scores))
+            scores[rows, first + rows] = -numpy.inf
+
+            # the best 'count' of each row, then those sorted
+            best = numpy.argpartition(-scores, count - 1, axis=1)[:, :count]
+            best_scores = numpy.take_along_axis(scores, best, axis=1)
+            order = numpy.argsort(-best_scores, axis=1, kind="stable")
+            best = numpy.take_along_axis(best, order, axis=1)
+            best_scores = numpy.take_along_axis(best_scores, order, axis=1)
+
+            for row in rows:
+                matches[place_ids[first + row]] = [(place_ids[column], round(float(score), 4))
+                                                   for column, score in zip(best[row], best_scores[row])]
+
+        return matches
+
+    def __features(self, places, place_ids):
+        """ Returns the feature matrix of the places: one row per place, the numeric fields then the amenities """
+        numbers = numpy.array([[PlaceColumns.number(PlaceDocuments.value(place, field)) for field in self.fields]
+                               for place in places], dtype=float)
+
+        # Scale each field to mean 0 and standard deviation 1 within the city, so e.g. the price doesn't
+        # outweigh the number of rooms. Missing values and fields that are the same everywhere become 0
+        present = ~numpy.isnan(numbers)
+        counts = numpy.maximum(present.sum(axis=0), 1)
+        numbers = numpy.where(present, numbers, 0.0)
+        means = numbers.sum(axis=0) / counts
+        deviations = numpy.where(present, numbers - means, 0.0)
+        spreads = numpy.sqrt((deviations ** 2).sum(axis=0) / counts)
+        numbers = numpy.where(spreads > 0, deviations / numpy.where(spreads > 0, spreads, 1), 0.0)
+
+        try:
+            links = self.__storage.linked_ids("Place", "Amenity", place_ids)
+        except IndexError:
+            links = {}
+
+        columns = {}
+        rows, cols = [], []
+        for row, place_id in enumerate(place_ids):
+            for amenity_id in links.get(place_id, []):
+                rows.append(row)
+                cols.append(columns.setdefault(amenity_id, len(columns)))
+
+        amenities = numpy.zeros((len(place_ids), len(columns)))
+        amenities[rows, cols] = 1.0
+
+        return numpy.hstack([numbers, amenities])
@@ -0,0 +1,101 @@
+#!/usr/bin/python3
+"""This module defines the base of the storage wrappers that keep something built from the records up to date"""
+
+# -- Usage example --
+# class Wrapper(WriteListener):
+#     def write_committed(self, class_name, record_id, new_record):
+#         ... update what was built from the record ...
+#
+# add() and update() go to the wrapped storage and are then passed on to the hooks below. Inside a
+# transaction() block the writes are held back until the block ends: write_committed() is only called
+# for writes that were actually saved, and write_abandoned() for the ones of a block that failed.
+
+import threading
+from contextlib import contextmanager
+
+class WriteListener():
+    """ Wraps a storage object and tells the subclass about every write made through it """
+    __storage = None
+    __pending = None
+
+    def __init__(self, storage):
+        """ storage is the real storage object """
+        self.__storage = storage
+
+        # Writes made inside the current thread's transaction() block
+        self.__pending = threading.local()
+
+    def add(self, class_name, new_record):
+        """ Same as the storage add """
+        result = self.__storage.add(class_name, new_record)
+        # DBStorage adds model objects, FileStorage adds dictionaries
+        self.__written(class_name, new_record['id'] if isinstance(new_record, dict) else new_record.id, new_record)
+        return result
+
+    def update(self, class_name, record_id, update_data, allowed = None):
+        """ Same as the storage update """
+        result = self.__storage.update(class_name, record_id, update_data, allowed)
+        self.__written(class_name, record_id, None)
+        return result
+
+    @contextmanager
+    def transaction(self):
+        """ Same as the storage transaction. The writes made inside it are passed on at the end,
+        to write_committed() if it was committed or to write_abandoned() if it failed """
+        is_outermost = not self.in_transaction()
+        if is_outermost:
+            self.__pending.writes = []
+
+        try:
+            with self.__storage.transaction():
+                yield self
+        except:
+            if is_outermost:
+                for class_name, record_id, new_record in self.__take_pending():
+                    self.write_abandoned(class_name, record_id, new_record)
+            raise
+
+        if is_outermost:
+            for class_name, record_id, new_record in self.__take_pending():
+                self.write_committed(class_name, record_id, new_record)
+
+    def in_transaction(self):
+        """ Returns True if the current thread is inside a transaction() block """
+        return getattr(self.__pending, "writes", None) is not None
+
+    def reloaded(self, class_name, record_ids):
+        """ FileStorage reload listener. Anything may have changed, so start again """
+        self.clear()
+
+    def write_made(self, class_name, record_id, new_record):
+        """ Called straight after every write, before it is committed. new_record is None for updates """
+
+    def write_committed(self, class_name, record_id, new_record):
+        """ Called once the write has been saved. new_record is None for updates """
+
+    def write_abandoned(self, class_name, record_id, new_record):
+        """ Called for the writes of a transaction that failed. FileStorage can't roll back,
+        so the storage may or may not still have the write """
+
+    def clear(self):
+        """ Forgets everything built from the records """
+
+    def __written(self, class_name, record_id, new_record):
+        """ Passes the write on now, or at the end of the transaction if there is one """
+        self.write_made(class_name, record_id, new_record)
+
+        writes = getattr(self.__pending, "writes", None)
+        if writes is not None:
+            writes.append((class_name, record_id, new_record))
+        else:
+            self.write_committed(class_name, record_id, new_record)
+
+    def __take_pending(self):
+        """ Returns the writes of the transaction that is ending and leaves it """
+        writes = self.__pending.writes
+        self.__pending.writes = None
+        return writes
+
+    def __getattr__(self, name):
+        """ Anything else goes straight to the real storage object """
+        return getattr(self.__storage, name)
@@ -0,0 +1,250 @@
+#!/usr/bin/python3
+""" Booking model """
+
+from datetime import datetime, date
+import uuid
+from flask import jsonify, request, abort
+from sqlalchemy import Column, String, Date, DateTime, ForeignKey, Index
+from data import storage, USE_DB_STORAGE, Base, DuplicateRecordError
+from models.place_amenity import Place
+
+class Booking(Base):
+    """Representation of a booking of a place. The place is taken from check_in up to (not including) check_out """
+
+    datetime_format = "%Y-%m-%dT%H:%M:%S.%f"
+    date_format = "%Y-%m-%d"
+
+    # Class attrib defaults
+    id = None
+    created_at = None
+    updated_at = None
+    __place_id = ""
+    __user_id = ""
+    __check_in = None
+    __check_out = None
+
+    if USE_DB_STORAGE:
+        __tablename__ = 'bookings'
+        # Finding the bookings of a place that end after a date only reads the ones that are still
+        # to come, however many old bookings there are. Used by both the overlap check and the availability search
+        __table_args__ = (Index("ix_bookings_place_id_check_out", "place_id", "check_out"),
+                          Index("ix_bookings_user_id", "user_id"))
+        id = Column(String(60), nullable=False, primary_key=True)
+        created_at = Column(DateTime, nullable=False, default=datetime.now())
+        updated_at = Column(DateTime, nullable=False, default=datetime.now())
+        __place_id = Column("place_id", String(60), ForeignKey('places.id'), nullable=False)
+        __user_id = Column("user_id", String(60), ForeignKey('users.id'), nullable=False)
+        __check_in = Column("check_in", Date, nullable=False)
+        __check_out = Column("check_out", Date, nullable=False)
+
+    # Constructor
+    def __init__(self, *args, **kwargs):
+        """ constructor """
+        # Set object instance defaults
+        self.id = str(uuid.uuid4())
+
+        # The timestamps are set here for db records too (not left to the column defaults)
+        # so that they are known straight away without reading the record back
+        if USE_DB_STORAGE:
+            self.created_at = datetime.now()
+        else:
+            self.created_at = datetime.now().timestamp()
+        self.updated_at = self.created_at
+
+        # Only allow place_id, user_id, check_in, check_out - in that order, so check_out can be compared with check_in.
+        # Note that setattr will call the setters for these attribs
+        if kwargs:
+            for key in ["place_id", "user_id", "check_in", "check_out"]:
+                if key in kwargs:
+                    setattr(self, key, kwargs[key])
+
+    # --- Getters and Setters ---
+    @property
+    def place_id(self):
+        """Getter for place_id"""
+        return self.__place_id
+
+    @place_id.setter
+    def place_id(self, value):
+        """Setter for place_id"""
+        if storage.exists('Place', value):
+            self.__place_id = value
+        else:
+            raise ValueError("Invalid place ID specified: {}".format(value))
+
+    @property
+    def user_id(self):
+        """Getter for user_id"""
+        return self.__user_id
+
+    @user_id.setter
+    def user_id(self, value):
+        """Setter for user_id"""
+        if storage.exists('User', value):
+            self.__user_id = value
+        else:
+            raise ValueError("Invalid user ID specified: {}".format(value))
+
+    @property
+    def check_in(self):
+        """Getter for check_in"""
+        return self.__check_in
+
+    @check_in.setter
+    def check_in(self, value):
+        """Setter for check_in"""
+        self.__check_in = Booking.to_date(value, "check in")
+
+    @property
+    def check_out(self):
+        """Getter for check_out"""
+        return self.__check_out
+
+    @check_out.setter
+    def check_out(self, value):
+        """Setter for check_out"""
+        check_out = Booking.to_date(value, "check out")
+        if self.__check_in is not None and check_out <= self.__check_in:
+            raise ValueError("Check out date must be after the check in date")
+        self.__check_out = check_out
+
+    # --- Static methods ---
+    @staticmethod
+    def to_date(value, description):
+        """ "YYYY-MM-DD" -> date. Raises ValueError if it isn't a valid date """
+        if isinstance(value, date):
+            return value
+
+        try:
+            return datetime.strptime(str(value), Booking.date_format).date()
+        except ValueError:
+            raise ValueError("Invalid {} date specified: {}".format(description, value))
+
+    @staticmethod
+    def output_data(record):
+        """ Returns the output of a record: a model object (DBStorage) or a dictionary (FileStorage) """
+        if USE_DB_STORAGE:
+            return {
+                "id": record.id,
+                "place_id": record.place_id,
+                "user_id": record.user_id,
+                "check_in": record.check_in.strftime(Booking.date_format),
+                "check_out": record.check_out.strftime(Booking.date_format),
+                "created_at": record.created_at.strftime(Booking.datetime_format),
+                "updated_at": record.updated_at.strftime(Booking.datetime_format)
+            }
+
+        return {
+            "id": record['id'],
+            "place_id": record['place_id'],
+            "user_id": record['user_id'],
+            "check_in": record['check_in'],
+            "check_out": record['check_out'],
+            "created_at": datetime.fromtimestamp(record['created_at']),
+            "updated_at": datetime.fromtimestamp(record['updated_at'])
+        }
+
+    @staticmethod
+    def specific(booking_id):
+        """ Class method that returns a specific booking's data"""
+        try:
+            booking_data = storage.get('Booking', booking_id)
+        except IndexError as exc:
+            print("Error: ", exc)
+            abort(404, "Booking not found!")
+
+        return jsonify(Booking.output_data(booking_data))
+
+    @staticmethod
+    def create():
+        """ Class method that creates a new booking"""
+        if request.get_json() is None:
+            abort(400, "Not a JSON")
+
+        data = request.get_json()
+        if 'place_id' not in data:
+            abort(400, "Missing place id")
+        if 'user_id' not in data:
+            abort(400, "Missing user id")
+        if 'check_in' not in data:
+            abort(400, "Missing check in date")
+        if 'check_out' not in data:
+            abort(400, "Missing check out date")
+
+        try:
+            new_booking = Booking(
+                place_id=data["place_id"],
+                user_id=data["user_id"],
+                check_in=data["check_in"],
+                check_out=data["check_out"]
+            )
+        except ValueError as exc:
+            return repr(exc) + "\n"
+
+        # The storage makes sure the place isn't already booked for any of these dates when the booking is added
+
+        try:
+            if USE_DB_STORAGE:
+                # DBStorage - note that the add method uses the Booking object instance
+                storage.add('Booking', new_booking)
+                output = Booking.output_data(new_booking)
+            else:
+                # FileStorage - the dates are stored as "YYYY-MM-DD" text
+                record = {
+                    "id": new_booking.id,
+                    "place_id": new_booking.place_id,
+                    "user_id": new_booking.user_id,
+                    "check_in": new_booking.check_in.strftime(Booking.date_format),
+                    "check_out": new_booking.check_out.strftime(Booking.date_format),
+                    "created_at": new_booking.created_at,
+                    "updated_at": new_booking.updated_at
+                }
+                storage.add('Booking', record)
+                output = Booking.output_data(record)
+        except DuplicateRecordError:
+            abort(409, "The place is already booked for some of the dates from {} to {}".format(data['check_in'], data['check_out']))
+        except IndexError as exc:
+            print("Error: ", exc)
+            return "Unable to add new Booking!"
+
+        return jsonify(output)
+
+    @staticmethod
+    def place_bookings(place_id):
+        """ Class method that returns the bookings of a place, ordered by check in date """
+        if not storage.exists('Place', place_id):
+            abort(404, "Place not found!")
+
+        try:
+            booking_data = storage.find('Booking', {"place_id": place_id})
+        except IndexError as exc:
+            print("Error: ", exc)
+            return "Unable to load bookings!"
+
+        data = [Booking.output_data(record) for record in booking_data]
+        return jsonify(sorted(data, key=lambda booking: booking["check_in"]))
+
+    @staticmethod
+    def available_places(check_in, check_out, city_id = None):
+        """ Class method that returns the places (of the city, if specified) that are free
+        from check_in up to (not including) check_out """
+        try:
+            check_in = Booking.to_date(check_in, "check in")
+            check_out = Booking.to_date(check_out, "check out")
+        except ValueError as exc:
+            abort(400, str(exc))
+
+        if check_out <= check_in:
+            abort(400, "Check out date must be after the check in date")
+
+        try:
+            place_data = storage.find('Place', {"city_id": city_id} if city_id is not None else None)
+            place_ids = [record.id if USE_DB_STORAGE else record['id'] for record in place_data]
+
+            # Only the booked ones come back - one lookup for all the places
+            booked = storage.overlapping_groups('Booking', place_ids, check_in, check_out)
+        except IndexError as exc:
+            print("Error: ", exc)
+            return "Unable to load places!"
+
+        return jsonify([Place.output_data(record) for record, place_id in zip(place_data, place_ids) if place_id not in booked])
@@ -5,9 +5,10 @@ from datetime import datetime
 import uuid
 import re
 from flask import jsonify, request, abort
-from sqlalchemy import Column, String, DateTime, ForeignKey
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
-from data import storage, USE_DB_STORAGE, Base
+from data import storage, USE_DB_STORAGE, Base, DuplicateRecordError
+from models.place_amenity import Place
 
 class City(Base):
     """Representation of city """
@@ -23,6 +24,7 @@ class City(Base):
 
     if USE_DB_STORAGE:
         __tablename__ = 'cities'
+        __table_args__ = (Index("uq_cities_country_id_name", "country_id", "name", unique=True),)
         id = Column(String(60), nullable=False, primary_key=True)
         created_at = Column(DateTime, nullable=False, default=datetime.now())
         updated_at = Column(DateTime, nullable=False, default=datetime.now())
@@ -37,10 +39,13 @@ class City(Base):
         # Set object instance defaults
         self.id = str(uuid.uuid4())
 
-        # Note that db records have a default of datetime.now()
-        if not USE_DB_STORAGE:
+        # The timestamps are set here for db records too (not left to the column defaults)
+        # so that they are known straight away without reading the record back
+        if USE_DB_STORAGE:
+            self.created_at = datetime.now()
+        else:
             self.created_at = datetime.now().timestamp()
-            self.updated_at = self.created_at
+        self.updated_at = self.created_at
 
         # Only allow country_id, name.
         # Note that setattr will call the setters for these 2 attribs
@@ -73,8 +78,9 @@ class City(Base):
     @country_id.setter
     def country_id(self, value):
         """Setter for private prop country_id"""
-        # ensure that the specified country id actually exists before setting
-        if storage.get('Country', value) is not None:
+        # ensure that the specified country id actually exists before setting.
+        # The answer is usually cached, so this doesn't cost a database query every time
+        if storage.exists('Country', value):
             self.__country_id = value
         else:
             raise ValueError("Invalid country_id specified: {}".format(value))
@@ -89,7 +95,8 @@ class City(Base):
         data = []
 
         try:
-            city_data = storage.get('City')
+            # find() results are cached until the next City write
+            city_data = storage.find('City')
         except IndexError as exc:
             print("Error: ", exc)
             return "Unable to load cities!"
@@ -107,7 +114,7 @@ class City(Base):
                 })
         else:
             # FileStorage
-            for k, v in city_data.items():
+            for v in city_data:
                 data.append({
                     "id": v['id'],
                     "name": v['name'],
@@ -117,7 +124,100 @@ class City(Base):
                 })
 
         return jsonify(data)
+
+    @staticmethod
+    def output_data(record):
+        """ Returns the output of a record: a model object (DBStorage) or a dictionary (FileStorage) """
+        if USE_DB_STORAGE:
+            return {
+                "id": record.id,
+                "name": record.name,
+                "country_id": record.country_id,
+                "created_at": record.created_at.strftime(City.datetime_format),
+                "updated_at": record.updated_at.strftime(City.datetime_format)
+            }
+
+        return {
+            "id": record['id'],
+            "name": record['name'],
+            "country_id": record['country_id'],
+            "created_at": datetime.fromtimestamp(record['created_at']),
+            "updated_at": datetime.fromtimestamp(record['updated_at'])
+        }
+
+    @staticmethod
+    def many(record_ids):
+        """ Class method that returns the cities with the specified ids (in the same order) and the ids not found """
+        try:
+            # a single lookup for all the ids instead of one request per id
+            city_data = storage.get_many('City', record_ids)
+        except IndexError as exc:
+            print("Error: ", exc)
+            return "Unable to load cities!"
+
+        data = [City.output_data(record) for record in city_data.values()]
+        missing = [record_id for record_id in record_ids if record_id not in city_data]
+        return jsonify({"data": data, "missing": missing})
+
+    @staticmethod
+    def all_sorted(sort, descending = False, offset = 0, limit = None, low = None, high = None):
+        """ Class method that returns the cities ordered by the sort field, optionally only from low to high """
+        try:
+            # FileStorage reads this straight off a sorted index of the field
+            city_data = storage.find_sorted('City', sort, descending, offset, limit, low, high)
+        except IndexError as exc:
+            abort(400, str(exc))
+
+        return jsonify([City.output_data(record) for record in city_data])
+
+    @staticmethod
+    def count():
+        """ Class method that returns the number of cities without loading them """
+        try:
+            total = storage.count('City')
+        except IndexError as exc:
+            print("Error: ", exc)
+            return "Unable to count cities!"
+
+        return jsonify({"count": total})
+
+    @staticmethod
+    def places_data(city_id):
+        """ Class method that returns the places in the city """
+        if not storage.exists('City', city_id):
+            abort(404, "City not found!")
+
+        try:
+            # cached until the next Place write
+            place_data = storage.find('Place', {"city_id": city_id})
+        except IndexError as exc:
+            print("Error: ", exc)
+            return "Unable to load places in the city!"
+
+        return jsonify([Place.output_data(record) for record in place_data])
+
+    @staticmethod
+    def places_count(city_id):
+        """ Class method that returns the number of places in the city without loading them """
+        if not storage.exists('City', city_id):
+            abort(404, "City not found!")
+
+        try:
+            total = storage.count('Place', {"city_id": city_id})
+        except IndexError as exc:
+            print("Error: ", exc)
+            return "Unable to count places in the city!"
+
+        return jsonify({"count": total})
     
+    @staticmethod
+    def leaderboard(city_id, ranking = "rating", limit = 10):
+        """ Class method that returns the best places of the city """
+        if not storage.exists('City', city_id):
+            abort(404, "City not found!")
+
+        return Place.leaderboard('City', city_id, ranking, limit)
+
     # def specific() - tested
     @staticmethod
     def specific(city_id):
@@ -164,14 +264,6 @@ class City(Base):
         if 'country_id' not in data:
             abort(400, "Missing country_id") 
 
-        # access all keys and values within City
-        city_data = storage.get("City")
-            # Check all rows in city data
-        for row in city_data:
-            # Check if "name" is the same as ""
-            if row.name == data['name']:
-                abort(409, "'{}' already exists".format(data['name']))
-
         try:
             new_city = City(
                 name=data["name"],
@@ -180,10 +272,8 @@ class City(Base):
         except ValueError as exc:
             return repr(exc) + "\n"
 
-        # TO DO - extra check if city doesnt already exist
-        # city_data = storage.get('City')
-        # for row in city_data:
-        #   if row.name == new_city[name]
+        # The unique index on (country_id, name) of the storage stops the same city being added twice.
+        # Different countries can still have cities with the same name
 
         output = {
             "id": new_city.id,
@@ -206,6 +296,8 @@ class City(Base):
                 # timestamp -> readable text
                 output['created_at'] = datetime.fromtimestamp(new_city.created_at)
                 output['updated_at'] = datetime.fromtimestamp(new_city.updated_at)
+        except DuplicateRecordError:
+            abort(409, "'{}' already exists".format(data['name']))
         except IndexError as exc:
             print("Error: ", exc)
             return "Unable to add new City!"
@@ -224,6 +316,8 @@ class City(Base):
         try:
             # update the city record. Only name can be changed
             result = storage.update('City', city_id, data, ["name"])
+        except DuplicateRecordError:
+            abort(409, "'{}' already exists".format(data.get('name')))
         except IndexError as exc:
             print("Error: ", exc)
             return "Unable to update specified city!"
@@ -5,10 +5,11 @@ from datetime import datetime
 import uuid
 import re
 from flask import jsonify, request, abort
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import Column, String, DateTime, Index
 from sqlalchemy.orm import relationship
-from data import storage, USE_DB_STORAGE, Base
+from data import storage, USE_DB_STORAGE, Base, DuplicateRecordError
 from models.city import City
+from models.place_amenity import Place
 
 class Country(Base):
     """Representation of country """
@@ -24,6 +25,7 @@ class Country(Base):
 
     if USE_DB_STORAGE:
         __tablename__ = 'countries'
+        __table_args__ = (Index("uq_countries_code", "code", unique=True), Index("uq_countries_name", "name", unique=True))
         id = Column(String(60), nullable=False, primary_key=True)
         created_at = Column(DateTime, nullable=False, default=datetime.now())
         updated_at = Column(DateTime, nullable=False, default=datetime.now())
@@ -37,10 +39,13 @@ class Country(Base):
         # Set object instance defaults
         self.id = str(uuid.uuid4())
 
-        # Note that db records have a default of datetime.now()
-        if not USE_DB_STORAGE:
+        # The timestamps are set here for db records too (not left to the column defaults)
+        # so that they are known straight away without reading the record back
+        if USE_DB_STORAGE:
+            self.created_at = datetime.now()
+        else:
             self.created_at = datetime.now().timestamp()
-            self.updated_at = self.created_at
+        self.updated_at = self.created_at
 
         # Only allow name, code.
         # Note that setattr will call the setters for these attribs
@@ -89,7 +94,8 @@ class Country(Base):
         data = []
 
         try:
-            country_data = storage.get('Country')
+            # find() results are cached until the next Country write
+            country_data = storage.find('Country')
         except IndexError as exc:
             print("Error: ", exc)
             return "Unable to load countries!"
@@ -104,7 +110,7 @@ class Country(Base):
                     "updated_at": row.updated_at.strftime(Country.datetime_format)
                 })
         else:
-            for k, v in country_data.items():
+            for v in country_data:
                 data.append({
                     "id": v['id'],
                     "name": v['name'],
@@ -115,6 +121,93 @@ class Country(Base):
 
         return jsonify(data)
 
+    @staticmethod
+    def output_data(record):
+        """ Returns the output of a record: a model object (DBStorage) or a dictionary (FileStorage) """
+        if USE_DB_STORAGE:
+            return {
+                "id": record.id,
+                "name": record.name,
+                "code": record.code,
+                "created_at": record.created_at.strftime(Country.datetime_format),
+                "updated_at": record.updated_at.strftime(Country.datetime_format)
+            }
+
+        return {
+            "id": record['id'],
+            "name": record['name'],
+            "code": record['code'],
+            "created_at": datetime.fromtimestamp(record['created_at']),
+            "updated_at": datetime.fromtimestamp(record['updated_at'])
+        }
+
+    @staticmethod
+    def many(record_ids):
+        """ Class method that returns the countries with the specified ids (in the same order) and the ids not found """
+        try:
+            # a single lookup for all the ids instead of one request per id
+            country_data = storage.get_many('Country', record_ids)
+        except IndexError as exc:
+            print("Error: ", exc)
+            return "Unable to load countries!"
+
+        data = [Country.output_data(record) for record in country_data.values()]
+        missing = [record_id for record_id in record_ids if record_id not in country_data]
+        return jsonify({"data": data, "missing": missing})
+
+    @staticmethod
+    def all_sorted(sort, descending = False, offset = 0, limit = None, low = None, high = None):
+        """ Class method that returns the countries ordered by the sort field, optionally only from low to high """
+        try:
+            # FileStorage reads this straight off a sorted index of the field
+            country_data = storage.find_sorted('Country', sort, descending, offset, limit, low, high)
+        except IndexError as exc:
+            abort(400, str(exc))
+
+        return jsonify([Country.output_data(record) for record in country_data])
+
+    @staticmethod
+    def count():
+        """ Class method that returns the number of countries without loading them """
+        try:
+            total = storage.count('Country')
+        except IndexError as exc:
+            print("Error: ", exc)
+            return "Unable to count countries!"
+
+        return jsonify({"count": total})
+
+    @staticmethod
+    def cities_count(country_code):
+        """ Class method that returns the number of cities of the country without loading them """
+        # cached until the next Country write
+        country_data = storage.find("Country", {"code": country_code})
+        if len(country_data) == 0:
+            abort(404, "Country not found for code {}".format(country_code))
+
+        # DBStorage returns model objects, FileStorage returns dictionaries
+        country_id = country_data[0].id if USE_DB_STORAGE else country_data[0]['id']
+
+        try:
+            total = storage.count('City', {"country_id": country_id})
+        except IndexError as exc:
+            print("Error: ", exc)
+            return "Unable to count cities of the country!"
+
+        return jsonify({"count": total})
+
+    @staticmethod
+    def leaderboard(country_code, ranking = "rating", limit = 10):
+        """ Class method that returns the best places of the country """
+        # cached until the next Country write
+        country_data = storage.find("Country", {"code": country_code})
+        if len(country_data) == 0:
+            abort(404, "Country not found for code {}".format(country_code))
+
+        # DBStorage returns model objects, FileStorage returns dictionaries
+        country_id = country_data[0].id if USE_DB_STORAGE else country_data[0]['id']
+        return Place.leaderboard('Country', country_id, ranking, limit)
+
     @staticmethod
     def specific(country_code):
         """ Class method that returns a specific country's data"""
@@ -169,13 +262,6 @@ class Country(Base):
         if 'code' not in data:
             abort(400, "Missing country code")
 
-        # access all keys and values within Country
-        country_data = storage.get("Country")
-            # Check all rows in country data
-        for row in country_data:
-            # Check if "name" is the same as ""
-            if row.name == data['name']:
-                abort(409, "Country with name '{}' already exists".format(data['name']))
         try:
             new_country = Country(
                 name=data["name"],
@@ -192,8 +278,7 @@ class Country(Base):
             "updated_at": new_country.updated_at
         }
 
-        # TODO: add a check for the country code to ensure that we don't have 2
-        # countries with the same code
+        # Both the name and the code are checked by the unique indexes of the storage when the country is added
 
         try:
             if USE_DB_STORAGE:
@@ -204,8 +289,10 @@ class Country(Base):
             else:
                 # FileStorage - note that the add method uses the dictionary 'output'
                 storage.add('Country', output)
-                output['created_at'] = datetime.fromtimestamp(Country.created_at)
-                output['updated_at'] = datetime.fromtimestamp(Country.updated_at)
+                output['created_at'] = datetime.fromtimestamp(new_country.created_at)
+                output['updated_at'] = datetime.fromtimestamp(new_country.updated_at)
+        except DuplicateRecordError:
+            abort(409, "Country with name '{}' or code '{}' already exists".format(data['name'], data['code']))
         except IndexError as exc:
             print("Error: ", exc)
             return "Unable to add new Country!"
@@ -245,6 +332,8 @@ class Country(Base):
         try:
             # update the Country record. Only name can be changed
             result = storage.update('Country', country_id, data, ["name"])
+        except DuplicateRecordError:
+            abort(409, "Country with name '{}' already exists".format(data.get('name')))
         except IndexError as exc:
             print("Error: ", exc)
             return "Unable to update specified country!"
@@ -274,21 +363,15 @@ class Country(Base):
         """ Class method that returns a specific country's cities"""
         data = []
         countries_cities = {}
-        wanted_country_id = ""
 
-        country_data = storage.get("Country")
-        city_data = storage.get("City")
+        # Both queries are cached until the next Country / City write
+        country_data = storage.find("Country", {"code": country_code})
+        if len(country_data) == 0:
+            abort(404, "Country not found for code {}".format(country_code))
 
         if USE_DB_STORAGE:
-            # Once again, we have unoptimised code for DB Storage.
-            # Surely there is a better way to do this? Maybe using relationships?
-
-            for row in country_data:
-                if row.code == country_code:
-                    wanted_country_id = row.id
-            specific_country = storage.get("Country", wanted_country_id)      
-              # Note the use of the amenities relationship
-            for item in specific_country.cities:
+            specific_country = country_data[0]
+            for item in storage.find("City", {"country_id": specific_country.id}):
                 data.append(item.name)
 
             countries_cities[specific_country.name] = data
@@ -296,18 +379,15 @@ class Country(Base):
             return countries_cities
 
         else:
-            for k, v in country_data.items():
-                if v['code'] == country_code:
-                    wanted_country_id = v['id']
-
-            for k, v in city_data.items():
-                if v['country_id'] == wanted_country_id:
-                    data.append({
-                        "id": v['id'],
-                        "name": v['name'],
-                        "country_id": v['country_id'],
-                        "created_at":datetime.fromtimestamp(v['created_at']),
-                        "updated_at":datetime.fromtimestamp(v['updated_at'])
-                    })
+            wanted_country_id = country_data[0]['id']
+
+            for v in storage.find("City", {"country_id": wanted_country_id}):
+                data.append({
+                    "id": v['id'],
+                    "name": v['name'],
+                    "country_id": v['country_id'],
+                    "created_at":datetime.fromtimestamp(v['created_at']),
+                    "updated_at":datetime.fromtimestamp(v['updated_at'])
+                })
 
         return jsonify(data)
@@ -5,9 +5,9 @@ from datetime import datetime
 import uuid
 import re
 from flask import jsonify, request, abort
-from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey, Table
+from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey, Index, Table
 from sqlalchemy.orm import relationship
-from data import storage, USE_DB_STORAGE, Base
+from data import storage, USE_DB_STORAGE, Base, DuplicateRecordError
 
 # This is unfortunately the best possible way to have the many-to-many relationship work both ways.
 # If the two classes are split into separate files, you'll have to import the other class
@@ -20,7 +20,9 @@ if USE_DB_STORAGE:
         'place_amenity',
         Base.metadata,
         Column('place_id', String(60), ForeignKey('places.id'), primary_key=True),
-        Column('amenity_id', String(60), ForeignKey('amenities.id'), primary_key=True)
+        Column('amenity_id', String(60), ForeignKey('amenities.id'), primary_key=True),
+        # the primary key covers place_id -> amenities. This one is for amenity_id -> places
+        Index("amenity_id", "amenity_id")
     )
 
 
@@ -47,6 +49,8 @@ class Place(Base):
 
     if USE_DB_STORAGE:
         __tablename__ = 'places'
+        # city_id / host_id have the same names as the keys MySQL makes for the foreign keys
+        __table_args__ = (Index("uq_places_name", "name", unique=True), Index("city_id", "city_id"), Index("host_id", "host_id"))
         id = Column(String(60), nullable=False, primary_key=True)
         created_at = Column(DateTime, nullable=False, default=datetime.now())
         updated_at = Column(DateTime, nullable=False, default=datetime.now())
@@ -72,10 +76,13 @@ class Place(Base):
         # Set object instance defaults
         self.id = str(uuid.uuid4())
 
-        # Note that db records have a default of datetime.now()
-        if not USE_DB_STORAGE:
+        # The timestamps are set here for db records too (not left to the column defaults)
+        # so that they are known straight away without reading the record back
+        if USE_DB_STORAGE:
+            self.created_at = datetime.now()
+        else:
             self.created_at = datetime.now().timestamp()
-            self.updated_at = self.created_at
+        self.updated_at = self.created_at
 
         # Only allow whatever is in can_init_list.
         # Note that setattr will call the setters for these attribs
@@ -270,6 +277,183 @@ class Place(Base):
                 })
 
         return jsonify(data)
+
+    @staticmethod
+    def output_data(record):
+        """ Returns the output of a record: a model object (DBStorage) or a dictionary (FileStorage) """
+        if USE_DB_STORAGE:
+            return {
+                "id": record.id,
+                "host_id": record.host_id,
+                "city_id": record.city_id,
+                "name": record.name,
+                "description": record.description,
+                "address": record.address,
+                "latitude": record.latitude,
+                "longitude": record.longitude,
+                "number_of_rooms": record.number_of_rooms,
+                "number_of_bathrooms": record.number_of_bathrooms,
+                "price_per_night": record.price_per_night,
+                "max_guests": record.max_guests,
+                "created_at": record.created_at.strftime(Place.datetime_format),
+                "updated_at": record.updated_at.strftime(Place.datetime_format)
+            }
+
+        # the data files use some older field names
+        return {
+            "id": record['id'],
+            "host_id": record.get('host_id', record.get('host_user_id')),
+            "city_id": record.get('city_id', record.get('city')),
+            "name": record['name'],
+            "description": record['description'],
+            "address": record['address'],
+            "latitude": record['latitude'],
+            "longitude": record['longitude'],
+            "number_of_rooms": record['number_of_rooms'],
+            "number_of_bathrooms": record.get('number_of_bathrooms', record.get('bathrooms')),
+            "price_per_night": record['price_per_night'],
+            "max_guests": record['max_guests'],
+            "created_at": datetime.fromtimestamp(record['created_at']),
+            "updated_at": datetime.fromtimestamp(record['updated_at'])
+        }
+
+    @staticmethod
+    def many(record_ids):
+        """ Class method that returns the places with the specified ids (in the same order) and the ids not found """
+        try:
+            # a single lookup for all the ids instead of one request per id
+            place_data = storage.get_many('Place', record_ids)
+        except IndexError as exc:
+            print("Error: ", exc)
+            return "Unable to load places!"
+
+        data = [Place.output_data(record) for record in place_data.values()]
+        missing = [record_id for record_id in record_ids if record_id not in place_data]
+        return jsonify({"data": data, "missing": missing})
+
+    @staticmethod
+    def all_sorted(sort, descending = False, offset = 0, limit = None, low = None, high = None):
+        """ Class method that returns the places ordered by the sort field, optionally only from low to high """
+        try:
+            # FileStorage reads this straight off a sorted index of the field
+            place_data = storage.find_sorted('Place', sort, descending, offset, limit, low, high)
+        except IndexError as exc:
+            abort(400, str(exc))
+
+        return jsonify([Place.output_data(record) for record in place_data])
+
+    @staticmethod
+    def in_ranges(ranges):
+        """ Class method that returns the places whose numeric fields are within all the ranges """
+        try:
+            # FileStorage filters these on NumPy arrays of the fields
+            place_data = storage.find_in_ranges('Place', ranges)
+        except IndexError as exc:
+            abort(400, str(exc))
+
+        return jsonify([Place.output_data(record) for record in place_data])
+
+    @staticmethod
+    def with_amenities(amenities):
+        """ Class method that returns the places that have every one of the amenities (ids or names) """
+        amenity_ids = []
+        for amenity in amenities:
+            if storage.exists('Amenity', amenity):
+                amenity_ids.append(amenity)
+                continue
+
+            # not an id - try it as a name (cached until the next Amenity write)
+            amenity_data = storage.find('Amenity', {"name": amenity})
+            if len(amenity_data) == 0:
+                abort(404, "Amenity not found: {}".format(amenity))
+            amenity_ids.append(amenity_data[0].id if USE_DB_STORAGE else amenity_data[0]['id'])
+
+        try:
+            place_data = storage.find_linked_to_all('Place', 'Amenity', amenity_ids)
+        except IndexError as exc:
+            print("Error: ", exc)
+            return "Unable to load places!"
+
+        return jsonify([Place.output_data(record) for record in place_data])
+
+    @staticmethod
+    def leaderboard(class_name, record_id, ranking = "rating", limit = 10):
+        """ Class method that returns the best places of a city or country ('City' / 'Country' and its id),
+        with their average rating and review count """
+        try:
+            # kept up to date as reviews are written - nothing is sorted here
+            entries = storage.leaderboard(class_name, record_id, ranking, limit)
+        except IndexError as exc:
+            abort(400, str(exc))
+
+        try:
+            place_data = storage.get_many('Place', [entry["place_id"] for entry in entries])
+        except IndexError as exc:
+            print("Error: ", exc)
+            return "Unable to load places!"
+
+        return jsonify([{
+            **Place.output_data(place_data[entry["place_id"]]),
+            "average_rating": entry["average_rating"],
+            "review_count": entry["review_count"]
+        } for entry in entries if entry["place_id"] in place_data])
+
+    @staticmethod
+    def similar(place_id, limit = 10):
+        """ Class method that returns the places of the same city that are most like the place
+        (price, capacity, rooms, location and amenities), with their similarity from -1 to 1 """
+        if not storage.exists('Place', place_id):
+            abort(404, "Place not found!")
+
+        try:
+            # worked out for the whole city at once and kept until one of its places is written
+            matches = storage.similar_places(place_id, limit)
+            place_data = storage.get_many('Place', [match_id for match_id, similarity in matches])
+        except IndexError as exc:
+            print("Error: ", exc)
+            return "Unable to find similar places!"
+
+        return jsonify([{**Place.output_data(place_data[match_id]), "similarity": similarity}
+                        for match_id, similarity in matches if match_id in place_data])
+
+    @staticmethod
+    def count():
+        """ Class method that returns the number of places without loading them """
+        try:
+            total = storage.count('Place')
+        except IndexError as exc:
+            print("Error: ", exc)
+            return "Unable to count places!"
+
+        return jsonify({"count": total})
+
+    @staticmethod
+    def reviews_count(place_id):
+        """ Class method that returns the number of reviews of the place without loading them """
+        if not storage.exists('Place', place_id):
+            abort(404, "Place not found!")
+
+        try:
+            total = storage.count('Review', {"place_id": place_id})
+        except IndexError as exc:
+            print("Error: ", exc)
+            return "Unable to count reviews of the place!"
+
+        return jsonify({"count": total})
+
+    @staticmethod
+    def amenities_count(place_id):
+        """ Class method that returns the number of amenities of the place without loading them """
+        if not storage.exists('Place', place_id):
+            abort(404, "Place not found!")
+
+        try:
+            total = storage.count_relations('Place', 'Amenity', place_id)
+        except IndexError as exc:
+            print("Error: ", exc)
+            return "Unable to count amenities of the place!"
+
+        return jsonify({"count": total})
     
     # def specific()
     @staticmethod
@@ -352,14 +536,6 @@ class Place(Base):
         if 'city_id' not in data:
             abort(400, "Missing city ID")
         
-        # access all keys and values within Amenity
-        place_data = storage.get("Place")
-            # Check all rows in amenity data
-        for row in place_data:
-            # Check if "name" is the same as ""
-            if row.name == data['name']:
-                abort(409, "Place with name '{}' already exists".format(data['name']))
-
         try:
             new_place = Place(
                 description=data["description"],
@@ -377,7 +553,7 @@ class Place(Base):
         except ValueError as exc:
             return repr(exc) + "\n"
 
-        # TO DO - extra check if city doesnt already exist
+        # The name is checked by the unique index of the storage when the place is added
 
         output = {
             "id": new_place.id,
@@ -409,6 +585,8 @@ class Place(Base):
                 # timestamp -> readable text
                 output['created_at'] = datetime.fromtimestamp(new_place.created_at)
                 output['updated_at'] = datetime.fromtimestamp(new_place.updated_at)
+        except DuplicateRecordError:
+            abort(409, "Place with name '{}' already exists".format(data['name']))
         except IndexError as exc:
             print("Error: ", exc)
             return "Unable to add new Place!"
@@ -437,6 +615,8 @@ class Place(Base):
                                                               "name",
                                                               "host_id",
                                                               "city_id"])
+        except DuplicateRecordError:
+            abort(409, "Place with name '{}' already exists".format(data.get('name')))
         except IndexError as exc:
             print("Error: ", exc)
             return "Unable to update specified place!"
@@ -664,6 +844,20 @@ class Place(Base):
         # return jsonify(data)
 
 
+    # def denormalised detail document of specified place
+    @staticmethod
+    def detail(place_id):
+        """ Returns the place together with its city, country, host, amenities and reviews.
+        The document is kept up to date by the storage, so this is a single lookup """
+        try:
+            document = storage.place_document(place_id)
+        except IndexError as exc:
+            print("Error: ", exc)
+            abort(404, "Place not found!")
+
+        return jsonify(document)
+
+
 class Amenity(Base):
     """Representation of amenity """
 
@@ -675,13 +869,14 @@ class Amenity(Base):
     updated_at = None
     __name = ""
 
-    # Class attrib defaults
-    __tablename__ = 'amenities'
-    id = Column(String(60), nullable=False, primary_key=True)
-    created_at = Column(DateTime, nullable=False, default=datetime.now())
-    updated_at = Column(DateTime, nullable=False, default=datetime.now())
-    __name = Column("name", String(128), nullable=False)
-    places = relationship("Place", secondary=place_amenity, back_populates = 'amenities')
+    if USE_DB_STORAGE:
+        __tablename__ = 'amenities'
+        __table_args__ = (Index("uq_amenities_name", "name", unique=True),)
+        id = Column(String(60), nullable=False, primary_key=True)
+        created_at = Column(DateTime, nullable=False, default=datetime.now())
+        updated_at = Column(DateTime, nullable=False, default=datetime.now())
+        __name = Column("name", String(128), nullable=False)
+        places = relationship("Place", secondary=place_amenity, back_populates = 'amenities')
 
     # constructor
     def __init__(self, *args, **kwargs):
@@ -689,6 +884,14 @@ class Amenity(Base):
         # Set object instance defaults
         self.id = str(uuid.uuid4())
 
+        # The timestamps are set here for db records too (not left to the column defaults)
+        # so that they are known straight away without reading the record back
+        if USE_DB_STORAGE:
+            self.created_at = datetime.now()
+        else:
+            self.created_at = datetime.now().timestamp()
+        self.updated_at = self.created_at
+
         # Note that setattr will call the setters for attribs in the list
         if kwargs:
             for key, value in kwargs.items():
@@ -720,7 +923,8 @@ class Amenity(Base):
         data = []
 
         try:
-            amenity_data = storage.get('Amenity')
+            # find() results are cached until the next Amenity write
+            amenity_data = storage.find('Amenity')
         except IndexError as exc:
             print("Error: ", exc)
             return "Unable to load amenity!"
@@ -737,7 +941,7 @@ class Amenity(Base):
                 })
         else:
             # FileStorage
-            for k, v in amenity_data.items():
+            for v in amenity_data:
                 data.append({
                     "id": v['id'],
                     "name": v['name'],
@@ -747,6 +951,74 @@ class Amenity(Base):
 
         return jsonify(data)
 
+    @staticmethod
+    def output_data(record):
+        """ Returns the output of a record: a model object (DBStorage) or a dictionary (FileStorage) """
+        if USE_DB_STORAGE:
+            return {
+                "id": record.id,
+                "name": record.name,
+                "created_at": record.created_at.strftime(Amenity.datetime_format),
+                "updated_at": record.updated_at.strftime(Amenity.datetime_format)
+            }
+
+        return {
+            "id": record['id'],
+            "name": record['name'],
+            "created_at": datetime.fromtimestamp(record['created_at']),
+            "updated_at": datetime.fromtimestamp(record['updated_at'])
+        }
+
+    @staticmethod
+    def many(record_ids):
+        """ Class method that returns the amenities with the specified ids (in the same order) and the ids not found """
+        try:
+            # a single lookup for all the ids instead of one request per id
+            amenity_data = storage.get_many('Amenity', record_ids)
+        except IndexError as exc:
+            print("Error: ", exc)
+            return "Unable to load amenities!"
+
+        data = [Amenity.output_data(record) for record in amenity_data.values()]
+        missing = [record_id for record_id in record_ids if record_id not in amenity_data]
+        return jsonify({"data": data, "missing": missing})
+
+    @staticmethod
+    def all_sorted(sort, descending = False, offset = 0, limit = None, low = None, high = None):
+        """ Class method that returns the amenities ordered by the sort field, optionally only from low to high """
+        try:
+            # FileStorage reads this straight off a sorted index of the field
+            amenity_data = storage.find_sorted('Amenity', sort, descending, offset, limit, low, high)
+        except IndexError as exc:
+            abort(400, str(exc))
+
+        return jsonify([Amenity.output_data(record) for record in amenity_data])
+
+    @staticmethod
+    def count():
+        """ Class method that returns the number of amenities without loading them """
+        try:
+            total = storage.count('Amenity')
+        except IndexError as exc:
+            print("Error: ", exc)
+            return "Unable to count amenities!"
+
+        return jsonify({"count": total})
+
+    @staticmethod
+    def places_count(amenity_id):
+        """ Class method that returns the number of places with the amenity without loading them """
+        if not storage.exists('Amenity', amenity_id):
+            abort(404, "Amenity not found!")
+
+        try:
+            total = storage.count_relations('Amenity', 'Place', amenity_id)
+        except IndexError as exc:
+            print("Error: ", exc)
+            return "Unable to count places with the amenity!"
+
+        return jsonify({"count": total})
+
     @staticmethod
     def specific(amenity_id):
         """ Class method that returns a specific amenities data"""
@@ -790,13 +1062,6 @@ class Amenity(Base):
             abort(400, "Missing name")
 
 
-    # access all keys and values within Amenity
-        amenity_data = storage.get("Amenity")
-            # Check all rows in amenity data
-        for row in amenity_data:
-            # Check if "name" is the same as ""
-            if row.name == data['name']:
-                abort(409, "Amenity with name '{}' already exists".format(data['name']))
         try:
             # use the specific() method before creating - catch the error in the try (try without try and except first).
             # "tries" to create new 'Amenity' instance with name
@@ -807,9 +1072,7 @@ class Amenity(Base):
             return repr(exc) + "\n"
 
 
-        # if new_amenity.name == 
-        # TODO: add a check here to ensure that the provided amenity is not already used by someone else in the DB
-        # If you see this message, tell me and I will (maybe) give you a cookie lol
+        # The name is checked by the unique index of the storage when the amenity is added
 
         #creates dictionary "output" containing attributes of new 'Amenity'
         output = {
@@ -832,6 +1095,8 @@ class Amenity(Base):
                 # timestamp -> readable text
                 output['created_at'] = datetime.fromtimestamp(new_amenity.created_at)
                 output['updated_at'] = datetime.fromtimestamp(new_amenity.updated_at)
+        except DuplicateRecordError:
+            abort(409, "Amenity with name '{}' already exists".format(data['name']))
         except IndexError as exc:
             print("Error: ", exc)
             return "Unable to add new Amenity!"
@@ -849,6 +1114,8 @@ class Amenity(Base):
         try:
             # update the Amenity record. Only name can be changed
             result = storage.update('Amenity', amenity_id, data, ["name"])
+        except DuplicateRecordError:
+            abort(409, "Amenity with name '{}' already exists".format(data.get('name')))
         except IndexError as exc:
             print("Error: ", exc)
             return "Unable to update specified amenity!"
@@ -5,7 +5,7 @@ from datetime import datetime
 import uuid
 import re
 from flask import jsonify, request, abort
-from sqlalchemy import Column, String, DateTime, ForeignKey
+from sqlalchemy import Column, String, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from data import storage, USE_DB_STORAGE, Base
 
@@ -25,6 +25,9 @@ class Review(Base):
 
     if USE_DB_STORAGE:
         __tablename__ = 'reviews'
+        # Same names as the keys MySQL makes for the foreign keys, so no second copy is made there.
+        # They keep the counts of reviews per place / user cheap on SQLite too
+        __table_args__ = (Index("place_id", "place_id"), Index("user_id", "user_id"))
         id = Column(String(60), nullable=False, primary_key=True)
         created_at = Column(DateTime, nullable=False, default=datetime.now())
         updated_at = Column(DateTime, nullable=False, default=datetime.now())
@@ -41,10 +44,13 @@ class Review(Base):
         # Set object instance defaults
         self.id = str(uuid.uuid4())
 
-        # Note that db records have a default of datetime.now()
-        if not USE_DB_STORAGE:
+        # The timestamps are set here for db records too (not left to the column defaults)
+        # so that they are known straight away without reading the record back
+        if USE_DB_STORAGE:
+            self.created_at = datetime.now()
+        else:
             self.created_at = datetime.now().timestamp()
-            self.updated_at = self.created_at
+        self.updated_at = self.created_at
         
         # Only allow comment, commentor_user_id, place_id, rating.
         # Setattr will call the setters for these attribs 
@@ -84,7 +90,7 @@ class Review(Base):
     @user_id.setter
     def user_id(self, value):
         """Setter for commentor_user_id"""
-        if storage.get('User', value) is not None: 
+        if storage.exists('User', value):
             self.__user_id = value
         
         else:
@@ -98,7 +104,7 @@ class Review(Base):
     @place_id.setter
     def place_id(self, value):
         """ Setter for place_id """
-        if storage.get('Place', value) is not None:
+        if storage.exists('Place', value):
             self.__place_id = value
         else:
             raise ValueError("Invalid place ID specified: {}".format(value))
@@ -158,6 +164,67 @@ class Review(Base):
 
         return jsonify(data)
 
+    @staticmethod
+    def output_data(record):
+        """ Returns the output of a record: a model object (DBStorage) or a dictionary (FileStorage) """
+        if USE_DB_STORAGE:
+            return {
+                "id": record.id,
+                "comment": record.comment,
+                "user_id": record.user_id,
+                "place_id": record.place_id,
+                "rating": record.rating,
+                "created_at": record.created_at.strftime(Review.datetime_format),
+                "updated_at": record.updated_at.strftime(Review.datetime_format)
+            }
+
+        # the data files use some older field names
+        return {
+            "id": record['id'],
+            "comment": record.get('comment', record.get('feedback')),
+            "user_id": record.get('user_id', record.get('commentor_user_id')),
+            "place_id": record['place_id'],
+            "rating": record['rating'],
+            "created_at": datetime.fromtimestamp(record['created_at']),
+            "updated_at": datetime.fromtimestamp(record['updated_at'])
+        }
+
+    @staticmethod
+    def many(record_ids):
+        """ Class method that returns the reviews with the specified ids (in the same order) and the ids not found """
+        try:
+            # a single lookup for all the ids instead of one request per id
+            review_data = storage.get_many('Review', record_ids)
+        except IndexError as exc:
+            print("Error: ", exc)
+            return "Unable to load reviews!"
+
+        data = [Review.output_data(record) for record in review_data.values()]
+        missing = [record_id for record_id in record_ids if record_id not in review_data]
+        return jsonify({"data": data, "missing": missing})
+
+    @staticmethod
+    def all_sorted(sort, descending = False, offset = 0, limit = None, low = None, high = None):
+        """ Class method that returns the reviews ordered by the sort field, optionally only from low to high """
+        try:
+            # FileStorage reads this straight off a sorted index of the field
+            review_data = storage.find_sorted('Review', sort, descending, offset, limit, low, high)
+        except IndexError as exc:
+            abort(400, str(exc))
+
+        return jsonify([Review.output_data(record) for record in review_data])
+
+    @staticmethod
+    def count():
+        """ Class method that returns the number of reviews without loading them """
+        try:
+            total = storage.count('Review')
+        except IndexError as exc:
+            print("Error: ", exc)
+            return "Unable to count reviews!"
+
+        return jsonify({"count": total})
+
     # Tested - working
     @staticmethod
     def specific(review_id):
@@ -5,9 +5,11 @@ from datetime import datetime
 import uuid
 import re
 from flask import jsonify, request, abort
-from sqlalchemy import Column, String, DateTime
+from sqlalchemy import Column, String, DateTime, Index
 from sqlalchemy.orm import relationship
-from data import storage, USE_DB_STORAGE, Base
+from data import storage, USE_DB_STORAGE, Base, DuplicateRecordError
+from models.place_amenity import Place
+from models.review import Review
 
 class User(Base):
     """Representation of user """
@@ -25,6 +27,7 @@ class User(Base):
 
     if USE_DB_STORAGE:
         __tablename__ = 'users'
+        __table_args__ = (Index("uq_users_email", "email", unique=True),)
         id = Column(String(60), nullable=False, primary_key=True)
         created_at = Column(DateTime, nullable=False, default=datetime.now())
         updated_at = Column(DateTime, nullable=False, default=datetime.now())
@@ -41,10 +44,13 @@ class User(Base):
         # Set object instance defaults
         self.id = str(uuid.uuid4())
 
-        # Note that db records have a default of datetime.now()
-        if not USE_DB_STORAGE:
+        # The timestamps are set here for db records too (not left to the column defaults)
+        # so that they are known straight away without reading the record back
+        if USE_DB_STORAGE:
+            self.created_at = datetime.now()
+        else:
             self.created_at = datetime.now().timestamp()
-            self.updated_at = self.created_at
+        self.updated_at = self.created_at
 
         # Only allow first_name, last_name, email, password.
         # Note that setattr will call the setters for these attribs
@@ -158,6 +164,94 @@ class User(Base):
 
         return jsonify(data)
 
+    @staticmethod
+    def output_data(record):
+        """ Returns the output of a record: a model object (DBStorage) or a dictionary (FileStorage) """
+        if USE_DB_STORAGE:
+            return {
+                "id": record.id,
+                "first_name": record.first_name,
+                "last_name": record.last_name,
+                "email": record.email,
+                "password": record.password,
+                "created_at": record.created_at.strftime(User.datetime_format),
+                "updated_at": record.updated_at.strftime(User.datetime_format)
+            }
+
+        return {
+            "id": record['id'],
+            "first_name": record['first_name'],
+            "last_name": record['last_name'],
+            "email": record['email'],
+            "password": record['password'],
+            "created_at": datetime.fromtimestamp(record['created_at']),
+            "updated_at": datetime.fromtimestamp(record['updated_at'])
+        }
+
+    @staticmethod
+    def many(record_ids):
+        """ Class method that returns the users with the specified ids (in the same order) and the ids not found """
+        try:
+            # a single lookup for all the ids instead of one request per id
+            user_data = storage.get_many('User', record_ids)
+        except IndexError as exc:
+            print("Error: ", exc)
+            return "Unable to load users!"
+
+        data = [User.output_data(record) for record in user_data.values()]
+        missing = [record_id for record_id in record_ids if record_id not in user_data]
+        return jsonify({"data": data, "missing": missing})
+
+    @staticmethod
+    def all_sorted(sort, descending = False, offset = 0, limit = None, low = None, high = None):
+        """ Class method that returns the users ordered by the sort field, optionally only from low to high """
+        try:
+            # FileStorage reads this straight off a sorted index of the field
+            user_data = storage.find_sorted('User', sort, descending, offset, limit, low, high)
+        except IndexError as exc:
+            abort(400, str(exc))
+
+        return jsonify([User.output_data(record) for record in user_data])
+
+    @staticmethod
+    def count():
+        """ Class method that returns the number of users without loading them """
+        try:
+            total = storage.count('User')
+        except IndexError as exc:
+            print("Error: ", exc)
+            return "Unable to count users!"
+
+        return jsonify({"count": total})
+
+    @staticmethod
+    def reviews_count(user_id):
+        """ Class method that returns the number of reviews written by the user without loading them """
+        if not storage.exists('User', user_id):
+            abort(404, "User not found!")
+
+        try:
+            total = storage.count('Review', {"user_id": user_id})
+        except IndexError as exc:
+            print("Error: ", exc)
+            return "Unable to count reviews written by the user!"
+
+        return jsonify({"count": total})
+
+    @staticmethod
+    def places_count(user_id):
+        """ Class method that returns the number of places hosted by the user without loading them """
+        if not storage.exists('User', user_id):
+            abort(404, "User not found!")
+
+        try:
+            total = storage.count('Place', {"host_id": user_id})
+        except IndexError as exc:
+            print("Error: ", exc)
+            return "Unable to count places hosted by the user!"
+
+        return jsonify({"count": total})
+
     @staticmethod
     def specific(user_id):
         """ Class method that returns a specific user's data"""
@@ -206,14 +300,6 @@ class User(Base):
         if 'password' not in data:
             abort(400, "Missing password")
 
-    # access all keys and values within User
-        user_data = storage.get("User")
-            # Check all rows in user data
-        for row in user_data:
-            # Check if "email" is the same as existing user
-            if row.email == data['email']:
-                abort(409, "User with email '{}' already exists".format(data['email']))
-
         try:
             new_user = User(
                 first_name=data["first_name"],
@@ -224,8 +310,8 @@ class User(Base):
         except ValueError as exc:
             return repr(exc) + "\n"
 
-        # TODO: add a check here to ensure that the provided email is not already used by someone else in the DB
-        # If you see this message, tell me and I will (maybe) give you a cookie lol
+        # The email is checked by the unique index of the storage when the user is added.
+        # No need to go through all the existing users beforehand
 
         output = {
             "id": new_user.id,
@@ -249,6 +335,8 @@ class User(Base):
                 # timestamp -> readable text
                 output['created_at'] = datetime.fromtimestamp(new_user.created_at)
                 output['updated_at'] = datetime.fromtimestamp(new_user.updated_at)
+        except DuplicateRecordError:
+            abort(409, "User with email '{}' already exists".format(data['email']))
         except IndexError as exc:
             print("Error: ", exc)
             return "Unable to add new User!"
@@ -319,28 +407,12 @@ class User(Base):
             return user_places
 
         else:
-            for k, v in user_data.items():
-                if v['id'] == user_id:
-                    wanted_user_id = v['id']
-
-            for k, v in place_data.items():
-                if v['host_id'] == wanted_user_id:
-                    data.append({
-                        "id": v['id'],
-                        "host_user_id": v['host_id'],
-                        "city_id": v['city_id'],
-                        "name": v['name'],
-                        "description": v['description'],
-                        "address": v['address'],
-                        "latitude": v['latitude'],
-                        "longitude": v['longitude'],
-                        "number_of_rooms": v['number_of_rooms'],
-                        "bathrooms": v['number_of_bathrooms'],
-                        "price_per_night": v['price_per_night'],
-                        "max_guests": v['max_guests'],
-                        "created_at": datetime.fromtimestamp(v['created_at']),
-                        "updated_at": datetime.fromtimestamp(v['updated_at'])
-                    })
+            if not storage.exists('User', user_id):
+                abort(404, "User not found!")
+
+            # the data files call host_id host_user_id - find() looks under both names
+            for v in storage.find('Place', {"host_id": user_id}):
+                data.append(Place.output_data(v))
 
         return jsonify(data)
 
@@ -350,22 +422,14 @@ class User(Base):
     def reviews_data(user_id):
         """ Class method to provide
         list of reviews of specified user """
-   
-        user_reviews = {}
-        reviews_list = []
-
-        user_data = storage.get("User")
+        if not storage.exists('User', user_id):
+            abort(404, "User not found!")
 
-        if USE_DB_STORAGE:
-
-            for row in user_data:
-                if row.id == user_id:
-                    specific_user = storage.get("Place", user_id)
-
-        # Note the use of the reviews relationship
-            for item in specific_user.reviews:
-                reviews_list.append(item.name)
-
-            user_reviews[specific_user.name] = reviews_list
+        try:
+            # the data files call user_id commentor_user_id - FileStorage looks under both names
+            review_data = storage.find('Review', {"user_id": user_id})
+        except IndexError as exc:
+            print("Error: ", exc)
+            return "Unable to load reviews of the user!"
 
-            return user_reviews
+        return jsonify([Review.output_data(record) for record in review_data])
@@ -0,0 +1,2 @@
+#!/usr/bin/python3
+""" Instrumentation for the app: metrics (and friends) that help us see what is slow """
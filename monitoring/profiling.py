@@ -0,0 +1,171 @@
+#!/usr/bin/python3
+""" Opt-in profiling of single requests: cProfile stats, every SQL statement and every storage call """
+
+# -- Usage example --
+# HBNB_PROFILE_TOKEN=secret python3 ./app.py
+# curl -i -H "X-HBNB-Profile: secret" localhost:5000/api/v1/users/<user_id>/places
+#   -> the X-HBNB-Profile-* response headers have a summary
+#   -> the full report can be downloaded from the url in X-HBNB-Profile-Report (same header needed)
+#
+# HBNB_PROFILE_ALL=1 profiles every request. Only use this on your own machine!
+
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from flask import Blueprint, Response, abort, g, request
+
+profiling_routes = Blueprint('profiling_routes', __name__)
+
+profile_header = "X-HBNB-Profile"
+
+# Only the most recent reports are kept
+max_reports = 50
+_reports = OrderedDict()
+_reports_lock = threading.Lock()
+
+# The profile of the request being handled by the current thread, if any
+_current = threading.local()
+
+
+class RequestProfile():
+    """ Everything recorded while profiling a single request """
+
+    def __init__(self):
+        """ constructor """
+        self.id = str(uuid.uuid4())
+        self.profiler = cProfile.Profile()
+        self.start_time = time.perf_counter()
+        self.sql_statements = []
+        self.storage_calls = []
+
+    def report(self, status, total_time):
+        """ Returns the full text report """
+        lines = [
+            "{} {} -> {}".format(request.method, request.full_path, status),
+            "Total time: {:.3f} ms".format(total_time * 1000),
+            "",
+            "SQL statements: {} ({:.3f} ms)".format(len(self.sql_statements), self.sql_time() * 1000)
+        ]
+        for statement, parameters, duration in self.sql_statements:
+            lines.append("  [{:.3f} ms] {} {}".format(duration * 1000, " ".join(statement.split()), parameters))
+
+        lines.append("")
+        lines.append("Storage calls: {} ({:.3f} ms)".format(len(self.storage_calls), self.storage_time() * 1000))
+        for method, class_name, record_id, duration in self.storage_calls:
+            lines.append("  [{:.3f} ms] {}('{}', '{}')".format(duration * 1000, method, class_name, record_id))
+
+        lines.append("")
+        stats_output = io.StringIO()
+        stats = pstats.Stats(self.profiler, stream=stats_output)
+        stats.sort_stats("cumulative").print_stats(40)
+        lines.append(stats_output.getvalue())
+
+        return "\n".join(lines)
+
+    def sql_time(self):
+        """ Total time spent running SQL statements """
+        return sum(duration for _, _, duration in self.sql_statements)
+
+    def storage_time(self):
+        """ Total time spent in storage calls """
+        return sum(duration for _, _, _, duration in self.storage_calls)
+
+
+def current_profile():
+    """ Returns the profile of the request handled by this thread or None if it isn't being profiled """
+    return getattr(_current, "profile", None)
+
+def trace_storage_call(method, class_name, record_id, duration):
+    """ Records a storage call if the current request is being profiled """
+    profile = current_profile()
+    if profile is not None:
+        profile.storage_calls.append((method, class_name, record_id, duration))
+
+def is_profiling_requested():
+    """ Returns True if the current request should be profiled """
+    if os.getenv("HBNB_PROFILE_ALL") == "1":
+        return True
+
+    token = os.getenv("HBNB_PROFILE_TOKEN")
+    return token is not None and token != "" and request.headers.get(profile_header) == token
+
+
+# SQLAlchemy engine events. DBStorage listens to them with every engine it makes, so that
+# SQLAlchemy isn't imported here. They cost next to nothing for requests that are not being profiled
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """ Remember when the statement started """
+    if current_profile() is not None:
+        conn.info.setdefault("profile_start_times", []).append(time.perf_counter())
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    """ Record the statement and how long it took """
+    profile = current_profile()
+    start_times = conn.info.get("profile_start_times")
+    if profile is not None and start_times:
+        profile.sql_statements.append((statement, parameters, time.perf_counter() - start_times.pop()))
+
+
+@profiling_routes.before_app_request
+def start_profile():
+    """ Start profiling if it was asked for """
+    if request.endpoint == "profiling_routes.profile_report_get" or not is_profiling_requested():
+        return
+
+    profile = RequestProfile()
+    _current.profile = profile
+    g.request_profile = profile
+    profile.profiler.enable()
+
+@profiling_routes.after_app_request
+def finish_profile(response):
+    """ Stop profiling, keep the report and add the summary to the response headers """
+    profile = g.pop("request_profile", None)
+    if profile is None:
+        return response
+
+    profile.profiler.disable()
+    _current.profile = None
+    total_time = time.perf_counter() - profile.start_time
+
+    with _reports_lock:
+        _reports[profile.id] = profile.report(response.status_code, total_time)
+        while len(_reports) > max_reports:
+            _reports.popitem(last=False)
+
+    response.headers[profile_header + "-Id"] = profile.id
+    response.headers[profile_header + "-Total-Ms"] = "{:.3f}".format(total_time * 1000)
+    response.headers[profile_header + "-Sql-Count"] = str(len(profile.sql_statements))
+    response.headers[profile_header + "-Sql-Ms"] = "{:.3f}".format(profile.sql_time() * 1000)
+    response.headers[profile_header + "-Storage-Calls"] = str(len(profile.storage_calls))
+    response.headers[profile_header + "-Storage-Ms"] = "{:.3f}".format(profile.storage_time() * 1000)
+    response.headers[profile_header + "-Report"] = "/profiles/" + profile.id
+
+    return response
+
+@profiling_routes.teardown_app_request
+def abandon_profile(exc):
+    """ Make sure the profiler is switched off even if the request blew up """
+    profile = g.pop("request_profile", None)
+    if profile is not None:
+        profile.profiler.disable()
+        _current.profile = None
+
+@profiling_routes.route('/profiles/<profile_id>', methods=["GET"])
+def profile_report_get(profile_id):
+    """ Download the full report of a profiled request """
+    if not is_profiling_requested():
+        abort(403, "Profiling is not enabled for this request")
+
+    with _reports_lock:
+        report = _reports.get(profile_id)
+
+    if report is None:
+        abort(404, "Profile report not found")
+
+    return Response(report, mimetype="text/plain",
+                    headers={"Content-Disposition": "attachment; filename=profile-{}.txt".format(profile_id)})
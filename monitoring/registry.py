@@ -0,0 +1,179 @@
+#!/usr/bin/python3
+""" Collects counters and histograms and renders them in the Prometheus text format """
+
+import threading
+import weakref
+
+# Default histogram buckets
+latency_buckets = [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+size_buckets = [100, 1000, 10000, 100000, 1000000, 10000000]
+
+
+class Metrics():
+    """ Registry for all the metrics of this process.
+
+    Every thread writes into its own private shard so that recording a value never takes a lock.
+    The shards are only added up when the metrics are rendered, which happens a lot less often.
+    When a thread ends its shard is added to the base shard and dropped, so threads that come and go
+    (e.g. one per request) don't make the list of shards grow forever.
+    Note that each worker process of the pre-fork server has its own registry. """
+    __local = None
+    __shards = None
+    __base = None
+    __lock = None
+    __descriptions = None
+    __collectors = None
+
+    def __init__(self):
+        """ constructor """
+        self.__local = threading.local()
+
+        # What the threads that have ended recorded
+        self.__base = {"counters": {}, "histograms": {}}
+        self.__shards = [self.__base]
+        # Reentrant in case a retiring shard is garbage collected while this thread holds the lock
+        self.__lock = threading.RLock()
+        self.__descriptions = {}
+        self.__collectors = []
+
+    def describe(self, name, metric_type, description, buckets = None):
+        """ Registers a metric. metric_type is one of counter, gauge or histogram """
+        self.__descriptions[name] = {
+            "type": metric_type,
+            "help": description,
+            "buckets": buckets
+        }
+
+    def add_collector(self, collector):
+        """ Registers a function that returns a list of (name, labels, value) gauge readings.
+        It is called every time the metrics are rendered """
+        self.__collectors.append(collector)
+
+    def inc(self, name, labels, value = 1):
+        """ Adds value to the counter with the specified name and labels """
+        counters = self.__shard()["counters"]
+        key = (name, tuple(sorted(labels.items())))
+        counters[key] = counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        """ Records value in the histogram with the specified name and labels """
+        histograms = self.__shard()["histograms"]
+        key = (name, tuple(sorted(labels.items())))
+        buckets = self.__descriptions[name]["buckets"]
+
+        if key not in histograms:
+            # [count per bucket (last one is +Inf), sum of values]
+            histograms[key] = [[0] * (len(buckets) + 1), 0]
+
+        histogram = histograms[key]
+        for i, bound in enumerate(buckets):
+            if value <= bound:
+                histogram[0][i] += 1
+                break
+        else:
+            histogram[0][-1] += 1
+        histogram[1] += value
+
+    def render(self):
+        """ Returns all the metrics in the Prometheus text format """
+        counters = {}
+        histograms = {}
+
+        # Add up the shards. copy() is atomic so the other threads can keep writing meanwhile.
+        # The lock keeps a shard from being moved into the base shard halfway through, which would count it twice
+        with self.__lock:
+            for shard in self.__shards:
+                Metrics.merge(shard, counters, histograms)
+
+        gauges = {}
+        for collector in self.__collectors:
+            for name, labels, value in collector():
+                gauges[(name, tuple(sorted(labels.items())))] = value
+
+        lines = []
+        for name, description in sorted(self.__descriptions.items()):
+            lines.append("# HELP {} {}".format(name, description["help"]))
+            lines.append("# TYPE {} {}".format(name, description["type"]))
+
+            if description["type"] == "histogram":
+                for (metric_name, labels), (buckets, total) in sorted(histograms.items()):
+                    if metric_name != name:
+                        continue
+                    cumulative = 0
+                    bounds = [str(b) for b in description["buckets"]] + ["+Inf"]
+                    for bound, count in zip(bounds, buckets):
+                        cumulative += count
+                        lines.append("{}_bucket{} {}".format(name, format_labels(labels + (("le", bound),)), cumulative))
+                    lines.append("{}_sum{} {}".format(name, format_labels(labels), total))
+                    lines.append("{}_count{} {}".format(name, format_labels(labels), cumulative))
+            else:
+                values = counters if description["type"] == "counter" else gauges
+                for (metric_name, labels), value in sorted(values.items()):
+                    if metric_name == name:
+                        lines.append("{}{} {}".format(name, format_labels(labels), value))
+
+        return "\n".join(lines) + "\n"
+
+    def __shard(self):
+        """ Returns the shard of the current thread, creating it the first time """
+        shard = getattr(self.__local, "shard", None)
+        if shard is None:
+            shard = {"counters": {}, "histograms": {}}
+            self.__local.shard = shard
+
+            # The thread's local storage is cleared when the thread ends, so the owner goes with it
+            self.__local.owner = ShardOwner()
+            weakref.finalize(self.__local.owner, self.__retire, shard)
+
+            with self.__lock:
+                self.__shards.append(shard)
+
+        return shard
+
+    def __retire(self, shard):
+        """ Moves the shard of a thread that has ended into the base shard """
+        with self.__lock:
+            self.__shards = [s for s in self.__shards if s is not shard]
+            Metrics.merge(shard, self.__base["counters"], self.__base["histograms"])
+
+    @staticmethod
+    def merge(shard, counters, histograms):
+        """ Adds the counters and histograms of the shard to the ones given """
+        for key, value in shard["counters"].copy().items():
+            counters[key] = counters.get(key, 0) + value
+        for key, value in shard["histograms"].copy().items():
+            buckets, total = list(value[0]), value[1]
+            if key not in histograms:
+                histograms[key] = [[0] * len(buckets), 0]
+            for i, count in enumerate(buckets):
+                histograms[key][0][i] += count
+            histograms[key][1] += total
+
+
+class ShardOwner():
+    """ Stands for a thread in Metrics. Its shard is retired when this is garbage collected """
+
+
+def format_labels(labels):
+    """ Returns the labels as {key="value",...} """
+    if len(labels) == 0:
+        return ""
+
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        pairs.append('{}="{}"'.format(key, value))
+
+    return "{" + ",".join(pairs) + "}"
+
+
+# The one and only registry. Import this from everywhere else
+metrics = Metrics()
+
+metrics.describe("hbnb_http_requests_total", "counter", "Number of HTTP requests handled")
+metrics.describe("hbnb_http_request_duration_seconds", "histogram", "Time taken to handle HTTP requests", latency_buckets)
+metrics.describe("hbnb_http_response_size_bytes", "histogram", "Size of HTTP response bodies", size_buckets)
+metrics.describe("hbnb_storage_calls_total", "counter", "Number of storage calls by method and class")
+metrics.describe("hbnb_storage_rows_returned_total", "counter", "Number of records returned by storage calls")
+metrics.describe("hbnb_cache_requests_total", "counter", "Number of cache lookups by cache and result (hit / miss)")
+metrics.describe("hbnb_db_pool_connections", "gauge", "SQLAlchemy connection pool stats by state")
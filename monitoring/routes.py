@@ -0,0 +1,61 @@
+#!/usr/bin/python3
+""" Blueprint that records metrics for every request and serves them at /metrics """
+
+import time
+from flask import Blueprint, Response, g, request
+from monitoring.registry import metrics
+
+monitoring_routes = Blueprint('monitoring_routes', __name__)
+
+
+@monitoring_routes.before_app_request
+def start_timer():
+    """ Remember when the request started """
+    g.metrics_start_time = time.perf_counter()
+
+@monitoring_routes.after_app_request
+def record_request(response):
+    """ Count the request and record how long it took and how big the response was """
+    start_time = g.pop("metrics_start_time", None)
+    if start_time is None or request.endpoint == "monitoring_routes.metrics_get":
+        return response
+
+    # use the route pattern (e.g. /api/v1/users/<user_id>) and not the actual url
+    # otherwise every id would get its own set of metrics
+    route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    labels = {"route": route, "method": request.method}
+
+    metrics.inc("hbnb_http_requests_total", {**labels, "status": response.status_code})
+    metrics.observe("hbnb_http_request_duration_seconds", labels, time.perf_counter() - start_time)
+
+    # streamed responses don't know their size in advance
+    if response.content_length is not None:
+        metrics.observe("hbnb_http_response_size_bytes", labels, response.content_length)
+
+    return response
+
+@monitoring_routes.route('/metrics', methods=["GET"])
+def metrics_get():
+    """ Returns all the metrics in the Prometheus text format """
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+def db_pool_stats():
+    """ Collector for the SQLAlchemy connection pool stats """
+    from data import storage, USE_DB_STORAGE
+
+    # don't create the storage just to report on it
+    if not USE_DB_STORAGE or not storage.is_initialised():
+        return []
+
+    readings = []
+    for state, value in storage.pool_status().items():
+        readings.append(("hbnb_db_pool_connections", {"engine": "primary", "state": state}, value))
+
+    for i, status in enumerate(storage.replica_pool_status()):
+        for state, value in status.items():
+            readings.append(("hbnb_db_pool_connections", {"engine": "replica{}".format(i + 1), "state": state}, value))
+
+    return readings
+
+metrics.add_collector(db_pool_stats)
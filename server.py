@@ -0,0 +1,99 @@
+#!/usr/bin/python3
+""" Production launcher. Loads the app and the storage once in the master process
+and then forks the workers so that they all share the loaded data """
+
+# -- Usage example --
+# python3 -m server
+# STORAGE=FILE python3 -m server --bind 0.0.0.0:5000 --workers 8
+#
+# kill -HUP <master pid>   replace the workers - new ones are forked and the old ones finish their requests first.
+#                          The new workers are forked from the same preloaded master, so this does NOT load
+#                          new code or re-read the data (FileStorage workers still pick up changed data files
+#                          through their watcher). Restart the master to deploy new code
+# kill -TERM <master pid>  graceful shutdown
+
+import argparse
+import gc
+import multiprocessing
+from gunicorn.app.base import BaseApplication
+
+
+class HBnBServer(BaseApplication):
+    """ Pre-fork server based on gunicorn with the app preloaded in the master """
+
+    def __init__(self, options):
+        """ constructor """
+        self.options = options
+        super().__init__()
+
+    def load_config(self):
+        """ Pass our options on to gunicorn """
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+
+        # the app (and storage) has to be loaded before forking for the workers to share it
+        self.cfg.set("preload_app", True)
+        self.cfg.set("post_fork", post_fork)
+
+    def load(self):
+        """ Import the app and load the storage. This is where FileStorage reads the JSON files """
+        from app import app
+        from data import storage
+
+        # storage is normally created on first use. Do it now so that the workers inherit it
+        storage.ensure_initialised()
+
+        # No threads may be running in the master when it forks: a lock held by one of them (the
+        # caches, the metrics registry, ...) would stay locked forever in the worker. The only one
+        # is the FileStorage data file watcher - each worker starts its own in post_fork instead
+        if hasattr(storage, "stop_watching"):
+            storage.stop_watching()
+
+        # Move everything loaded so far out of the reach of the garbage collector.
+        # Otherwise the first collection in each worker touches every object and
+        # the copy-on-write pages get copied anyway.
+        gc.freeze()
+
+        return app
+
+
+def post_fork(server, worker):
+    """ Runs in each worker right after it has been forked """
+    from data import storage
+
+    # Database connections must not be shared between processes.
+    # With FileStorage, this starts the worker's own data file watcher (threads don't survive a fork)
+    storage.after_fork()
+
+
+def main():
+    """ Parse the command line and start the server """
+    parser = argparse.ArgumentParser(description="HBnB Evolution production server")
+    parser.add_argument("--bind", default="127.0.0.1:5000",
+                        help="address to listen on (default: %(default)s)")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count(),
+                        help="number of worker processes (default: number of CPUs = %(default)s)")
+    parser.add_argument("--max-requests", type=int, default=10000,
+                        help="recycle a worker after it has handled this many requests, 0 to disable (default: %(default)s)")
+    parser.add_argument("--max-requests-jitter", type=int, default=1000,
+                        help="random extra requests per worker so they don't all recycle at once (default: %(default)s)")
+    parser.add_argument("--timeout", type=int, default=30,
+                        help="seconds before a silent worker is killed and restarted (default: %(default)s)")
+    parser.add_argument("--graceful-timeout", type=int, default=30,
+                        help="seconds old workers get to finish their requests on reload / shutdown (default: %(default)s)")
+    args = parser.parse_args()
+
+    options = {
+        "bind": args.bind,
+        "workers": args.workers,
+        "max_requests": args.max_requests,
+        "max_requests_jitter": args.max_requests_jitter,
+        "timeout": args.timeout,
+        "graceful_timeout": args.graceful_timeout
+    }
+
+    HBnBServer(options).run()
+
+
+if __name__ == '__main__':
+    main()